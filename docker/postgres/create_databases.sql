@@ -5,3 +5,12 @@ CREATE DATABASE fastapi_project_test_db;
 GRANT ALL PRIVILEGES ON DATABASE fastapi_project_db to "postgres_user";
 
 GRANT ALL PRIVILEGES ON DATABASE fastapi_project_test_db to "postgres_user";
+
+-- базы, изображающие реплики для чтения в тестах (src/tests/test_replicas.py)
+CREATE DATABASE fastapi_project_test_replica_1;
+
+CREATE DATABASE fastapi_project_test_replica_2;
+
+GRANT ALL PRIVILEGES ON DATABASE fastapi_project_test_replica_1 to "postgres_user";
+
+GRANT ALL PRIVILEGES ON DATABASE fastapi_project_test_replica_2 to "postgres_user";
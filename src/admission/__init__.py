@@ -0,0 +1,2 @@
+from .buckets import *
+from .controller import *
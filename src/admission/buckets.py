@@ -0,0 +1,74 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Tuple
+
+__all__ = ["RateLimitStore", "MemoryRateLimitStore", "RedisRateLimitStore"]
+
+
+# Хранилище корзин токенов (token bucket) для лимитов на клиента.
+# Корзина вмещает burst токенов и пополняется со скоростью rate в секунду; запрос забирает один.
+# take возвращает 0, если токен был, иначе - сколько секунд ждать следующего (токен не забирается).
+class RateLimitStore(ABC):
+    @abstractmethod
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        ...
+
+
+# Корзины в памяти воркера: лимит действует на каждый воркер отдельно.
+# Хранится не больше max_keys клиентов - давно не приходившие вытесняются (их корзины и так полны).
+class MemoryRateLimitStore(RateLimitStore):
+    def __init__(self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        now = self.clock()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# Та же корзина в Redis - общая для всех воркеров. Пополнение и списание - один Lua-скрипт,
+# то есть одно атомарное обращение к Redis на запрос; время берется у Redis, а не у воркеров.
+# Корзина удаляется сама, когда успела бы наполниться.
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitStore(RateLimitStore):
+    def __init__(self, redis: Any, prefix: str = "ratelimit:"):
+        self.redis = redis
+        self.prefix = prefix
+        self._take = redis.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        return float(await self._take(keys=[self.prefix + key], args=[rate, burst]))
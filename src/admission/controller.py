@@ -0,0 +1,85 @@
+import math
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from src.metrics import REGISTRY, Counter
+
+from .buckets import MemoryRateLimitStore, RateLimitStore
+
+__all__ = ["READ", "WRITE", "AdmissionLimits", "AdmissionRejected", "AdmissionController"]
+
+READ = "read"
+WRITE = "write"
+
+# Через сколько секунд повторить запрос, отклоненный из-за числа одновременных запросов
+IN_FLIGHT_RETRY_AFTER = 1
+
+ADMISSION_REJECTED = REGISTRY.register(
+    Counter("http_requests_rejected_total", "Requests rejected by admission control", ("kind", "reason"))
+)
+
+
+# Пределы для одного вида запросов (чтение или запись); 0 - предела нет.
+# max_pool_wait - в секундах, rate - запросов в секунду на клиента, burst - размер корзины токенов.
+@dataclass
+class AdmissionLimits:
+    max_in_flight: int = 0
+    max_pool_wait: float = 0.0
+    rate: float = 0.0
+    burst: float = 1.0
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))  # Retry-After - целые секунды
+        self.reason = reason
+
+
+# Допуск запросов: лишняя работа отклоняется сразу, до того как она займет соединение из пула.
+# Когда база тормозит, запросы иначе копятся в очереди пула, пока клиенты не отвалятся по таймауту,
+# и задержка растет у всех. Проверки по порядку:
+#  - одновременных запросов этого вида уже max_in_flight - 503;
+#  - соединение из пула сейчас ждут дольше max_pool_wait - 503 (у чтения предел ниже,
+#    поэтому при перегрузке сначала отклоняется чтение, а запись еще проходит);
+#  - у клиента кончились токены - 429.
+# Чтение и запись считаются отдельно: поток чтений не занимает места записей, и наоборот.
+# pool_wait(kind) - текущее ожидание соединения в секундах для пулов, которыми пользуется этот вид запросов.
+class AdmissionController:
+    def __init__(
+        self,
+        reads: AdmissionLimits,
+        writes: AdmissionLimits,
+        store: Optional[RateLimitStore] = None,
+        pool_wait: Callable[[str], float] = lambda kind: 0.0,
+    ):
+        self.limits: Dict[str, AdmissionLimits] = {READ: reads, WRITE: writes}
+        self.store = store or MemoryRateLimitStore()
+        self.pool_wait = pool_wait
+        self.in_flight: Dict[str, int] = {READ: 0, WRITE: 0}
+
+    # Занять место для запроса или AdmissionRejected. Занятое место освобождает release.
+    async def acquire(self, kind: str, client: str) -> None:
+        limits = self.limits[kind]
+        if limits.max_in_flight and self.in_flight[kind] >= limits.max_in_flight:
+            self._reject(kind, 503, IN_FLIGHT_RETRY_AFTER, "in_flight")
+
+        if limits.max_pool_wait:
+            waited = self.pool_wait(kind)
+            if waited > limits.max_pool_wait:
+                self._reject(kind, 503, waited, "pool_wait")
+
+        if limits.rate:
+            wait = await self.store.take(f"{kind}:{client}", limits.rate, limits.burst)
+            if wait > 0:
+                self._reject(kind, 429, wait, "rate_limit")
+
+        self.in_flight[kind] += 1
+
+    def release(self, kind: str) -> None:
+        self.in_flight[kind] -= 1
+
+    def _reject(self, kind: str, status_code: int, retry_after: float, reason: str) -> None:
+        ADMISSION_REJECTED.inc(kind=kind, reason=reason)
+        raise AdmissionRejected(status_code, retry_after, reason)
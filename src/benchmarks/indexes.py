@@ -0,0 +1,94 @@
+""" Планы и время запросов к книгам без индексов из миграции v0002 и с ними.
+
+Запуск из корня репозитория (нужна поднятая база из docker-compose):
+    python -m src.benchmarks.indexes --books 1000000 --sellers 1000
+
+"before" - индексы удаляются внутри транзакции, которая потом откатывается.
+Каждый запрос (и его EXPLAIN ANALYZE, который тоже выполняет запрос) идет в точке сохранения
+с откатом, поэтому удаление не меняет данные для следующих замеров.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from src.benchmarks.seed import seed
+from src.configurations.settings import settings
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.queries import books_query
+
+BOOK_INDEXES = ["ix_books_table_seller_id_id", "ix_books_table_author_lower", "ix_books_table_title_lower"]
+
+
+def queries(sellers: int):
+    seller_id = sellers // 2
+    return {
+        "books of seller": select(Book.id, Book.title).where(Book.seller_id == seller_id).order_by(Book.id).limit(100),
+        # книги удаляет внешний ключ (ON DELETE CASCADE) - в плане это время триггера ограничения
+        "cascade delete": delete(Seller).where(Seller.id == seller_id),
+        "author prefix": books_query(author="author 999").limit(100),
+        "title prefix": books_query(title="book 12345").limit(100),
+    }
+
+
+# SQL с позиционными параметрами ($1, $2...) в том виде, в каком его отправит приложение
+def to_sql(conn: AsyncConnection, query):
+    compiled = query.compile(dialect=conn.dialect)
+    return compiled.string, tuple(compiled.params[name] for name in compiled.positiontup)
+
+
+async def run_phase(conn: AsyncConnection, name: str, sellers: int, repeat: int) -> None:
+    print(f"\n===== {name} =====")
+    for title, query in queries(sellers).items():
+        sql, params = to_sql(conn, query)
+        await conn.execute(text("SAVEPOINT bench"))
+        plan = (await conn.exec_driver_sql(f"EXPLAIN ANALYZE {sql}", params)).scalars().all()
+        await conn.execute(text("ROLLBACK TO SAVEPOINT bench"))
+
+        timings = []
+        for _ in range(repeat):
+            await conn.execute(text("SAVEPOINT bench"))
+            started = time.perf_counter()
+            await conn.execute(query)
+            timings.append((time.perf_counter() - started) * 1000)
+            await conn.execute(text("ROLLBACK TO SAVEPOINT bench"))
+
+        print(f"\n--- {title}: median {statistics.median(timings):.2f} ms")
+        print("\n".join(f"    {line}" for line in plan if not line.startswith("Planning")))
+
+
+async def main(args) -> None:
+    engine = create_async_engine(args.url)
+    if not args.no_seed:
+        await seed(engine, args.sellers, args.books)
+        async with engine.connect() as conn:
+            await conn.execute(text("COMMIT"))
+            await conn.execute(text("VACUUM ANALYZE books_table"))
+
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        for index in BOOK_INDEXES:
+            await conn.execute(text(f"DROP INDEX {index}"))
+        await run_phase(conn, "before (no indexes)", args.sellers, args.repeat)
+        await transaction.rollback()
+
+        transaction = await conn.begin()
+        await run_phase(conn, "after (with indexes)", args.sellers, args.repeat)
+        await transaction.rollback()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.database_test_url)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--sellers", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--no-seed", action="store_true", help="не пересоздавать данные")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,124 @@
+""" Сравнение ORM- и Core-пути для списочных ручек GET /books/ и GET /seller/.
+
+Запуск из корня репозитория (нужна поднятая база из docker-compose):
+    python -m src.benchmarks.list_endpoints --books 100000 --sellers 100
+
+"before" - ORM-путь: ORM-объекты, валидация pydantic, сериализация orjson.
+"after" - текущий путь из src.queries: строки Core сразу в orjson.
+Оба пути отдают одну и ту же форму ответа, скорость - в строках ответа в секунду
+(для ?include=books - продавцы и их книги).
+"""
+
+import argparse
+import asyncio
+import time
+from functools import partial
+from typing import Optional
+
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from src.benchmarks.seed import seed
+from src.configurations.settings import settings
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.queries import books_query, fetch_books, fetch_seller_summaries
+from src.schemas import ReturnedAllbooks
+from src.schemas.books import BookResponse
+from src.schemas.sellers import SellerSummary
+
+
+async def books_before(session: AsyncSession) -> bytes:
+    result = await session.execute(select(Book).options(selectinload(Book.seller)).order_by(Book.id))
+    books = result.scalars().all()
+    model = ReturnedAllbooks.model_validate({"books": books}, from_attributes=True)
+    return orjson.dumps(model.model_dump(mode="json"))
+
+
+async def books_after(session: AsyncSession) -> bytes:
+    books = await fetch_books(session, books_query())
+    return orjson.dumps({"books": books, "next_cursor": None})
+
+
+# ORM-путь в той же форме ответа, что и SellerSummary: число книг - коррелированным подзапросом,
+# книги (with_books) - selectinload, как ORM загрузил бы их для ?include=books
+async def sellers_before(session: AsyncSession, with_books: bool = False) -> bytes:
+    book_count = select(func.count(Book.id)).where(Book.seller_id == Seller.id).scalar_subquery()
+    query = select(Seller, book_count).order_by(Seller.id)
+    if with_books:
+        query = query.options(selectinload(Seller.books))
+    result = await session.execute(query)
+    sellers = [
+        SellerSummary(
+            id=seller.id,
+            first_name=seller.first_name,
+            last_name=seller.last_name,
+            email=seller.email,
+            book_count=count,
+            books=[BookResponse.model_validate(book) for book in sorted(seller.books, key=lambda book: book.id)]
+            if with_books
+            else None,
+        ).model_dump(mode="json", by_alias=True, exclude_none=True)
+        for seller, count in result
+    ]
+    return orjson.dumps(sellers)
+
+
+async def sellers_after(session: AsyncSession, books_limit: Optional[int] = None) -> bytes:
+    return orjson.dumps(await fetch_seller_summaries(session, books_limit))
+
+
+async def measure(engine, func, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        async with AsyncSession(engine) as session:
+            started = time.perf_counter()
+            await func(session)
+            best = min(best, time.perf_counter() - started)
+    return rows / best
+
+
+async def main(args) -> None:
+    engine = create_async_engine(args.url)
+    if not args.no_seed:
+        await seed(engine, args.sellers, args.books)
+
+    # Строки считаются по базе, а не по аргументам: с --no-seed данные могут быть любыми
+    async with AsyncSession(engine) as session:
+        book_rows = await session.scalar(select(func.count()).select_from(Book))
+        seller_rows = await session.scalar(select(func.count()).select_from(Seller))
+        per_seller = select(func.count(Book.id).label("books")).group_by(Book.seller_id).subquery()
+        max_books = await session.scalar(select(func.coalesce(func.max(per_seller.c.books), 1)))
+
+    # Оба пути каждой строки отдают байт в байт один ответ; для ?include=books лимит не меньше
+    # самого большого числа книг у продавца, чтобы Core-путь отдавал все книги, как и selectinload
+    for name, before, after, rows in (
+        ("GET /books/", books_before, books_after, book_rows),
+        ("GET /seller/", sellers_before, sellers_after, seller_rows),
+        (
+            "GET /seller/?include=books",
+            partial(sellers_before, with_books=True),
+            partial(sellers_after, books_limit=max_books),
+            seller_rows + book_rows,
+        ),
+    ):
+        before_rps = await measure(engine, before, rows, args.repeat)
+        after_rps = await measure(engine, after, rows, args.repeat)
+        print(
+            f"{name:<27} before: {before_rps:>12,.0f} rows/s   after: {after_rps:>12,.0f} rows/s"
+            f"   x{after_rps / before_rps:.1f}"
+        )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.database_test_url)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--sellers", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-seed", action="store_true", help="не пересоздавать данные")
+    asyncio.run(main(parser.parse_args()))
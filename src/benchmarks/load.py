@@ -0,0 +1,275 @@
+""" Нагрузочный прогон всех ручек /api/v1/books и /api/v1/seller.
+
+Запуск из корня репозитория (нужна поднятая база из docker-compose):
+    python -m src.benchmarks.load --books 10000 --sellers 100 --requests 500 --concurrency 20
+
+База по --url пересоздается и наполняется (по умолчанию тестовая). Без --base-url приложение
+запускается в этом же процессе через httpx.ASGITransport и работает с той же базой.
+С --base-url запросы идут на уже запущенный сервер - он должен смотреть в базу из --url.
+
+Для каждой ручки печатаются RPS и задержки p50/p95/p99, результат пишется в JSON (--output).
+Если есть файл базовой линии (--baseline), результат сравнивается с ним: p95 выше базового
+или RPS ниже базового больше чем на --tolerance, как и ответы с неожиданным статусом
+и ручки, которых нет в базовой линии, считаются регрессией - скрипт печатает их и завершается с кодом 1.
+Новая базовая линия записывается флагом --save-baseline - целиком из одного прогона всех ручек
+(без --only). Цифры зависят от машины, поэтому базовую линию стоит перезаписывать на той машине,
+где идет сравнение.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from src.benchmarks.seed import seed
+from src.cache import MemoryCache, NullCache
+from src.configurations.settings import settings
+
+DEFAULT_BASELINE = Path(__file__).with_name("load_baseline.json")
+
+# (метод, путь, тело запроса)
+Request = Tuple[str, str, Optional[Any]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    expected_status: int
+    make_request: Callable[[int], Request]  # номер запроса -> запрос
+
+
+# Сценарии идут по порядку: сначала чтение, потом запись. Каждый запрос получает свой номер,
+# из которого выбираются id, поэтому удаления не задевают одни и те же строки дважды.
+def scenarios(sellers: int, books: int) -> List[Scenario]:
+    def book_id(i: int) -> int:
+        return i % books + 1
+
+    def seller_id(i: int) -> int:
+        return i % sellers + 1
+
+    def new_book(i: int) -> dict:
+        return {"title": f"Load {i}", "author": f"Author {i % 1000}", "year": 2024, "count_pages": 300,
+                "seller_id": seller_id(i)}
+
+    return [
+        Scenario("GET /books/", 200, lambda i: ("GET", "/api/v1/books/?limit=100", None)),
+        Scenario("GET /books/?author=", 200, lambda i: ("GET", f"/api/v1/books/?author=Author%20{i % 1000}", None)),
+        Scenario("GET /books/search", 200, lambda i: ("GET", f"/api/v1/books/search?q=book%20{book_id(i)}", None)),
+        Scenario("GET /books/batch", 200, lambda i: ("GET", "/api/v1/books/batch?ids=" + ",".join(
+            str(book_id(i * 50 + j)) for j in range(50)), None)),
+        Scenario("GET /books/{id}", 200, lambda i: ("GET", f"/api/v1/books/{book_id(i)}", None)),
+        Scenario("GET /seller/", 200, lambda i: ("GET", "/api/v1/seller/", None)),
+        Scenario("GET /seller/?include=", 200, lambda i: ("GET", "/api/v1/seller/?include=books&books_limit=10", None)),
+        Scenario("GET /seller/{id}", 200, lambda i: ("GET", f"/api/v1/seller/{seller_id(i)}", None)),
+        Scenario("GET /seller/{id}/books", 200, lambda i: ("GET", f"/api/v1/seller/{seller_id(i)}/books?limit=50", None)),
+        Scenario("GET /seller/{id}/stats", 200, lambda i: ("GET", f"/api/v1/seller/{seller_id(i)}/stats", None)),
+        Scenario("GET /stats", 200, lambda i: ("GET", "/api/v1/stats", None)),
+        Scenario("POST /books/", 201, lambda i: ("POST", "/api/v1/books/", new_book(i))),
+        Scenario("POST /books/bulk", 201, lambda i: ("POST", "/api/v1/books/bulk", [new_book(i + j) for j in range(100)])),
+        Scenario(
+            "PUT /books/{id}",
+            200,
+            lambda i: ("PUT", f"/api/v1/books/{book_id(i)}",
+                       {"id": book_id(i), "title": f"Updated {i}", "author": "Author 1", "year": 2025, "pages": 200}),
+        ),
+        # удаляются книги с конца, чтобы не пересекаться с обновлениями выше
+        Scenario("DELETE /books/{id}", 204, lambda i: ("DELETE", f"/api/v1/books/{books - i}", None)),
+        Scenario(
+            "POST /seller/",
+            201,
+            lambda i: ("POST", "/api/v1/seller/",
+                       {"first_name": "Load", "last_name": f"Seller {i}", "email": f"load{i}@example.com"}),
+        ),
+        Scenario("PUT /seller/{id}", 200, lambda i: ("PUT", f"/api/v1/seller/{seller_id(i)}", {"first_name": f"Name {i}"})),
+        # удаляются продавцы, созданные сценарием POST /seller/ (id идут сразу за наполненными)
+        Scenario("DELETE /seller/{id}", 204, lambda i: ("DELETE", f"/api/v1/seller/{sellers + 1 + i}", None)),
+    ]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, warmup: int, requests: int, concurrency: int
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    numbers = iter(range(warmup + requests))
+    measured_from = warmup
+    started_at = 0.0
+
+    async def worker() -> None:
+        nonlocal started_at
+        for i in numbers:
+            if i == measured_from:
+                started_at = time.perf_counter()
+            method, url, body = scenario.make_request(i)
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            elapsed = time.perf_counter() - started
+            if i < measured_from:
+                continue
+            latencies.append(elapsed)
+            if response.status_code != scenario.expected_status:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - started_at
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall_time, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+# Приложение в этом процессе: сессии и кэш подменяются так же, как в тестах.
+# Чтение - как в приложении, в автокоммите (read_sessionmaker). Допуск запросов - из настроек, как в приложении
+def in_process_client(engine: AsyncEngine, cache: str) -> httpx.AsyncClient:
+    from src.configurations.admission import init_admission
+    from src.configurations.cache import get_cache
+    from src.configurations.database import get_read_session, get_write_session, read_sessionmaker
+    from src.main import app
+
+    session_factory = async_sessionmaker(engine)
+    read_session_factory = read_sessionmaker(engine)
+
+    async def _get_async_session():
+        async with session_factory() as session:
+            yield session
+            if session.in_transaction():
+                await session.commit()
+
+    async def _get_read_session():
+        async with read_session_factory() as session:
+            yield session
+
+    response_cache = MemoryCache(settings.cache_max_size, settings.cache_ttl) if cache == "memory" else NullCache()
+    app.dependency_overrides[get_write_session] = _get_async_session
+    app.dependency_overrides[get_read_session] = _get_read_session
+    app.dependency_overrides[get_cache] = lambda: response_cache
+
+    init_admission()
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+
+
+# Сравнение с базовой линией: список найденных регрессий (пустой - все в порядке).
+# Без базовой линии (None) проверяются только статусы ответов
+def compare(results: Dict[str, Any], baseline: Optional[Dict[str, Any]], tolerance: float) -> List[str]:
+    regressions = []
+    for name, current in results["scenarios"].items():
+        if current["errors"]:
+            regressions.append(f"{name}: unexpected responses {current['errors']}")
+        if baseline is None:
+            continue
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            regressions.append(f"{name}: no baseline entry, re-run with --save-baseline")
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms > baseline {base['p95_ms']} ms")
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['rps']} rps < baseline {base['rps']} rps")
+    return regressions
+
+
+def print_table(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    print(f"{'endpoint':<22}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'base p95':>10}")
+    for name, current in results["scenarios"].items():
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        print(
+            f"{name:<22}{current['rps']:>10.1f}{current['p50_ms']:>10.2f}{current['p95_ms']:>10.2f}"
+            f"{current['p99_ms']:>10.2f}{sum(current['errors'].values()):>8}"
+            f"{base['p95_ms'] if base else '-':>10}"
+        )
+
+
+async def main(args) -> int:
+    engine = create_async_engine(args.url, pool_size=args.concurrency, max_overflow=0)
+    await seed(engine, args.sellers, args.books)
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        client = in_process_client(engine, args.cache)
+
+    results = {
+        "meta": {
+            "target": args.base_url or "in-process",
+            "sellers": args.sellers,
+            "books": args.books,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cache": args.cache if not args.base_url else "server",
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "scenarios": {},
+    }
+    async with client:
+        for scenario in scenarios(args.sellers, args.books):
+            if args.only and args.only not in scenario.name:
+                continue
+            results["scenarios"][scenario.name] = await run_scenario(
+                client, scenario, args.warmup, args.requests, args.concurrency
+            )
+    await engine.dispose()
+
+    baseline = None
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+    print_table(results, baseline)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.database_test_url, help="база, которая будет пересоздана")
+    parser.add_argument("--base-url", help="адрес запущенного сервера, например http://localhost:8000")
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--sellers", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500, help="замеряемых запросов на ручку")
+    parser.add_argument("--warmup", type=int, default=20, help="незамеряемых запросов на ручку перед замером")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--cache", choices=["memory", "none"], default="memory", help="кэш ответов без --base-url")
+    parser.add_argument("--only", help="запускать только ручки, в названии которых есть эта строка")
+    parser.add_argument("--output", type=Path, help="куда записать результат в JSON")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="записать результат как новую базовую линию")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение, доля (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if args.save_baseline and args.only:
+        parser.error("--save-baseline needs a run of all endpoints, drop --only")
+    if args.warmup + args.requests > args.books:
+        parser.error("--books must be at least --warmup + --requests: DELETE /books/{id} removes one book per request")
+    sys.exit(asyncio.run(main(args)))
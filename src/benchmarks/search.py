@@ -0,0 +1,64 @@
+""" Задержка поиска книг (GET /books/search): запрос страницы и фасетов, как их делает ручка.
+
+Запуск из корня репозитория (нужна поднятая база из docker-compose):
+    python -m src.benchmarks.search --books 1000000 --sellers 1000
+
+Для каждого вида поиска печатаются p50/p95 по --repeat прогонам. Цель - p95 до 20 мс на миллионе книг.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.benchmarks.seed import seed
+from src.configurations.settings import settings
+from src.queries import book_search_filters, fetch_books, fetch_search_facets, search_books_query
+
+
+def searches(books: int, sellers: int):
+    return {
+        "rare word": dict(q=f"{books // 2}"),
+        "two words": dict(q="author 777"),
+        "word + years": dict(q="author 777", min_year=2010, max_year=2015),
+        "seller + pages": dict(seller_id=sellers // 2, min_pages=200, max_pages=400),
+        "phrase + seller": dict(q='"book 12345"', seller_id=12345 % sellers + 1),
+    }
+
+
+async def search(session: AsyncSession, filters_kwargs: dict, limit: int = 100) -> None:
+    filters = book_search_filters(**filters_kwargs)
+    await fetch_books(session, search_books_query(filters).limit(limit + 1))
+    await fetch_search_facets(session, filters)
+
+
+async def main(args) -> None:
+    engine = create_async_engine(args.url)
+    if not args.no_seed:
+        await seed(engine, args.sellers, args.books)
+
+    async with AsyncSession(engine) as session:
+        for name, filters_kwargs in searches(args.books, args.sellers).items():
+            await search(session, filters_kwargs)  # прогрев кэша страниц
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                await search(session, filters_kwargs)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[max(0, round(0.95 * len(timings)) - 1)]
+            print(f"{name:<18} p50: {statistics.median(timings):>8.2f} ms   p95: {p95:>8.2f} ms")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.database_test_url)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--sellers", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--no-seed", action="store_true", help="не пересоздавать данные")
+    asyncio.run(main(parser.parse_args()))
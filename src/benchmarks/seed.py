@@ -0,0 +1,60 @@
+""" Наполнение базы тестовыми продавцами и книгами для бенчмарков.
+Таблицы пересоздаются, поэтому по умолчанию используется тестовая база.
+"""
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.migrations import upgrade
+from src.migrations.runner import SCHEMA_VERSION_TABLE
+from src.models.base import BaseModel
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.models import changes, purges, stats  # noqa: F401 - таблицы сводок и задач тоже пересоздаются
+
+BATCH_SIZE = 10_000
+
+
+# Схема создается миграциями - так бенчмарки видят те же индексы, что и боевая база
+async def recreate_tables(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(BaseModel.metadata.drop_all)
+        await conn.execute(text(f"DROP TABLE IF EXISTS {SCHEMA_VERSION_TABLE}"))
+    await upgrade(engine)
+
+
+async def seed(engine: AsyncEngine, sellers: int, books: int) -> None:
+    await recreate_tables(engine)
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(Seller),
+            [
+                {"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"seller{i}@example.com"}
+                for i in range(sellers)
+            ],
+        )
+
+        for start in range(0, books, BATCH_SIZE):
+            await conn.execute(
+                insert(Book),
+                [
+                    {
+                        "title": f"Book {i}",
+                        "author": f"Author {i % 1000}",
+                        "year": 2000 + i % 25,
+                        "pages": 100 + i % 900,
+                        "seller_id": i % sellers + 1,
+                    }
+                    for i in range(start, min(start + BATCH_SIZE, books))
+                ],
+            )
+
+    # События ленты изменений о загрузке тестовых данных никому не нужны
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE change_events"))
+
+    # Статистика для планировщика, как на живой базе после autovacuum
+    async with engine.begin() as conn:
+        for table in BaseModel.metadata.sorted_tables:
+            await conn.execute(text(f"ANALYZE {table.name}"))
@@ -0,0 +1,89 @@
+""" Процессорное время на сериализацию ответа: путь response_model против готовых bytes.
+
+Запуск из корня репозитория (база не нужна - данные собираются в памяти):
+    python -m src.benchmarks.serializers --repeat 2000
+
+"before" - то, что FastAPI делает с возвращенным объектом при response_model:
+валидация схемой, jsonable_encoder и orjson (как в ORJSONResponse).
+"after" - serializer_for(схема).dumps: поля схемы сразу в orjson, без валидации.
+Списки - страница GET /books/ и GET /seller/ (строки Core), одиночные - ORM-объекты,
+как их читают GET /books/{id} и GET /seller/{id}. Печатается CPU на один ответ (мкс).
+"""
+
+import argparse
+import time
+from typing import Any, Callable, List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.schemas import ReturnedAllbooks, ReturnedBook
+from src.schemas.sellers import SellerResponse, SellerSummary
+from src.utils import serializer_for
+
+
+def book_row(i: int) -> dict:
+    return {"id": i, "title": f"Book {i}", "author": f"Author {i % 1000}", "year": 2000 + i % 25,
+            "pages": 100 + i % 900, "seller_id": i % 100 + 1}
+
+
+def cases(page_size: int, seller_books: int):
+    books_page = {"books": [book_row(i) for i in range(1, page_size + 1)], "next_cursor": "MTAw"}
+    sellers = [
+        {"id": i, "first_name": "Ivan", "last_name": f"Seller {i}", "email": f"seller{i}@example.com",
+         "book_count": i * 10}
+        for i in range(1, 101)
+    ]
+    book = Book(**book_row(1))
+    seller = Seller(id=1, first_name="Ivan", last_name="Petrov", email="ivan@example.com",
+                    books=[Book(**book_row(i)) for i in range(1, seller_books + 1)])
+
+    sellers_adapter = TypeAdapter(List[SellerSummary])
+    sellers_serializer = serializer_for(SellerSummary)
+
+    return [
+        (f"GET /books/ ({page_size} rows)",
+         lambda: _response_model(ReturnedAllbooks, books_page),
+         lambda: serializer_for(ReturnedAllbooks).dumps(books_page)),
+        ("GET /seller/ (100 rows)",
+         lambda: orjson.dumps(jsonable_encoder(sellers_adapter.validate_python(sellers))),
+         lambda: sellers_serializer.dumps_many(sellers)),
+        ("GET /books/{id} (ORM)",
+         lambda: _response_model(ReturnedBook, book),
+         lambda: serializer_for(ReturnedBook).dumps(book)),
+        (f"GET /seller/{{id}} ({seller_books} books)",
+         lambda: _response_model(SellerResponse, seller),
+         lambda: serializer_for(SellerResponse).dumps(seller)),
+    ]
+
+
+def _response_model(schema, content: Any) -> bytes:
+    value = schema.model_validate(content, from_attributes=True)
+    return orjson.dumps(jsonable_encoder(value, by_alias=True))
+
+
+def cpu_per_call(func: Callable[[], bytes], repeat: int) -> float:
+    func()
+    started = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - started) / repeat
+
+
+def main(args) -> None:
+    print(f"{'response':<28}{'before us':>12}{'after us':>12}{'speedup':>10}")
+    for name, before, after in cases(args.page_size, args.seller_books):
+        before_cpu = cpu_per_call(before, args.repeat)
+        after_cpu = cpu_per_call(after, args.repeat)
+        print(f"{name:<28}{before_cpu * 1e6:>12.1f}{after_cpu * 1e6:>12.1f}{before_cpu / after_cpu:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--seller-books", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,5 @@
+from .backends import *
+from .keys import *
+from .singleflight import *
+
+__all__ = backends.__all__ + keys.__all__ + singleflight.__all__
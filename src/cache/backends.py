@@ -0,0 +1,252 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from .singleflight import SingleFlight
+
+__all__ = ["Cache", "MemoryCache", "RedisCache", "NullCache", "pack_response", "unpack_response"]
+
+
+# Закэшированный ответ - это ETag и тело, упакованные в одно значение
+def pack_response(etag: str, body: bytes) -> bytes:
+    return etag.encode() + b"\n" + body
+
+
+def unpack_response(value: bytes) -> Tuple[str, bytes]:
+    etag, body = value.split(b"\n", 1)
+    return etag.decode(), body
+
+
+# Интерфейс кэша для готовых тел ответов (bytes).
+# Все методы асинхронные, чтобы за ним мог стоять и внешний сервис вроде Redis.
+# Наследники вызывают _invalidate(*keys) в начале delete.
+# replica_lag - сколько секунд после сброса ключа реплика может отдавать старые данные:
+# прочитанное с реплики (replica=True) в это время в кэш не кладется.
+class Cache(ABC):
+    def __init__(self, replica_lag: float = 0.0):
+        self.flights = SingleFlight()
+        self.replica_lag = replica_lag
+        # Поколения ключей, по которым сейчас идет загрузка: delete их увеличивает, и загрузка,
+        # начатая до сброса, не кладет в кэш прочитанное до записи. Ключи без загрузок не хранятся.
+        self._generations: Dict[str, int] = {}
+        self._loading: Dict[str, int] = {}
+        # Ключи, сброшенные за последние replica_lag секунд, - с моментом, до которого их не заполняют с реплик
+        self._invalidated: "OrderedDict[str, float]" = OrderedDict()
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    # Пакетные операции. По умолчанию - по одной; внешние хранилища делают их за одно обращение
+    async def get_many(self, *keys: str) -> List[Optional[bytes]]:
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, items: Dict[str, bytes]) -> None:
+        for key, value in items.items():
+            await self.set(key, value)
+
+    # Значение из кэша, а при промахе - из loader (None - значения нет, в кэш не кладется).
+    # Одновременные промахи по одному ключу и источнику (source) объединяются: loader
+    # выполняется один раз, и на всех - один запрос к БД, одно соединение и одно готовое тело.
+    # replica - loader читает с реплики (см. replica_lag).
+    async def load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[bytes]]],
+        source: Hashable = None,
+        replica: bool = False,
+    ) -> Optional[bytes]:
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+        return await self.flights.do(key, lambda: self._load_and_set(key, loader, replica), source)
+
+    # То же для набора ключей: промахи загружаются одним вызовом loader(missing),
+    # он возвращает найденные значения по ключам. Результат - значения в порядке keys.
+    async def load_many(
+        self, keys: Sequence[str], loader: Callable[[List[str]], Awaitable[Dict[str, bytes]]], replica: bool = False
+    ) -> List[Optional[bytes]]:
+        values = await self.get_many(*keys)
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if not missing:
+            return values
+
+        generations = self._begin_load(missing)
+        try:
+            fresh = await loader(missing)
+            items = {key: value for key, value in fresh.items() if key in generations}
+            await self._set_current(items, generations, replica)
+        finally:
+            self._end_load(missing)
+        return [fresh.get(key) if value is None else value for key, value in zip(keys, values)]
+
+    async def _load_and_set(
+        self, key: str, loader: Callable[[], Awaitable[Optional[bytes]]], replica: bool
+    ) -> Optional[bytes]:
+        generations = self._begin_load([key])
+        try:
+            value = await loader()
+            if value is not None:
+                await self._set_current({key: value}, generations, replica)
+        finally:
+            self._end_load([key])
+        return value
+
+    # Запоминает поколения ключей до начала загрузки
+    def _begin_load(self, keys: Sequence[str]) -> Dict[str, int]:
+        for key in keys:
+            self._loading[key] = self._loading.get(key, 0) + 1
+        return {key: self._generations.get(key, 0) for key in keys}
+
+    def _end_load(self, keys: Sequence[str]) -> None:
+        for key in keys:
+            self._loading[key] -= 1
+            if not self._loading[key]:
+                del self._loading[key]
+                self._generations.pop(key, None)
+
+    # Кладет в кэш значения, ключи которых не сбрасывались с начала загрузки (а для реплики -
+    # и за последние replica_lag секунд). Сброс, пришедший пока шла запись в хранилище,
+    # мог выполниться раньше нее - такие ключи удаляются еще раз
+    async def _set_current(self, items: Dict[str, bytes], generations: Dict[str, int], replica: bool) -> None:
+        items = {key: value for key, value in items.items() if self._generations.get(key, 0) == generations[key]}
+        if replica and self.replica_lag > 0 and items:
+            lagging = await self._recently_invalidated(list(items))
+            items = {key: value for key, value in items.items() if key not in lagging}
+        if not items:
+            return
+        if len(items) == 1:
+            await self.set(*next(iter(items.items())))
+        else:
+            await self.set_many(items)
+
+        stale = [key for key in items if self._generations.get(key, 0) != generations[key]]
+        if stale:
+            await self.delete(*stale)
+
+    def _invalidate(self, *keys: str) -> None:
+        self.flights.forget(*keys)
+        for key in keys:
+            if key in self._loading:
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+        if self.replica_lag > 0:
+            now = time.monotonic()
+            while self._invalidated and next(iter(self._invalidated.values())) <= now:
+                self._invalidated.popitem(last=False)
+            for key in keys:
+                self._invalidated.pop(key, None)
+                self._invalidated[key] = now + self.replica_lag
+
+    # Какие из ключей сброшены за последние replica_lag секунд (в этом воркере)
+    async def _recently_invalidated(self, keys: Sequence[str]) -> Set[str]:
+        now = time.monotonic()
+        return {key for key in keys if self._invalidated.get(key, 0) > now}
+
+
+# Кэш в памяти процесса: LRU на max_size записей, каждая живет не дольше ttl секунд.
+# У каждого воркера свой кэш, поэтому сброс после записи виден только в этом воркере -
+# остальные отдадут старые данные не дольше ttl. Если это недопустимо, нужен RedisCache.
+class MemoryCache(Cache):
+    def __init__(self, max_size: int = 10_000, ttl: float = 30.0, replica_lag: float = 0.0):
+        super().__init__(replica_lag)
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        self._invalidate(*keys)
+        for key in keys:
+            self._data.pop(key, None)
+
+
+# Кэш во внешнем хранилище с протоколом Redis, общий для всех воркеров.
+# client - асинхронный клиент с методами get/set/delete как у redis.asyncio.Redis;
+# в тестах вместо него можно передать любой объект с теми же методами.
+class RedisCache(Cache):
+    def __init__(self, client: Any, ttl: float = 30.0, prefix: str = "book_sale:", replica_lag: float = 0.0):
+        super().__init__(replica_lag)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self.client.set(self.prefix + key, value, px=int(self.ttl * 1000))
+
+    # С replica_lag вместе с ключами на replica_lag секунд ставятся отметки о сбросе -
+    # по ним и другие воркеры не кладут в кэш прочитанное с отстающей реплики
+    async def delete(self, *keys: str) -> None:
+        self._invalidate(*keys)
+        if not keys:
+            return
+        if self.replica_lag <= 0:
+            await self.client.delete(*(self.prefix + key for key in keys))
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.delete(*(self.prefix + key for key in keys))
+            for key in keys:
+                pipe.set(self._invalidated_key(key), b"1", px=int(self.replica_lag * 1000))
+            await pipe.execute()
+
+    async def _recently_invalidated(self, keys: Sequence[str]) -> Set[str]:
+        marks = await self.client.mget([self._invalidated_key(key) for key in keys])
+        return {key for key, mark in zip(keys, marks) if mark is not None}
+
+    def _invalidated_key(self, key: str) -> str:
+        return f"{self.prefix}invalidated:{key}"
+
+    async def get_many(self, *keys: str) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        return await self.client.mget([self.prefix + key for key in keys])
+
+    async def set_many(self, items: Dict[str, bytes]) -> None:
+        if not items:
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(self.prefix + key, value, px=int(self.ttl * 1000))
+            await pipe.execute()
+
+
+# Выключенный кэш: ничего не хранит
+class NullCache(Cache):
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes) -> None:
+        pass
+
+    async def delete(self, *keys: str) -> None:
+        self._invalidate(*keys)
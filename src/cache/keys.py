@@ -0,0 +1,11 @@
+__all__ = ["book_key", "seller_key"]
+
+
+# Ключи кэша для тел ответов ручек чтения.
+# Тело продавца содержит его книги, поэтому изменение книги сбрасывает и ключ ее продавца.
+def book_key(book_id: int) -> str:
+    return f"book:{book_id}"
+
+
+def seller_key(seller_id: int) -> str:
+    return f"seller:{seller_id}"
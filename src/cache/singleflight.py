@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+__all__ = ["SingleFlight"]
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+# Объединение одинаковых запросов, идущих одновременно (single flight).
+# Первый вызов do(key, ...) выполняет загрузку, а все вызовы с тем же ключом, пришедшие,
+# пока она идет, ждут ее результат (или ее исключение) - вместо своего запроса к БД.
+# source разделяет загрузки по источнику данных: запросы к основной базе и к реплике
+# не объединяются, иначе читатель основной базы мог бы получить отставшие данные реплики.
+# forget(key) отцепляет идущие загрузки: вызовы после записи начнут новую, а не присоединятся
+# к начатой до нее. Сама отцепленная загрузка не прерывается и вернет свой (возможно, старый)
+# результат тем, кто уже ее ждал; не положить его в кэш - забота Cache. Если первый вызов отменен (клиент ушел), ожидающие
+# не падают вслед за ним - один из них повторяет загрузку сам.
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, Dict[Hashable, "asyncio.Future[Any]"]] = {}
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[T]], source: Hashable = None) -> T:
+        while True:
+            future = self._calls.get(key, {}).get(source)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls.setdefault(key, {})[source] = future
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            self._finish(key, source, future, exception=_LeaderCancelled())
+            raise
+        except Exception as e:
+            self._finish(key, source, future, exception=e)
+            raise
+        self._finish(key, source, future, result=result)
+        return result
+
+    def forget(self, *keys: Hashable) -> None:
+        for key in keys:
+            self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        return sum(len(calls) for calls in self._calls.values())
+
+    def _finish(self, key: Hashable, source: Hashable, future: "asyncio.Future[Any]", result: Any = None,
+                exception: BaseException = None) -> None:
+        calls = self._calls.get(key)
+        if calls is not None and calls.get(source) is future:
+            del calls[source]
+            if not calls:
+                del self._calls[key]
+
+        if exception is not None:
+            future.set_exception(exception)
+            # Ожидающих может не быть - не даем asyncio ругаться на непрочитанное исключение
+            future.exception()
+        else:
+            future.set_result(result)
@@ -0,0 +1,241 @@
+import asyncio
+import base64
+import binascii
+import logging
+from collections import deque
+from datetime import timedelta
+from typing import Any, Deque, List, Optional, Set
+
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.models.changes import CHANGES_CHANNEL
+from src.queries.changes import (
+    START,
+    Position,
+    change_exists,
+    fetch_change_head,
+    fetch_changes,
+    prune_changes,
+)
+
+__all__ = [
+    "ChangeFeed",
+    "Subscription",
+    "SubscriptionEnded",
+    "PositionExpired",
+    "encode_position",
+    "decode_position",
+    "change_message",
+]
+
+logger = logging.getLogger(__name__)
+
+# Конец подписки в ее очереди: лента остановлена
+_END = object()
+
+
+class SubscriptionEnded(Exception):
+    pass
+
+
+class PositionExpired(Exception):
+    pass
+
+
+# Токен позиции для клиента. Как и курсор пагинации, снаружи он непрозрачен (base64).
+def encode_position(position: Position) -> str:
+    return base64.urlsafe_b64encode(f"{position[0]}.{position[1]}".encode()).decode()
+
+
+def decode_position(token: str) -> Position:
+    try:
+        txid, event_id = base64.urlsafe_b64decode(token.encode()).decode().split(".")
+        return int(txid), int(event_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid position: {token}")
+
+
+# Событие для клиента: позиция (токен, с которого продолжать), что и как изменилось
+def change_message(change: dict) -> dict:
+    return {
+        "position": encode_position((change["txid"], change["id"])),
+        "entity": change["entity"],
+        "id": change["entity_id"],
+        "op": change["op"],
+        "changed_at": change["created_at"],
+    }
+
+
+# Лента изменений каталога в одном воркере.
+# Одно соединение слушает NOTIFY от триггеров change_events и по сигналу читает новые события
+# одним запросом, сколько бы ни было подписчиков, и раскладывает их по очередям подписок.
+# Слушающее соединение открывается отдельно от пула движка: оно занято все время жизни воркера
+# и не должно отнимать место у запросов (и портить статистику пула). Сами события читаются
+# через пул - соединение берется на один запрос, как в ручках.
+# Сигнал - только повод заглянуть в таблицу: события читаются по позиции, поэтому потерянный NOTIFY
+# (например, пока соединение переподключалось) не теряет событий - их подберет следующий сигнал
+# или проверка раз в poll_interval. Там же раз в prune_interval удаляются события старше retention.
+class ChangeFeed:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        queue_size: int = 1000,
+        batch_size: int = 1000,
+        retention: timedelta = timedelta(hours=24),
+        poll_interval: float = 5.0,
+        prune_interval: float = 3600.0,
+    ):
+        self.engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self.prune_interval = prune_interval
+        self.position: Position = START
+        self._subscriptions: Set["Subscription"] = set()
+        self._wakeup = asyncio.Event()
+        self._listener: Optional[asyncpg.Connection] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def start(self) -> None:
+        await self._listen()
+        async with self.engine.connect() as conn:
+            self.position = await fetch_change_head(conn)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._close()
+        for subscription in list(self._subscriptions):
+            subscription._end()
+
+    # Подписка с позиции after (None - с текущего момента). Подписка регистрируется до того,
+    # как она дочитает пропущенное из таблицы, поэтому событие, пришедшее между ними, не теряется.
+    async def subscribe(self, after: Optional[Position] = None) -> "Subscription":
+        if after is not None and after != START:
+            async with self.engine.connect() as conn:
+                if not await change_exists(conn, after):
+                    raise PositionExpired(encode_position(after))
+        subscription = Subscription(self, after if after is not None else self.position)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    async def fetch(self, after: Position) -> List[dict]:
+        async with self.engine.connect() as conn:
+            return await fetch_changes(conn, after, self.batch_size)
+
+    def _on_notify(self, *args: Any) -> None:
+        self._wakeup.set()
+
+    async def _listen(self) -> None:
+        url = self.engine.url.set(drivername="postgresql")
+        self._listener = await asyncpg.connect(url.render_as_string(hide_password=False))
+        await self._listener.add_listener(CHANGES_CHANNEL, self._on_notify)
+
+    async def _close(self) -> None:
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            try:
+                await listener.close()
+            except Exception:
+                logger.exception("Closing change feed listener failed")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_prune = loop.time()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                if self._listener is None or self._listener.is_closed():
+                    await self._close()
+                    await self._listen()
+                await self._dispatch()
+                if loop.time() >= next_prune:
+                    async with self.engine.connect() as conn:
+                        deleted = await prune_changes(conn, self.retention)
+                    logger.info("Pruned %s change events", deleted)
+                    next_prune = loop.time() + self.prune_interval
+            except Exception:
+                # Соединение оборвалось: переподключимся на следующем круге и дочитаем с той же позиции
+                logger.exception("Change feed failed, retrying")
+
+    async def _dispatch(self) -> None:
+        while True:
+            changes = await self.fetch(self.position)
+            for change in changes:
+                for subscription in list(self._subscriptions):
+                    subscription._put(change)
+            if changes:
+                self.position = (changes[-1]["txid"], changes[-1]["id"])
+            if len(changes) < self.batch_size:
+                return
+
+
+# Подписка одного клиента. Сначала дочитывает события после своей позиции из таблицы,
+# потом получает их из общей рассылки ленты. Подписчик, который не успевает разбирать свою очередь,
+# отключается от рассылки: он получит то, что уже в очереди, и подписка закончится - клиент
+# переподключится с последней позицией и дочитает остальное из таблицы, не тормозя остальных.
+class Subscription:
+    def __init__(self, feed: ChangeFeed, position: Position):
+        self.feed = feed
+        self.position = position
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue(feed.queue_size)
+        self._backlog: Deque[dict] = deque()
+        self._catching_up = position != feed.position
+        self._ended = False
+
+    # Следующее событие; None, если за timeout секунд ничего не пришло
+    async def next(self, timeout: Optional[float] = None) -> Optional[dict]:
+        while True:
+            if self._backlog:
+                return self._advance(self._backlog.popleft())
+            if self._catching_up:
+                changes = await self.feed.fetch(self.position)
+                self._backlog.extend(changes)
+                self._catching_up = len(changes) == self.feed.batch_size
+                continue
+            if self._ended and self._queue.empty():
+                raise SubscriptionEnded()
+
+            try:
+                change = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+            if change is _END:
+                raise SubscriptionEnded()
+            if (change["txid"], change["id"]) > self.position:
+                return self._advance(change)
+
+    def close(self) -> None:
+        self.feed._subscriptions.discard(self)
+
+    def _advance(self, change: dict) -> dict:
+        self.position = (change["txid"], change["id"])
+        return change
+
+    def _put(self, change: dict) -> None:
+        try:
+            self._queue.put_nowait(change)
+        except asyncio.QueueFull:
+            logger.warning("Change feed subscriber is too slow, disconnecting it")
+            self.close()
+            self._ended = True
+
+    def _end(self) -> None:
+        self.close()
+        self._ended = True
+        try:
+            self._queue.put_nowait(_END)
+        except asyncio.QueueFull:
+            pass
@@ -1,3 +1,6 @@
+from .admission import *
+from .cache import *
+from .changes import *
 from .database import *
 
-__all__ = database.__all__
+__all__ = admission.__all__ + cache.__all__ + changes.__all__ + database.__all__
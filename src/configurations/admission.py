@@ -0,0 +1,114 @@
+import logging
+from typing import AsyncIterator, Optional
+
+from fastapi import Depends, HTTPException, Request
+
+from src.admission import (
+    READ,
+    WRITE,
+    AdmissionController,
+    AdmissionLimits,
+    AdmissionRejected,
+    MemoryRateLimitStore,
+    RateLimitStore,
+    RedisRateLimitStore,
+)
+from src.configurations.database import get_recent_pool_wait
+from src.configurations.replicas import SAFE_METHODS
+from src.configurations.settings import settings
+
+__all__ = ["init_admission", "get_admission", "admit_request"]
+
+logger = logging.getLogger(__name__)
+
+__admission: Optional[AdmissionController] = None
+
+
+def _limits(max_in_flight: int, max_pool_wait_ms: float, rate: float) -> AdmissionLimits:
+    return AdmissionLimits(
+        max_in_flight=max_in_flight,
+        max_pool_wait=max_pool_wait_ms / 1000,
+        rate=rate,
+        burst=max(1.0, rate * settings.rate_limit_burst_seconds),
+    )
+
+
+def _rate_limit_store() -> RateLimitStore:
+    if settings.rate_limit_backend == "redis":
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise ValueError({"message": "RATE_LIMIT_BACKEND=redis requires the `redis` package"})
+
+        if not settings.redis_url:
+            raise ValueError({"message": "RATE_LIMIT_BACKEND=redis requires REDIS_URL"})
+
+        return RedisRateLimitStore(Redis.from_url(settings.redis_url))
+    return MemoryRateLimitStore()
+
+
+def init_admission() -> None:
+    global __admission
+
+    if __admission:
+        return
+
+    if settings.admission_enabled:
+        reads = _limits(
+            settings.admission_max_reads, settings.admission_read_max_pool_wait_ms, settings.rate_limit_reads_per_second
+        )
+        writes = _limits(
+            settings.admission_max_writes,
+            settings.admission_write_max_pool_wait_ms,
+            settings.rate_limit_writes_per_second,
+        )
+    else:
+        reads, writes = AdmissionLimits(), AdmissionLimits()
+
+    # чтение идет и с реплик, запись - только в основную базу
+    __admission = AdmissionController(
+        reads,
+        writes,
+        store=_rate_limit_store(),
+        pool_wait=lambda kind: get_recent_pool_wait(include_replicas=kind == READ),
+    )
+    logger.info("Admission control: reads %s, writes %s", reads, writes)
+
+
+def get_admission() -> AdmissionController:
+    global __admission
+
+    if not __admission:
+        raise ValueError(
+            {"message": "You must call init_admission() before using this method"}
+        )
+
+    return __admission
+
+
+# Клиент для лимитов: значение заголовка rate_limit_client_header, если он задан и пришел, иначе IP
+def _client_key(request: Request) -> str:
+    if settings.rate_limit_client_header:
+        value = request.headers.get(settings.rate_limit_client_header)
+        if value:
+            return value
+    return request.client.host if request.client else "unknown"
+
+
+# Зависимость роутеров книг и продавцов: решается раньше зависимостей ручки (сессии БД),
+# поэтому отклоненный запрос не берет соединение из пула. Место держится, пока ручка работает.
+async def admit_request(
+    request: Request, admission: AdmissionController = Depends(get_admission)
+) -> AsyncIterator[None]:
+    kind = READ if request.method in SAFE_METHODS else WRITE
+    try:
+        await admission.acquire(kind, _client_key(request))
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code, detail=f"Request rejected: {e.reason}", headers={"Retry-After": str(e.retry_after)}
+        )
+
+    try:
+        yield
+    finally:
+        admission.release(kind)
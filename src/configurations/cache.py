@@ -0,0 +1,62 @@
+import logging
+from typing import Optional
+
+from fastapi import Depends, Request
+
+from src.cache import Cache, MemoryCache, NullCache, RedisCache
+from src.configurations.replicas import reads_from_primary
+from src.configurations.settings import settings
+
+__all__ = ["init_cache", "get_cache", "get_read_cache"]
+
+logger = logging.getLogger(__name__)
+
+__cache: Optional[Cache] = None
+
+
+def init_cache() -> None:
+    global __cache
+
+    if __cache:
+        return
+
+    # реплика может отставать не дольше окна read-your-writes - столько после сброса ключа
+    # прочитанное с реплики не кэшируется
+    replica_lag = settings.read_your_writes_seconds if settings.db_replica_urls else 0.0
+
+    if settings.cache_backend == "redis":
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise ValueError({"message": "CACHE_BACKEND=redis requires the `redis` package"})
+
+        if not settings.redis_url:
+            raise ValueError({"message": "CACHE_BACKEND=redis requires REDIS_URL"})
+
+        __cache = RedisCache(Redis.from_url(settings.redis_url), ttl=settings.cache_ttl, replica_lag=replica_lag)
+    elif settings.cache_backend == "memory":
+        __cache = MemoryCache(max_size=settings.cache_max_size, ttl=settings.cache_ttl, replica_lag=replica_lag)
+    else:
+        __cache = NullCache()
+
+    logger.info("Response cache: %s", type(__cache).__name__)
+
+
+def get_cache() -> Cache:
+    global __cache
+
+    if not __cache:
+        raise ValueError(
+            {"message": "You must call init_cache() before using this method"}
+        )
+
+    return __cache
+
+
+# Кэш для ручек чтения. Клиент, который только что записал (кука read-your-writes), читает мимо кэша:
+# в кэше может лежать ответ, собранный до его записи, а собранный для него с основной базы ответ
+# незачем делить с теми, кто читает с реплик. Ручки записи берут get_cache - сбрасывать кэш нужно всегда.
+def get_read_cache(request: Request, cache: Cache = Depends(get_cache)) -> Cache:
+    if reads_from_primary(request):
+        return NullCache()
+    return cache
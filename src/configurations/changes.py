@@ -0,0 +1,48 @@
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from src.changes import ChangeFeed
+from src.configurations.database import get_engine
+from src.configurations.settings import settings
+
+__all__ = ["start_change_feed", "stop_change_feed", "get_change_feed"]
+
+logger = logging.getLogger(__name__)
+
+__change_feed: Optional[ChangeFeed] = None
+
+
+# Лента изменений воркера: одно соединение LISTEN на воркер, сколько бы ни было подписчиков
+async def start_change_feed() -> None:
+    global __change_feed
+
+    if __change_feed:
+        return
+
+    __change_feed = ChangeFeed(
+        get_engine(),
+        queue_size=settings.change_feed_queue_size,
+        retention=timedelta(hours=settings.change_retention_hours),
+    )
+    await __change_feed.start()
+    logger.info("Change feed started at %s", __change_feed.position)
+
+
+async def stop_change_feed() -> None:
+    global __change_feed
+
+    if __change_feed:
+        await __change_feed.stop()
+        __change_feed = None
+
+
+def get_change_feed() -> ChangeFeed:
+    global __change_feed
+
+    if not __change_feed:
+        raise ValueError(
+            {"message": "You must call start_change_feed() before using this method"}
+        )
+
+    return __change_feed
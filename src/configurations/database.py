@@ -1,6 +1,8 @@
 import logging
 
-from typing import AsyncGenerator, Callable, Optional
+from typing import AsyncGenerator, Callable, List, Optional
+
+from fastapi import Request
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -8,32 +10,96 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 
-from src.models.base import BaseModel
+from src.configurations.pool import InstrumentedAsyncPool
+from src.configurations.replicas import ReadRouter
 from src.configurations.settings import settings
-
-__all__ = ["global_init", "get_async_session", "create_db_and_tables"]
+from src.metrics import instrument_engine, record_db_time
+
+__all__ = [
+    "global_init",
+    "get_write_session",
+    "get_read_session",
+    "read_sessionmaker",
+    "begin_snapshot",
+    "prepare_db_schema",
+    "get_pool_stats",
+    "get_engine",
+    "get_recent_pool_wait",
+    "is_replica_session",
+]
 
 logger = logging.getLogger("__name__")
 
 __async_engine: Optional[AsyncEngine] = None
 __session_factory: Optional[Callable[[], AsyncSession]] = None
+__replica_engines: List[AsyncEngine] = []
+__read_router: Optional[ReadRouter] = None
 
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
 
+# Движок со своим пулом соединений; у основной базы и у каждой реплики он отдельный
+def _create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url=url,
+        echo=not settings.is_production,  # логирование каждого SQL-запроса только в dev
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.max_connection_count,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_pre_ping=settings.pool_pre_ping,
+        pool_recycle=settings.pool_recycle,
+        connect_args={"prepared_statement_cache_size": settings.statement_cache_size},
+    )
+    instrument_engine(engine, slow_query_ms=settings.slow_query_ms)
+    return engine
+
+
+# Сессии для чтения работают в автокоммите: соединение берется из пула только при первом запросе,
+# каждый SELECT выполняется сам по себе, и в БД не уходят ни BEGIN, ни COMMIT/ROLLBACK.
+# Пул у них общий с движком - это тот же движок с другими опциями.
+# Сессии реплик помечены в session.info (см. is_replica_session).
+def read_sessionmaker(engine: AsyncEngine, replica: bool = False) -> async_sessionmaker:
+    return async_sessionmaker(
+        engine.execution_options(isolation_level="AUTOCOMMIT"), autoflush=False, info={"replica": replica}
+    )
+
+
+# Сессия читает с реплики - ее данные могут отставать от основной базы
+def is_replica_session(session: AsyncSession) -> bool:
+    return session.info.get("replica", False)
+
+
+# Серверный курсор (выгрузка потоком) работает только внутри транзакции, а сессии чтения - в автокоммите.
+# Для него соединение сессии переводится в транзакцию только для чтения со снимком данных на всю выгрузку
+# (после возврата в пул соединение снова в автокоммите). Сессия, привязанная к соединению
+# (как в тестах), уже в его транзакции - ее оставляем как есть.
+async def begin_snapshot(session: AsyncSession) -> None:
+    if isinstance(session.bind, AsyncEngine):
+        await session.connection(
+            execution_options={"isolation_level": "REPEATABLE READ", "postgresql_readonly": True}
+        )
+
+
 def global_init() -> None:
-    global __async_engine, __session_factory
+    global __async_engine, __session_factory, __replica_engines, __read_router
 
     if __session_factory:
         return
 
     if not __async_engine:
-        __async_engine = create_async_engine(url=SQLALCHEMY_DATABASE_URL, echo=True)
+        __async_engine = _create_engine(SQLALCHEMY_DATABASE_URL)
+        __replica_engines = [_create_engine(url) for url in settings.db_replica_urls]
 
     __session_factory = async_sessionmaker(__async_engine)
+    __read_router = ReadRouter(
+        read_sessionmaker(__async_engine), [read_sessionmaker(engine, replica=True) for engine in __replica_engines]
+    )
 
 
-async def get_async_session() -> AsyncGenerator:
+# Сессия для ручек записи - всегда основная база. Коммитит, только если ручка начала транзакцию
+# и не закрыла ее сама; незакоммиченное (например, после ошибки) откатывает закрытие сессии.
+async def get_write_session() -> AsyncGenerator:
     global __session_factory
 
     if not __session_factory:
@@ -45,18 +111,38 @@ async def get_async_session() -> AsyncGenerator:
 
     try:
         yield session
-        await session.commit()
+        if session.in_transaction():
+            with record_db_time():
+                await session.commit()
     except Exception as e:
         logger.error("Raises exception: %s", e)
         raise e
     finally:
-        await session.rollback()
-        await session.close()
+        with record_db_time():
+            await session.close()
+
+
+# Сессия для ручек чтения: реплика (по очереди), а если реплик нет или клиент только что
+# что-то записал (кука read-your-writes) - основная база. Работает в автокоммите (read_sessionmaker).
+async def get_read_session(request: Request) -> AsyncGenerator:
+    global __read_router
+
+    if not __read_router:
+        raise ValueError(
+            {"message": "You must call global_init() before using this method"}
+        )
+
+    session: AsyncSession = __read_router.session_factory(request)()
 
+    try:
+        yield session
+    finally:
+        with record_db_time():
+            await session.close()
 
-async def create_db_and_tables():
-    from src.models.books import Book
 
+# Движок основной базы - для фоновых задач воркера, которым нужны свои соединения (лента изменений)
+def get_engine() -> AsyncEngine:
     global __async_engine
 
     if __async_engine is None:
@@ -64,6 +150,51 @@ async def create_db_and_tables():
             {"message": "You must call global_init() before using this method"}
         )
 
-    async with __async_engine.begin() as conn:
-        await conn.run_sync(BaseModel.metadata.drop_all)
-        await conn.run_sync(BaseModel.metadata.create_all)
+    return __async_engine
+
+
+# Текущее ожидание соединения из пула основной базы (и реплик, если include_replicas), в секундах -
+# по самому загруженному пулу. Для допуска запросов (src/admission).
+def get_recent_pool_wait(include_replicas: bool = False) -> float:
+    global __async_engine, __replica_engines
+
+    if __async_engine is None:
+        return 0.0
+
+    engines = [__async_engine, *__replica_engines] if include_replicas else [__async_engine]
+    return max(engine.pool.recent_wait() for engine in engines)
+
+
+# Статистика пула основной базы и, в replicas, пулов реплик (в порядке DB_REPLICA_URLS)
+def get_pool_stats() -> dict:
+    global __async_engine, __replica_engines
+
+    if __async_engine is None:
+        raise ValueError(
+            {"message": "You must call global_init() before using this method"}
+        )
+
+    replicas = [
+        {"host": f"{engine.url.host}:{engine.url.port or 5432}", **engine.pool.stats()} for engine in __replica_engines
+    ]
+    return {**__async_engine.pool.stats(), "replicas": replicas}
+
+
+# Подготовка схемы БД при старте приложения. Данные не трогает.
+# По умолчанию только сверяет версию схемы с последней миграцией (один SELECT) и падает,
+# если база отстает. С migrate_on_startup сначала применяет недостающие миграции -
+# под advisory-блокировкой, так что одновременно стартующие воркеры не мешают друг другу.
+async def prepare_db_schema():
+    from src.migrations import check_schema, upgrade
+
+    global __async_engine
+
+    if __async_engine is None:
+        raise ValueError(
+            {"message": "You must call global_init() before using this method"}
+        )
+
+    if settings.migrate_on_startup:
+        await upgrade(__async_engine)
+
+    await check_schema(__async_engine)
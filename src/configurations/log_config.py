@@ -0,0 +1,38 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from icecream import ic
+
+from src.configurations.settings import settings
+
+__all__ = ["setup_logging"]
+
+
+# Настраивает логирование под профиль запуска.
+# dev - все пишется сразу в stderr, icecream включен, SQL логируется движком (см. global_init).
+# prod - обработчики только кладут записи в очередь, а в поток вывода их пишет отдельный
+# поток QueueListener, так что цикл событий не блокируется на stdout; icecream выключен.
+# Возвращает слушателя очереди, которого нужно остановить при завершении приложения.
+def setup_logging() -> Optional[QueueListener]:
+    root = logging.getLogger()
+    root.setLevel(settings.log_level)
+
+    if not settings.is_production:
+        logging.basicConfig(level=settings.log_level)
+        ic.enable()
+        return None
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root.handlers = [QueueHandler(log_queue)]
+    listener.start()
+
+    # Если ic все же включат руками, вывод пойдет через ту же очередь, а не напрямую в stderr
+    ic.configureOutput(outputFunction=logging.getLogger("icecream").debug)
+    ic.disable()
+    return listener
@@ -0,0 +1,85 @@
+import math
+import time
+from typing import List
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+from src.metrics import current_request_metrics
+
+__all__ = ["InstrumentedAsyncPool"]
+
+# За сколько секунд недавнее ожидание соединения забывается в e раз
+RECENT_WAIT_DECAY = 1.0
+
+
+# Пул соединений, который дополнительно считает, сколько запросы ждали соединение.
+# Время ожидания - от запроса соединения до его выдачи (включая pre-ping и
+# открытие нового соединения, если пул его создает).
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self._recent_wait = 0.0
+        self._recent_wait_at = time.perf_counter()
+        self._waiting_since: List[float] = []
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        self.waiting += 1
+        self._waiting_since.append(started)
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            self._record_wait(time.perf_counter() - started)
+            raise
+        finally:
+            self.waiting -= 1
+            self._waiting_since.remove(started)
+
+        waited = time.perf_counter() - started
+        self.checkouts += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+        self._record_wait(waited)
+
+        metrics = current_request_metrics()
+        if metrics is not None:
+            metrics.pool_wait += waited
+        return connection
+
+    # Насколько пул перегружен сейчас (секунды): недавнее ожидание соединения, которое затухает
+    # со временем, или ожидание самого давнего из тех, кто ждет прямо сейчас, - что больше.
+    # По нему допуск запросов (src/admission) отклоняет работу, которой соединения все равно не дождаться.
+    def recent_wait(self) -> float:
+        now = time.perf_counter()
+        oldest = now - self._waiting_since[0] if self._waiting_since else 0.0
+        return max(self._decayed_wait(now), oldest)
+
+    def _decayed_wait(self, now: float) -> float:
+        return self._recent_wait * math.exp(-(now - self._recent_wait_at) / RECENT_WAIT_DECAY)
+
+    def _record_wait(self, waited: float) -> None:
+        now = time.perf_counter()
+        self._recent_wait = max(self._decayed_wait(now), waited)
+        self._recent_wait_at = now
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_time_avg": self.wait_time_total / self.checkouts if self.checkouts else 0.0,
+            "wait_time_max": self.wait_time_max,
+            "wait_time_recent": self.recent_wait(),
+        }
@@ -0,0 +1,80 @@
+import itertools
+import math
+import time
+from typing import Callable, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+__all__ = [
+    "ReadRouter",
+    "ReadYourWritesMiddleware",
+    "READ_YOUR_WRITES_COOKIE",
+    "reads_from_primary",
+    "read_only_request",
+]
+
+# Кука с моментом (unix time), до которого чтения клиента идут в основную базу
+READ_YOUR_WRITES_COOKIE = "read_primary_until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Флаг в request.state: запрос не на запись, хотя метод и не GET
+READ_ONLY_STATE = "read_only"
+
+SessionFactory = Callable[[], AsyncSession]
+
+
+# Клиент недавно что-то записал: реплика может еще не догнать основную базу,
+# поэтому его чтения какое-то время идут в основную (read-your-writes)
+def reads_from_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies[READ_YOUR_WRITES_COOKIE]) > time.time()
+    except (KeyError, ValueError):
+        return False
+
+
+# Зависимость для ручек чтения с методом POST (например, POST /books/batch): после них кука
+# read-your-writes не ставится - иначе клиент потом читал бы с основной базы и мимо кэша
+def read_only_request(request: Request) -> None:
+    setattr(request.state, READ_ONLY_STATE, True)
+
+
+# Выбор базы для чтения: реплики по очереди, а без реплик или сразу после записи клиента - основная база
+class ReadRouter:
+    def __init__(self, primary: SessionFactory, replicas: Sequence[SessionFactory] = ()):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self._next_replica = itertools.cycle(self.replicas) if self.replicas else None
+
+    def session_factory(self, request: Request) -> SessionFactory:
+        if self._next_replica is None or reads_from_primary(request):
+            return self.primary
+        return next(self._next_replica)
+
+
+# ASGI-middleware: после успешного запроса на запись (не GET/HEAD/OPTIONS и не read_only_request,
+# статус < 400) ставит клиенту куку read-your-writes на window секунд. window = 0 - выключено.
+class ReadYourWritesMiddleware:
+    def __init__(self, app: ASGIApp, window: float = 5.0):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or self.window <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        # тот же словарь станет request.state в ручке
+        state = scope.setdefault("state", {})
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400 and not state.get(READ_ONLY_STATE):
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{READ_YOUR_WRITES_COOKIE}={time.time() + self.window:.3f}; "
+                    f"Max-Age={math.ceil(self.window)}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
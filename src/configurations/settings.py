@@ -1,14 +1,75 @@
+from typing import List, Literal, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    # профиль запуска: dev - отладочный вывод и логирование SQL, prod - без них
+    app_env: Literal["dev", "prod"] = "dev"
+    log_level: str = "INFO"
+    # применять миграции при старте (удобно в dev); иначе при старте только проверяется версия схемы
+    migrate_on_startup: bool = False
+
     # for PostgreSQL
     db_host: str
     db_name: str
     db_username: str
     db_password: str
     db_test_name: str = "fastapi_project_test_db"
-    max_connection_count: int = 10
+    # пул соединений, по одному на каждый воркер uvicorn
+    max_connection_count: int = 10  # постоянные соединения в пуле (pool_size)
+    max_overflow: int = 5  # сколько соединений можно открыть сверх пула при пиковой нагрузке
+    pool_timeout: float = 30.0  # секунд ждать свободное соединение, потом ошибка
+    pool_pre_ping: bool = True  # проверять соединение перед выдачей из пула
+    pool_recycle: int = 1800  # секунд жизни соединения, потом оно переоткрывается
+    statement_cache_size: int = 100  # кэш подготовленных запросов asyncpg на соединение (0 - выключен)
+    # реплики для чтения (JSON-список URL): ручки GET читают с них по очереди, у каждой свой пул.
+    # Пусто - все запросы идут в основную базу
+    db_replica_urls: List[str] = []
+    # секунд после записи, в течение которых чтения этого клиента идут в основную базу (0 - выключено)
+    read_your_writes_seconds: float = 5.0
+
+    # продавец, у которого книг больше порога, удаляется фоновой задачей пачками по seller_purge_batch_size книг;
+    # остальные - одним DELETE (книги удаляет каскад внешнего ключа)
+    seller_purge_threshold: int = 10_000
+    seller_purge_batch_size: int = 5_000
+
+    # лента изменений (GET /api/v1/changes): сколько событий ждут отправки одному подписчику, пока его
+    # не отключат как медленного; сколько часов события хранятся - с более старой позиции продолжить нельзя
+    change_feed_queue_size: int = 1000
+    change_retention_hours: float = 24.0
+    change_keepalive_seconds: float = 15.0  # пустое сообщение SSE/ping WebSocket, пока событий нет
+
+    # допуск запросов к ручкам книг и продавцов (src/admission). Сколько запросов чтения и записи
+    # выполняется одновременно (сверх - 503), и при каком ожидании соединения из пула (мс) запросы
+    # отклоняются сразу (503): чтение - раньше, чем запись
+    admission_enabled: bool = True
+    admission_max_reads: int = 200
+    admission_max_writes: int = 50
+    admission_read_max_pool_wait_ms: float = 250.0
+    admission_write_max_pool_wait_ms: float = 1000.0
+    # лимит запросов одного клиента в секунду (token bucket, сверх - 429; 0 - без лимита) и запас на всплеск,
+    # в секундах лимита. Клиент - значение заголовка rate_limit_client_header (например, X-Api-Key), без него - IP.
+    # memory - счетчики в памяти воркера, redis - общие для всех воркеров (REDIS_URL)
+    rate_limit_reads_per_second: float = 0.0
+    rate_limit_writes_per_second: float = 0.0
+    rate_limit_burst_seconds: float = 2.0
+    rate_limit_client_header: Optional[str] = None
+    rate_limit_backend: Literal["memory", "redis"] = "memory"
+
+    # кэш ответов для чтения одной книги/продавца: memory - в памяти воркера, redis - общий, none - выключен
+    cache_backend: Literal["memory", "redis", "none"] = "memory"
+    cache_ttl: float = 30.0  # секунд
+    cache_max_size: int = 10_000  # записей, только для memory
+    redis_url: Optional[str] = None
+
+    # метрики запросов (/metrics): отдавать ли замеры клиенту в заголовке Server-Timing
+    server_timing: bool = True
+    slow_query_ms: Optional[float] = None  # логировать SQL-запросы дольше порога в мс (None - выключено)
+
+    @property
+    def is_production(self) -> bool:
+        return self.app_env == "prod"
 
     @property
     def database_url(self) -> str:
@@ -0,0 +1,3 @@
+from .purges import *
+
+__all__ = purges.__all__
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import Cache, book_key, seller_key
+from src.models.books import Book
+from src.models.purges import SellerPurge
+from src.models.sellers import Seller
+
+__all__ = ["claim_seller_purge", "fetch_seller_purge", "start_seller_purge", "purge_seller", "wait_for_purges"]
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Задача, которая столько не продвигалась, считается брошенной (воркер перезапустили посреди удаления):
+# повторный DELETE продавца запустит ее заново - для книг, которые еще остались
+STALE_AFTER = timedelta(minutes=1)
+
+PURGE_COLUMNS = (
+    SellerPurge.seller_id,
+    SellerPurge.status,
+    SellerPurge.total_books,
+    SellerPurge.deleted_books,
+    SellerPurge.error,
+    SellerPurge.started_at,
+    SellerPurge.finished_at,
+)
+
+# Идущие задачи этого процесса: ссылка на задачу нужна, чтобы ее не собрал сборщик мусора
+_running: Dict[int, "asyncio.Task[None]"] = {}
+
+
+# Записывает задачу удаления продавца. Возвращает ее состояние, если задачу нужно запускать,
+# и None, если она уже идет (в этом или другом воркере) и не брошена.
+async def claim_seller_purge(session: AsyncSession, seller_id: int, total_books: int) -> Optional[Dict[str, Any]]:
+    restart = {
+        "status": RUNNING,
+        "total_books": total_books,
+        "deleted_books": 0,
+        "error": None,
+        "started_at": func.now(),
+        "updated_at": func.now(),
+        "finished_at": None,
+    }
+    result = await session.execute(
+        insert(SellerPurge)
+        .values(seller_id=seller_id, status=RUNNING, total_books=total_books)
+        .on_conflict_do_update(
+            index_elements=[SellerPurge.seller_id],
+            set_=restart,
+            where=(SellerPurge.status != RUNNING) | (SellerPurge.updated_at < func.now() - STALE_AFTER),
+        )
+        .returning(*PURGE_COLUMNS)
+    )
+    row = result.mappings().first()
+    return dict(row) if row else None
+
+
+async def fetch_seller_purge(session: AsyncSession, seller_id: int) -> Optional[Dict[str, Any]]:
+    result = await session.execute(select(*PURGE_COLUMNS).where(SellerPurge.seller_id == seller_id))
+    row = result.mappings().first()
+    return dict(row) if row else None
+
+
+def start_seller_purge(bind: Any, cache: Cache, seller_id: int, batch_size: int) -> None:
+    if seller_id in _running:
+        return
+    task = asyncio.create_task(purge_seller(bind, cache, seller_id, batch_size))
+    _running[seller_id] = task
+    task.add_done_callback(lambda _: _running.pop(seller_id, None))
+
+
+# Удаляет книги продавца пачками по batch_size, каждая пачка - своя короткая транзакция
+# со своим соединением из пула, поэтому ни запрос, ни соединение не держатся на все время удаления.
+# После каждой пачки в seller_purges обновляется прогресс, из кэша сбрасываются удаленные книги.
+# Когда книг не осталось, удаляется сам продавец (книги, добавленные за это время, удалит каскад).
+async def purge_seller(bind: Any, cache: Cache, seller_id: int, batch_size: int) -> None:
+    logger.info("Purging seller %s", seller_id)
+    try:
+        while True:
+            batch = select(Book.id).where(Book.seller_id == seller_id).order_by(Book.id).limit(batch_size)
+            async with AsyncSession(bind=bind) as session:
+                result = await session.execute(
+                    delete(Book)
+                    .where(Book.id.in_(batch.scalar_subquery()))
+                    .returning(Book.id)
+                    .execution_options(synchronize_session=False)
+                )
+                ids = result.scalars().all()
+                await session.execute(
+                    update(SellerPurge)
+                    .where(SellerPurge.seller_id == seller_id)
+                    .values(deleted_books=SellerPurge.deleted_books + len(ids), updated_at=func.now())
+                )
+                await session.commit()
+
+            await cache.delete(seller_key(seller_id), *map(book_key, ids))
+            if len(ids) < batch_size:
+                break
+
+        async with AsyncSession(bind=bind) as session:
+            await session.execute(delete(Seller).where(Seller.id == seller_id))
+            await session.execute(
+                update(SellerPurge)
+                .where(SellerPurge.seller_id == seller_id)
+                .values(status=DONE, updated_at=func.now(), finished_at=func.now())
+            )
+            await session.commit()
+        await cache.delete(seller_key(seller_id))
+        logger.info("Seller %s purged", seller_id)
+    except Exception as e:
+        logger.exception("Purge of seller %s failed", seller_id)
+        async with AsyncSession(bind=bind) as session:
+            await session.execute(
+                update(SellerPurge)
+                .where(SellerPurge.seller_id == seller_id)
+                .values(status=FAILED, error=str(e), updated_at=func.now(), finished_at=func.now())
+            )
+            await session.commit()
+
+
+# Дождаться всех идущих в этом процессе задач (для тестов)
+async def wait_for_purges() -> None:
+    await asyncio.gather(*_running.values(), return_exceptions=True)
@@ -2,17 +2,31 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
-from src.configurations.database import create_db_and_tables, global_init
-from src.routers import v1_router
+from src.configurations.admission import init_admission
+from src.configurations.cache import init_cache
+from src.configurations.changes import start_change_feed, stop_change_feed
+from src.configurations.database import global_init, prepare_db_schema
+from src.configurations.log_config import setup_logging
+from src.configurations.replicas import ReadYourWritesMiddleware
+from src.configurations.settings import settings
+from src.metrics import MetricsMiddleware
+from src.routers import internal_router, metrics_router, v1_router
 from icecream import ic
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    log_listener = setup_logging()
     ic("I am here!")
     global_init()
-    await create_db_and_tables()
+    init_cache()
+    init_admission()
+    await prepare_db_schema()
+    await start_change_feed()
     yield
+    await stop_change_feed()
+    if log_listener:
+        log_listener.stop()
 
 
 # Само приложение fastApi. именно оно запускается сервером и служит точкой входа
@@ -28,3 +42,10 @@ app = FastAPI(
 
 
 app.include_router(v1_router)
+app.include_router(internal_router)
+app.include_router(metrics_router)
+
+# Замеры каждого запроса: /metrics и заголовок Server-Timing
+app.add_middleware(MetricsMiddleware, server_timing=settings.server_timing)
+# После записи клиент какое-то время читает из основной базы, а не с реплик
+app.add_middleware(ReadYourWritesMiddleware, window=settings.read_your_writes_seconds)
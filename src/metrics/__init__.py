@@ -0,0 +1,7 @@
+from .context import *
+from .db import *
+from .middleware import *
+from .registry import *
+from .routing import *
+
+__all__ = context.__all__ + db.__all__ + middleware.__all__ + registry.__all__ + routing.__all__
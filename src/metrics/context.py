@@ -0,0 +1,59 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, Tuple
+
+__all__ = ["RequestMetrics", "current_request_metrics", "record_db_time"]
+
+
+# Замеры одного HTTP-запроса. Создаются в MetricsMiddleware и доступны через contextvar
+# всему, что выполняется в рамках запроса: событиям движка SQLAlchemy, пулу соединений, роутам.
+# Время - в секундах.
+@dataclass
+class RequestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    route: Optional[str] = None  # шаблон пути ручки, например /api/v1/books/{book_id}
+    db_statements: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+    # время этапов обработки без учета работы с БД: validation, serialization
+    phases: Dict[str, float] = field(default_factory=dict)
+    _phase: Optional[Tuple[str, float, float]] = None
+
+    def _db_elapsed(self) -> float:
+        return self.db_time + self.pool_wait
+
+    def start_phase(self, name: str) -> None:
+        self._phase = (name, time.perf_counter(), self._db_elapsed())
+
+    def finish_phase(self) -> None:
+        if self._phase is None:
+            return
+        name, started, db_before = self._phase
+        self._phase = None
+        spent = time.perf_counter() - started - (self._db_elapsed() - db_before)
+        self.phases[name] = self.phases.get(name, 0.0) + max(spent, 0.0)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+_request_metrics: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current_request_metrics() -> Optional[RequestMetrics]:
+    return _request_metrics.get()
+
+
+# Учитывает блок как время работы с БД текущего запроса.
+# Нужен для обращений, которые не проходят через события курсора, например COMMIT.
+@contextmanager
+def record_db_time() -> Iterator[None]:
+    metrics = _request_metrics.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.db_time += time.perf_counter() - started
@@ -0,0 +1,62 @@
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .context import current_request_metrics
+from .registry import REGISTRY, Counter
+
+__all__ = ["instrument_engine"]
+
+logger = logging.getLogger(__name__)
+
+DB_SLOW_QUERIES = REGISTRY.register(
+    Counter("db_slow_queries_total", "SQL statements slower than the slow query threshold")
+)
+
+# Время старта выполняемых запросов хранится в info соединения стеком -
+# на случай вложенных вызовов внутри одного соединения
+_STARTED_KEY = "metrics_query_started"
+
+
+# Подключает к движку подсчет SQL-запросов и их времени для текущего HTTP-запроса.
+# slow_query_ms - порог в миллисекундах для лога медленных запросов (None - лог выключен).
+def instrument_engine(engine: AsyncEngine, slow_query_ms: Optional[float] = None) -> None:
+    sync_engine = engine.sync_engine
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info[_STARTED_KEY].pop()
+
+        metrics = current_request_metrics()
+        if metrics is not None:
+            metrics.db_statements += 1
+            metrics.db_time += elapsed
+
+        if slow_query_ms is not None and elapsed * 1000 >= slow_query_ms:
+            DB_SLOW_QUERIES.inc()
+            logger.warning(
+                "Slow query (%.1f ms, route %s): %s",
+                elapsed * 1000,
+                metrics.route if metrics is not None else None,
+                statement,
+            )
+
+    # Запрос упал - время до ошибки тоже считаем, чтобы не терять медленные падения по таймауту
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is None or not conn.info.get(_STARTED_KEY):
+            return
+        elapsed = time.perf_counter() - conn.info[_STARTED_KEY].pop()
+        metrics = current_request_metrics()
+        if metrics is not None:
+            metrics.db_statements += 1
+            metrics.db_time += elapsed
+
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,98 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .context import RequestMetrics, _request_metrics
+from .registry import REGISTRY, Counter, Histogram
+
+__all__ = ["MetricsMiddleware", "server_timing_header"]
+
+LABELS = ("method", "route")
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUESTS = REGISTRY.register(
+    Counter("http_requests_total", "HTTP requests", LABELS + ("status",))
+)
+HTTP_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency",
+        LABELS,
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    )
+)
+HTTP_REQUEST_DB_STATEMENTS = REGISTRY.register(
+    Histogram(
+        "http_request_db_statements",
+        "SQL statements issued per HTTP request",
+        LABELS,
+        buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+    )
+)
+HTTP_REQUEST_DB_SECONDS = REGISTRY.register(
+    Counter("http_request_db_seconds_total", "Time spent executing SQL statements", LABELS)
+)
+HTTP_REQUEST_POOL_WAIT_SECONDS = REGISTRY.register(
+    Counter("http_request_pool_wait_seconds_total", "Time spent waiting for a pooled DB connection", LABELS)
+)
+HTTP_REQUEST_VALIDATION_SECONDS = REGISTRY.register(
+    Counter("http_request_validation_seconds_total", "Time spent parsing and validating requests", LABELS)
+)
+HTTP_REQUEST_SERIALIZATION_SECONDS = REGISTRY.register(
+    Counter("http_request_serialization_seconds_total", "Time spent validating and serializing responses", LABELS)
+)
+
+
+# Значение заголовка Server-Timing (длительности в миллисекундах, как требует стандарт)
+def server_timing_header(metrics: RequestMetrics) -> str:
+    parts = [
+        f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.db_statements} statements"',
+        f"pool;dur={metrics.pool_wait * 1000:.2f}",
+    ]
+    for name, spent in metrics.phases.items():
+        parts.append(f"{name};dur={spent * 1000:.2f}")
+    parts.append(f"total;dur={metrics.elapsed() * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def _observe(method: str, status: int, metrics: RequestMetrics) -> None:
+    labels = {"method": method, "route": metrics.route or UNMATCHED_ROUTE}
+    HTTP_REQUESTS.inc(status=str(status), **labels)
+    HTTP_REQUEST_DURATION.observe(metrics.elapsed(), **labels)
+    HTTP_REQUEST_DB_STATEMENTS.observe(metrics.db_statements, **labels)
+    HTTP_REQUEST_DB_SECONDS.inc(metrics.db_time, **labels)
+    HTTP_REQUEST_POOL_WAIT_SECONDS.inc(metrics.pool_wait, **labels)
+    HTTP_REQUEST_VALIDATION_SECONDS.inc(metrics.phases.get("validation", 0.0), **labels)
+    HTTP_REQUEST_SERIALIZATION_SECONDS.inc(metrics.phases.get("serialization", 0.0), **labels)
+
+
+# ASGI-middleware: заводит RequestMetrics на каждый HTTP-запрос, добавляет в ответ
+# заголовок Server-Timing и по завершении записывает замеры в метрики Prometheus.
+# Ответ-поток отдает заголовок до того, как тело сформировано, поэтому в его
+# Server-Timing попадает только работа до начала отправки.
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    MutableHeaders(scope=message).append("Server-Timing", server_timing_header(metrics))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_metrics.reset(token)
+            _observe(scope["method"], status_code, metrics)
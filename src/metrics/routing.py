@@ -0,0 +1,56 @@
+import asyncio
+import functools
+from typing import Any, Callable
+
+from fastapi.routing import APIRoute
+
+from .context import current_request_metrics
+
+__all__ = ["TimedRoute"]
+
+
+def _timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    if getattr(endpoint, "__timed__", False) or not asyncio.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        metrics = current_request_metrics()
+        if metrics is not None:
+            metrics.finish_phase()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if metrics is not None:
+                metrics.start_phase("serialization")
+
+    wrapper.__timed__ = True
+    return wrapper
+
+
+# Роут, который делит обработку запроса на этапы для метрик:
+# validation - разбор и проверка входных данных и зависимостей до вызова ручки,
+# serialization - проверка response_model, сериализация ответа и закрытие зависимостей после нее.
+# Время работы с БД и ожидания пула из этапов вычитается - оно учитывается отдельно.
+# Подключается через APIRouter(route_class=TimedRoute).
+class TimedRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route_path = self.path_format
+
+        async def timed_handler(request):
+            metrics = current_request_metrics()
+            if metrics is None:
+                return await handler(request)
+
+            metrics.route = route_path
+            metrics.start_phase("validation")
+            try:
+                return await handler(request)
+            finally:
+                metrics.finish_phase()
+
+        return timed_handler
@@ -0,0 +1,3 @@
+from .runner import *
+
+__all__ = runner.__all__
@@ -0,0 +1,34 @@
+""" Управление версией схемы БД.
+
+    python -m src.migrations upgrade   # применить недостающие миграции
+    python -m src.migrations current   # показать текущую версию схемы
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.configurations.settings import settings
+from src.migrations import HEAD, current_version, upgrade
+
+
+async def main(args) -> None:
+    engine = create_async_engine(args.url)
+    try:
+        if args.command == "upgrade":
+            version = await upgrade(engine)
+            print(f"Schema is at version {version}")
+        else:
+            async with engine.connect() as conn:
+                version = await current_version(conn)
+            print(f"Schema is at version {version}, latest is {HEAD}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["upgrade", "current"])
+    parser.add_argument("--url", default=settings.database_url)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+import importlib
+import logging
+import pkgutil
+from dataclasses import dataclass
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from . import versions
+
+__all__ = ["Migration", "SchemaVersionError", "MIGRATIONS", "HEAD", "current_version", "upgrade", "check_schema"]
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки Postgres, под которой применяются миграции.
+# Несколько воркеров, стартующих одновременно, выстраиваются в очередь, а не гоняются за DDL.
+MIGRATION_LOCK_ID = 73_100_007
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    revision: int
+    description: str
+    statements: List[str]
+
+
+# Миграции лежат в пакете versions, по модулю на версию: vNNNN_<описание>.py
+# с атрибутами revision, description и statements (список SQL-команд).
+def load_migrations() -> List[Migration]:
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append(Migration(module.revision, module.description, module.statements))
+
+    migrations.sort(key=lambda migration: migration.revision)
+    revisions = [migration.revision for migration in migrations]
+    if revisions != list(range(1, len(migrations) + 1)):
+        raise SchemaVersionError(f"Migration revisions must go 1, 2, 3... without gaps, got {revisions}")
+    return migrations
+
+
+MIGRATIONS = load_migrations()
+HEAD = MIGRATIONS[-1].revision
+
+
+async def current_version(conn: AsyncConnection) -> int:
+    exists = await conn.scalar(text("SELECT to_regclass(:table)"), {"table": SCHEMA_VERSION_TABLE})
+    if exists is None:
+        return 0
+    version = await conn.scalar(text(f"SELECT max(version) FROM {SCHEMA_VERSION_TABLE}"))
+    return version or 0
+
+
+# Применяет недостающие миграции в одной транзакции под advisory-блокировкой.
+# Возвращает номер версии схемы после обновления.
+async def upgrade(engine: AsyncEngine) -> int:
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+        await conn.execute(
+            text(
+                f"""
+                CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                """
+            )
+        )
+
+        version = await current_version(conn)
+        for migration in MIGRATIONS[version:]:
+            logger.info("Applying migration %s: %s", migration.revision, migration.description)
+            for statement in migration.statements:
+                await conn.execute(text(statement))
+            await conn.execute(
+                text(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description) VALUES (:version, :description)"),
+                {"version": migration.revision, "description": migration.description},
+            )
+
+    return HEAD
+
+
+# Проверка при старте приложения: один SELECT, без DDL и блокировок
+async def check_schema(engine: AsyncEngine) -> None:
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+
+    if version != HEAD:
+        raise SchemaVersionError(
+            f"Database schema version is {version}, application expects {HEAD}. "
+            "Run `python -m src.migrations upgrade`."
+        )
@@ -0,0 +1,26 @@
+# Исходная схема: продавцы и их книги.
+# IF NOT EXISTS - чтобы базы, созданные раньше через create_all, приняли эту миграцию без ошибок.
+
+revision = 1
+description = "sellers and books tables"
+
+statements = [
+    """
+    CREATE TABLE IF NOT EXISTS sellers_table (
+        id SERIAL PRIMARY KEY,
+        first_name VARCHAR(100) NOT NULL,
+        last_name VARCHAR(100) NOT NULL,
+        email VARCHAR(150) NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS books_table (
+        id SERIAL PRIMARY KEY,
+        title VARCHAR(50) NOT NULL,
+        author VARCHAR(100) NOT NULL,
+        year INTEGER NOT NULL,
+        pages INTEGER NOT NULL,
+        seller_id INTEGER REFERENCES sellers_table (id) ON DELETE CASCADE
+    )
+    """,
+]
@@ -0,0 +1,19 @@
+# Индексы под реальные запросы к книгам:
+# - (seller_id, id): книги продавца по порядку id и поиск книг при каскадном удалении продавца;
+# - lower(author), lower(title) с text_pattern_ops: поиск по началу строки без учета регистра.
+#
+# Блокировки: CREATE INDEX держит SHARE-блокировку books_table, пока строит индекс, - чтение идет,
+# а INSERT/UPDATE/DELETE книг ждут. На большой таблице это минуты простоя записи.
+# CONCURRENTLY здесь нельзя: все миграции применяются в одной транзакции (runner.upgrade).
+# Для большой живой базы индексы стоит создать заранее вручную, вне транзакции:
+#     CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_books_table_seller_id_id ON books_table (seller_id, id);
+#     (и так же два других) - тогда миграция их пропустит (IF NOT EXISTS).
+
+revision = 2
+description = "indexes for seller lookups and author/title prefix search"
+
+statements = [
+    "CREATE INDEX IF NOT EXISTS ix_books_table_seller_id_id ON books_table (seller_id, id)",
+    "CREATE INDEX IF NOT EXISTS ix_books_table_author_lower ON books_table (lower(author) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_books_table_title_lower ON books_table (lower(title) text_pattern_ops)",
+]
@@ -0,0 +1,9 @@
+# Версия строки для ETag и оптимистичной блокировки: растет на единицу при каждом UPDATE через ORM.
+
+revision = 3
+description = "row version columns for books and sellers"
+
+statements = [
+    "ALTER TABLE books_table ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+    "ALTER TABLE sellers_table ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+]
@@ -0,0 +1,19 @@
+# Полнотекстовый поиск по книгам (GET /books/search):
+# - search_vector: вычисляемая колонка со словами названия и автора, ее обслуживает GIN-индекс;
+# - индекс по году для фильтра по диапазону лет.
+# Выражение колонки должно совпадать с моделью Book.
+#
+# Блокировки: добавление вычисляемой STORED-колонки переписывает всю books_table под ACCESS EXCLUSIVE -
+# на время перезаписи блокируются и запись, и чтение книг; неблокирующего варианта у такой колонки нет,
+# миграцию на большой базе нужно проводить в окно обслуживания. Индексы ниже блокируют запись,
+# как в v0002: на живой базе их можно заранее создать вручную с CREATE INDEX CONCURRENTLY IF NOT EXISTS.
+
+revision = 4
+description = "full-text search vector and year index for books"
+
+statements = [
+    "ALTER TABLE books_table ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', title || ' ' || author)) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_books_table_search_vector ON books_table USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_books_table_year ON books_table (year)",
+]
@@ -0,0 +1,164 @@
+# Сводки для ручек статистики (GET /seller/{id}/stats, GET /stats) и триггеры, которые их ведут.
+# Сводки заполняются по уже существующим данным в той же транзакции, что и создание триггеров.
+# SQL функций и триггеров совпадает с src/models/stats.py.
+
+revision = 5
+description = "catalog statistics tables maintained by triggers"
+
+statements = [
+    """
+    CREATE TABLE IF NOT EXISTS seller_year_stats (
+        seller_id INTEGER NOT NULL REFERENCES sellers_table (id) ON DELETE CASCADE,
+        year INTEGER NOT NULL,
+        book_count BIGINT NOT NULL,
+        pages_total BIGINT NOT NULL,
+        PRIMARY KEY (seller_id, year)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS book_year_stats (
+        year INTEGER PRIMARY KEY,
+        book_count BIGINT NOT NULL,
+        pages_total BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS catalog_counters (
+        name VARCHAR(50) PRIMARY KEY,
+        value BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION book_stats_add(seller_ids integer[], years integer[], pages integer[])
+    RETURNS void LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO seller_year_stats AS s (seller_id, year, book_count, pages_total)
+        SELECT b.seller_id, b.year, count(*), sum(b.pages)
+        FROM unnest(seller_ids, years, pages) AS b (seller_id, year, pages)
+        WHERE b.seller_id IS NOT NULL
+        GROUP BY b.seller_id, b.year
+        ORDER BY b.seller_id, b.year
+        ON CONFLICT (seller_id, year) DO UPDATE
+        SET book_count = s.book_count + excluded.book_count, pages_total = s.pages_total + excluded.pages_total;
+
+        INSERT INTO book_year_stats AS y (year, book_count, pages_total)
+        SELECT b.year, count(*), sum(b.pages)
+        FROM unnest(years, pages) AS b (year, pages)
+        GROUP BY b.year
+        ORDER BY b.year
+        ON CONFLICT (year) DO UPDATE
+        SET book_count = y.book_count + excluded.book_count, pages_total = y.pages_total + excluded.pages_total;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION book_stats_remove(seller_ids integer[], years integer[], pages integer[])
+    RETURNS void LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE seller_year_stats AS s
+        SET book_count = s.book_count - d.book_count, pages_total = s.pages_total - d.pages_total
+        FROM (
+            SELECT b.seller_id, b.year, count(*) AS book_count, sum(b.pages) AS pages_total
+            FROM unnest(seller_ids, years, pages) AS b (seller_id, year, pages)
+            WHERE b.seller_id IS NOT NULL
+            GROUP BY b.seller_id, b.year
+        ) AS d
+        WHERE s.seller_id = d.seller_id AND s.year = d.year;
+
+        DELETE FROM seller_year_stats AS s
+        USING unnest(seller_ids, years) AS b (seller_id, year)
+        WHERE s.seller_id = b.seller_id AND s.year = b.year AND s.book_count <= 0;
+
+        UPDATE book_year_stats AS y
+        SET book_count = y.book_count - d.book_count, pages_total = y.pages_total - d.pages_total
+        FROM (
+            SELECT b.year, count(*) AS book_count, sum(b.pages) AS pages_total
+            FROM unnest(years, pages) AS b (year, pages)
+            GROUP BY b.year
+        ) AS d
+        WHERE y.year = d.year;
+
+        DELETE FROM book_year_stats AS y
+        USING unnest(years) AS b (year)
+        WHERE y.year = b.year AND y.book_count <= 0;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION books_stats_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM book_stats_add(array_agg(seller_id), array_agg(year), array_agg(pages)) FROM new_books;
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM book_stats_remove(array_agg(seller_id), array_agg(year), array_agg(pages)) FROM old_books;
+        ELSE
+            PERFORM book_stats_remove(array_agg(o.seller_id), array_agg(o.year), array_agg(o.pages))
+            FROM old_books AS o JOIN new_books AS n ON n.id = o.id
+            WHERE (o.seller_id, o.year, o.pages) IS DISTINCT FROM (n.seller_id, n.year, n.pages);
+            PERFORM book_stats_add(array_agg(n.seller_id), array_agg(n.year), array_agg(n.pages))
+            FROM old_books AS o JOIN new_books AS n ON n.id = o.id
+            WHERE (o.seller_id, o.year, o.pages) IS DISTINCT FROM (n.seller_id, n.year, n.pages);
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sellers_count_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        delta bigint;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT count(*) INTO delta FROM new_sellers;
+        ELSE
+            SELECT -count(*) INTO delta FROM old_sellers;
+        END IF;
+
+        IF delta <> 0 THEN
+            INSERT INTO catalog_counters AS c (name, value) VALUES ('sellers', delta)
+            ON CONFLICT (name) DO UPDATE SET value = c.value + excluded.value;
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_stats_insert AFTER INSERT ON books_table
+    REFERENCING NEW TABLE AS new_books
+    FOR EACH STATEMENT EXECUTE FUNCTION books_stats_trigger()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_stats_update AFTER UPDATE ON books_table
+    REFERENCING OLD TABLE AS old_books NEW TABLE AS new_books
+    FOR EACH STATEMENT EXECUTE FUNCTION books_stats_trigger()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_stats_delete AFTER DELETE ON books_table
+    REFERENCING OLD TABLE AS old_books
+    FOR EACH STATEMENT EXECUTE FUNCTION books_stats_trigger()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER sellers_count_insert AFTER INSERT ON sellers_table
+    REFERENCING NEW TABLE AS new_sellers
+    FOR EACH STATEMENT EXECUTE FUNCTION sellers_count_trigger()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER sellers_count_delete AFTER DELETE ON sellers_table
+    REFERENCING OLD TABLE AS old_sellers
+    FOR EACH STATEMENT EXECUTE FUNCTION sellers_count_trigger()
+    """,
+    """
+    INSERT INTO seller_year_stats (seller_id, year, book_count, pages_total)
+    SELECT seller_id, year, count(*), sum(pages) FROM books_table
+    WHERE seller_id IS NOT NULL
+    GROUP BY seller_id, year
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO book_year_stats (year, book_count, pages_total)
+    SELECT year, count(*), sum(pages) FROM books_table
+    GROUP BY year
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO catalog_counters (name, value)
+    SELECT 'sellers', count(*) FROM sellers_table
+    ON CONFLICT DO NOTHING
+    """,
+]
@@ -0,0 +1,19 @@
+# Состояние фонового удаления продавцов с большим числом книг (GET /seller/{id}/purge)
+
+revision = 6
+description = "seller purge jobs"
+
+statements = [
+    """
+    CREATE TABLE IF NOT EXISTS seller_purges (
+        seller_id INTEGER PRIMARY KEY,
+        status VARCHAR(20) NOT NULL,
+        total_books BIGINT NOT NULL,
+        deleted_books BIGINT NOT NULL DEFAULT 0,
+        error TEXT,
+        started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        finished_at TIMESTAMPTZ
+    )
+    """,
+]
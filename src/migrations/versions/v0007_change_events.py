@@ -0,0 +1,66 @@
+# Лента изменений каталога (GET /api/v1/changes): таблица событий и триггеры, которые ее пишут.
+# SQL функции и триггеров совпадает с src/models/changes.py.
+
+revision = 7
+description = "catalog change feed outbox"
+
+statements = [
+    """
+    CREATE TABLE IF NOT EXISTS change_events (
+        id BIGSERIAL PRIMARY KEY,
+        txid BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text::bigint),
+        entity VARCHAR(20) NOT NULL,
+        entity_id INTEGER NOT NULL,
+        op VARCHAR(10) NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_change_events_position ON change_events (txid, id)",
+    "CREATE INDEX IF NOT EXISTS ix_change_events_created_at ON change_events (created_at)",
+    """
+    CREATE OR REPLACE FUNCTION catalog_changes_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO change_events (entity, entity_id, op)
+            SELECT TG_ARGV[0], id, 'delete' FROM old_rows ORDER BY id;
+        ELSE
+            INSERT INTO change_events (entity, entity_id, op)
+            SELECT TG_ARGV[0], id, lower(TG_OP) FROM new_rows ORDER BY id;
+        END IF;
+        IF FOUND THEN
+            PERFORM pg_notify('catalog_changes', '');
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_changes_insert AFTER INSERT ON books_table
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('book')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_changes_update AFTER UPDATE ON books_table
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('book')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_changes_delete AFTER DELETE ON books_table
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('book')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER sellers_changes_insert AFTER INSERT ON sellers_table
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('seller')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER sellers_changes_update AFTER UPDATE ON sellers_table
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('seller')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER sellers_changes_delete AFTER DELETE ON sellers_table
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('seller')
+    """,
+]
@@ -0,0 +1,102 @@
+# Сводки всего каталога по полосам (shard): book_year_stats и catalog_counters получают колонку shard
+# в первичном ключе, и триггеры пишут в полосу своей транзакции (pg_current_xact_id() % 16).
+# Раньше любая запись книги блокировала строку своего года, а создание или удаление продавца - единственную
+# строку счетчика, до конца транзакции: записи разных продавцов шли друг за другом, а массовая
+# загрузка на минуты останавливала все остальные. Заодно удаление блокирует строки сводки продавца
+# в порядке ключа, как и добавление, - два многолетних удаления больше не ловят взаимоблокировку.
+# Накопленные значения остаются в полосе 0. SQL функций совпадает с src/models/stats.py.
+#
+# Блокировки: смена первичного ключа перестраивает его индекс под ACCESS EXCLUSIVE, но строк в этих
+# таблицах не больше, чем лет (и одна строка счетчика), так что это мгновенно.
+
+revision = 8
+description = "shard catalog-wide statistics rows"
+
+statements = [
+    "ALTER TABLE book_year_stats ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0",
+    "ALTER TABLE book_year_stats ALTER COLUMN shard DROP DEFAULT",
+    "ALTER TABLE book_year_stats DROP CONSTRAINT book_year_stats_pkey, ADD PRIMARY KEY (year, shard)",
+    "ALTER TABLE catalog_counters ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0",
+    "ALTER TABLE catalog_counters ALTER COLUMN shard DROP DEFAULT",
+    "ALTER TABLE catalog_counters DROP CONSTRAINT catalog_counters_pkey, ADD PRIMARY KEY (name, shard)",
+    """
+    CREATE OR REPLACE FUNCTION catalog_stats_shard() RETURNS smallint LANGUAGE sql STABLE AS $$
+        SELECT mod(pg_current_xact_id()::text::bigint, 16)::smallint
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION book_stats_add(seller_ids integer[], years integer[], pages integer[])
+    RETURNS void LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO seller_year_stats AS s (seller_id, year, book_count, pages_total)
+        SELECT b.seller_id, b.year, count(*), sum(b.pages)
+        FROM unnest(seller_ids, years, pages) AS b (seller_id, year, pages)
+        WHERE b.seller_id IS NOT NULL
+        GROUP BY b.seller_id, b.year
+        ORDER BY b.seller_id, b.year
+        ON CONFLICT (seller_id, year) DO UPDATE
+        SET book_count = s.book_count + excluded.book_count, pages_total = s.pages_total + excluded.pages_total;
+
+        INSERT INTO book_year_stats AS y (year, shard, book_count, pages_total)
+        SELECT b.year, catalog_stats_shard(), count(*), sum(b.pages)
+        FROM unnest(years, pages) AS b (year, pages)
+        GROUP BY b.year
+        ORDER BY b.year
+        ON CONFLICT (year, shard) DO UPDATE
+        SET book_count = y.book_count + excluded.book_count, pages_total = y.pages_total + excluded.pages_total;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION book_stats_remove(seller_ids integer[], years integer[], pages integer[])
+    RETURNS void LANGUAGE plpgsql AS $$
+    BEGIN
+        PERFORM 1 FROM seller_year_stats AS s
+        WHERE (s.seller_id, s.year) IN (SELECT * FROM unnest(seller_ids, years))
+        ORDER BY s.seller_id, s.year
+        FOR UPDATE;
+
+        UPDATE seller_year_stats AS s
+        SET book_count = s.book_count - d.book_count, pages_total = s.pages_total - d.pages_total
+        FROM (
+            SELECT b.seller_id, b.year, count(*) AS book_count, sum(b.pages) AS pages_total
+            FROM unnest(seller_ids, years, pages) AS b (seller_id, year, pages)
+            WHERE b.seller_id IS NOT NULL
+            GROUP BY b.seller_id, b.year
+        ) AS d
+        WHERE s.seller_id = d.seller_id AND s.year = d.year;
+
+        DELETE FROM seller_year_stats AS s
+        USING unnest(seller_ids, years) AS b (seller_id, year)
+        WHERE s.seller_id = b.seller_id AND s.year = b.year AND s.book_count <= 0;
+
+        INSERT INTO book_year_stats AS y (year, shard, book_count, pages_total)
+        SELECT b.year, catalog_stats_shard(), -count(*), -sum(b.pages)
+        FROM unnest(years, pages) AS b (year, pages)
+        GROUP BY b.year
+        ORDER BY b.year
+        ON CONFLICT (year, shard) DO UPDATE
+        SET book_count = y.book_count + excluded.book_count, pages_total = y.pages_total + excluded.pages_total;
+
+        DELETE FROM book_year_stats AS y
+        WHERE y.shard = catalog_stats_shard() AND y.year = ANY (years) AND y.book_count = 0 AND y.pages_total = 0;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sellers_count_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        delta bigint;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT count(*) INTO delta FROM new_sellers;
+        ELSE
+            SELECT -count(*) INTO delta FROM old_sellers;
+        END IF;
+
+        IF delta <> 0 THEN
+            INSERT INTO catalog_counters AS c (name, shard, value) VALUES ('sellers', catalog_stats_shard(), delta)
+            ON CONFLICT (name, shard) DO UPDATE SET value = c.value + excluded.value;
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+]
@@ -1,4 +1,5 @@
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import Computed, Index, String, ForeignKey, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import BaseModel
@@ -7,6 +8,10 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from .sellers import Seller
 
+# Конфигурация полнотекстового поиска: simple не знает морфологии, зато одинаково
+# работает для русских и английских названий и имен авторов
+SEARCH_CONFIG = "simple"
+
 
 class Book(BaseModel):
     __tablename__ = "books_table"
@@ -17,5 +22,34 @@ class Book(BaseModel):
     year: Mapped[int]
     pages: Mapped[int]
     seller_id: Mapped[int] = mapped_column(ForeignKey("sellers_table.id", ondelete="CASCADE"), nullable=True)
+    # версия строки: ORM увеличивает ее при каждом UPDATE и проверяет в WHERE (оптимистичная блокировка)
+    version: Mapped[int] = mapped_column(nullable=False, default=1, server_default="1")
+    # слова названия и автора для полнотекстового поиска; считает сама БД при INSERT/UPDATE.
+    # deferred - при загрузке книги через ORM не читается
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{SEARCH_CONFIG}', title || ' ' || author)", persisted=True),
+        deferred=True,
+    )
 
     seller: Mapped["Seller"] = relationship("Seller", back_populates="books")
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+
+# Индексы описаны и здесь, и в миграциях v0002 и v0004: модель - для тестовой базы (create_all), миграция - для боевой
+Index("ix_books_table_seller_id_id", Book.seller_id, Book.id)
+Index(
+    "ix_books_table_author_lower",
+    func.lower(Book.author).label("author_lower"),
+    postgresql_ops={"author_lower": "text_pattern_ops"},
+)
+Index(
+    "ix_books_table_title_lower",
+    func.lower(Book.title).label("title_lower"),
+    postgresql_ops={"title_lower": "text_pattern_ops"},
+)
+Index("ix_books_table_search_vector", Book.search_vector, postgresql_using="gin")
+# для фильтров поиска по году и числу страниц
+Index("ix_books_table_year", Book.year)
@@ -0,0 +1,88 @@
+from datetime import datetime
+
+from sqlalchemy import DDL, BigInteger, DateTime, Index, String, event, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+# Канал NOTIFY, которым триггер ниже будит слушателей ленты изменений (src/changes)
+CHANGES_CHANNEL = "catalog_changes"
+
+
+# Лента изменений каталога (transactional outbox): строку пишет триггер БД в той же транзакции,
+# что и саму запись книги или продавца, поэтому событие есть ровно у закоммиченных изменений -
+# из ручек, фонового удаления продавца, каскада внешнего ключа или руками в psql.
+# txid - номер транзакции записи: по (txid, id) события упорядочены так, что читатель не пропустит
+# событие транзакции, которая закоммитилась позже, чем он прочитал более поздние (см. src/queries/changes.py).
+class ChangeEvent(BaseModel):
+    __tablename__ = "change_events"
+    __table_args__ = (
+        Index("ix_change_events_position", "txid", "id"),
+        Index("ix_change_events_created_at", "created_at"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    txid: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default=text("(pg_current_xact_id()::text::bigint)")
+    )
+    entity: Mapped[str] = mapped_column(String(20), nullable=False)  # book или seller
+    entity_id: Mapped[int] = mapped_column(nullable=False)
+    op: Mapped[str] = mapped_column(String(10), nullable=False)  # insert, update или delete
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+# Триггеры уровня оператора, как у сводок статистики: один INSERT/UPDATE/DELETE на сколько угодно строк
+# пишет события одним INSERT ... SELECT из таблицы переходов и шлет один NOTIFY
+# (одинаковые NOTIFY одной транзакции Postgres и так доставляет один раз - при коммите).
+# Тот же SQL - в миграции v0007: модель - для тестовой базы (create_all), миграция - для боевой.
+CHANGES_TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION catalog_changes_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO change_events (entity, entity_id, op)
+            SELECT TG_ARGV[0], id, 'delete' FROM old_rows ORDER BY id;
+        ELSE
+            INSERT INTO change_events (entity, entity_id, op)
+            SELECT TG_ARGV[0], id, lower(TG_OP) FROM new_rows ORDER BY id;
+        END IF;
+        IF FOUND THEN
+            PERFORM pg_notify('catalog_changes', '');
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_changes_insert AFTER INSERT ON books_table
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('book')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_changes_update AFTER UPDATE ON books_table
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('book')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_changes_delete AFTER DELETE ON books_table
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('book')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER sellers_changes_insert AFTER INSERT ON sellers_table
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('seller')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER sellers_changes_update AFTER UPDATE ON sellers_table
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('seller')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER sellers_changes_delete AFTER DELETE ON sellers_table
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_changes_trigger('seller')
+    """,
+]
+
+for statement in CHANGES_TRIGGERS:
+    event.listen(BaseModel.metadata, "after_create", DDL(statement))
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+# Фоновое удаление продавца с большим числом книг (см. src/jobs/purges.py).
+# Без внешнего ключа на продавца: запись остается и после его удаления, чтобы по ней был виден итог.
+# status: running - идет, done - продавец удален, failed - остановилось с ошибкой (error)
+class SellerPurge(BaseModel):
+    __tablename__ = "seller_purges"
+
+    seller_id: Mapped[int] = mapped_column(primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    total_books: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    deleted_books: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # обновляется после каждой пачки: по нему видно, что задача не зависла
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
@@ -12,4 +12,11 @@ class Seller(BaseModel):
     first_name: Mapped[str] = mapped_column(String(100), nullable=False)
     last_name: Mapped[str] = mapped_column(String(100), nullable=False)
     email: Mapped[str] = mapped_column(String(150), unique=True, nullable=False)
-    books: Mapped[List["Book"]] = relationship("Book", back_populates="seller", cascade="all, delete")
+    # версия строки, как у книги
+    version: Mapped[int] = mapped_column(nullable=False, default=1, server_default="1")
+    # книги удаляет сама БД (ON DELETE CASCADE у books_table.seller_id): ORM не загружает их перед удалением продавца
+    books: Mapped[List["Book"]] = relationship(
+        "Book", back_populates="seller", cascade="all, delete", passive_deletes=True
+    )
+
+    __mapper_args__ = {"version_id_col": version}
@@ -0,0 +1,181 @@
+from sqlalchemy import DDL, BigInteger, ForeignKey, SmallInteger, String, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+# Сводки по каталогу для ручек статистики. Их ведут триггеры БД на books_table и sellers_table,
+# поэтому они верны при любой записи - из ручек, массовой загрузки, каскадного удаления или руками в psql.
+# Чтение сводки не зависит от размера каталога: строк в ней не больше, чем различных лет
+# (у сводок всего каталога - лет на STATS_SHARDS полос).
+
+# Сводки всего каталога (книги по годам, число продавцов) меняет любая запись любого продавца.
+# Чтобы такие записи не выстраивались в очередь за блокировкой одной строки до конца транзакции,
+# каждый ключ разбит на полосы (shard): транзакция пишет в полосу pg_current_xact_id() % STATS_SHARDS
+# (функция catalog_stats_shard), а чтение складывает полосы. Удаление вычитается в свою же полосу -
+# отдельная полоса может уйти в минус, сумма по полосам остается верной.
+STATS_SHARDS = 16
+
+
+# Книги продавца по годам издания
+class SellerYearStats(BaseModel):
+    __tablename__ = "seller_year_stats"
+
+    seller_id: Mapped[int] = mapped_column(ForeignKey("sellers_table.id", ondelete="CASCADE"), primary_key=True)
+    year: Mapped[int] = mapped_column(primary_key=True)
+    book_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    pages_total: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+# Все книги каталога по годам издания, по полосам
+class BookYearStats(BaseModel):
+    __tablename__ = "book_year_stats"
+
+    year: Mapped[int] = mapped_column(primary_key=True)
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    book_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    pages_total: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+# Счетчики каталога по имени, по полосам; пока один - sellers, число продавцов
+class CatalogCounter(BaseModel):
+    __tablename__ = "catalog_counters"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+# Триггеры уровня оператора: один INSERT/UPDATE/DELETE на сколько угодно книг обновляет каждую
+# строку сводки один раз (книги группируются по продавцу и году). UPDATE учитывает только книги,
+# у которых поменялись продавец, год или число страниц. Строки сводок блокируются в порядке ключа
+# и при добавлении, и при удалении, чтобы параллельные записи не ловили взаимоблокировку.
+# Тот же SQL - в миграциях v0005 и v0008: модель - для тестовой базы (create_all), миграции - для боевой.
+STATS_TRIGGERS = [
+    f"""
+    CREATE OR REPLACE FUNCTION catalog_stats_shard() RETURNS smallint LANGUAGE sql STABLE AS $$
+        SELECT mod(pg_current_xact_id()::text::bigint, {STATS_SHARDS})::smallint
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION book_stats_add(seller_ids integer[], years integer[], pages integer[])
+    RETURNS void LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO seller_year_stats AS s (seller_id, year, book_count, pages_total)
+        SELECT b.seller_id, b.year, count(*), sum(b.pages)
+        FROM unnest(seller_ids, years, pages) AS b (seller_id, year, pages)
+        WHERE b.seller_id IS NOT NULL
+        GROUP BY b.seller_id, b.year
+        ORDER BY b.seller_id, b.year
+        ON CONFLICT (seller_id, year) DO UPDATE
+        SET book_count = s.book_count + excluded.book_count, pages_total = s.pages_total + excluded.pages_total;
+
+        INSERT INTO book_year_stats AS y (year, shard, book_count, pages_total)
+        SELECT b.year, catalog_stats_shard(), count(*), sum(b.pages)
+        FROM unnest(years, pages) AS b (year, pages)
+        GROUP BY b.year
+        ORDER BY b.year
+        ON CONFLICT (year, shard) DO UPDATE
+        SET book_count = y.book_count + excluded.book_count, pages_total = y.pages_total + excluded.pages_total;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION book_stats_remove(seller_ids integer[], years integer[], pages integer[])
+    RETURNS void LANGUAGE plpgsql AS $$
+    BEGIN
+        PERFORM 1 FROM seller_year_stats AS s
+        WHERE (s.seller_id, s.year) IN (SELECT * FROM unnest(seller_ids, years))
+        ORDER BY s.seller_id, s.year
+        FOR UPDATE;
+
+        UPDATE seller_year_stats AS s
+        SET book_count = s.book_count - d.book_count, pages_total = s.pages_total - d.pages_total
+        FROM (
+            SELECT b.seller_id, b.year, count(*) AS book_count, sum(b.pages) AS pages_total
+            FROM unnest(seller_ids, years, pages) AS b (seller_id, year, pages)
+            WHERE b.seller_id IS NOT NULL
+            GROUP BY b.seller_id, b.year
+        ) AS d
+        WHERE s.seller_id = d.seller_id AND s.year = d.year;
+
+        DELETE FROM seller_year_stats AS s
+        USING unnest(seller_ids, years) AS b (seller_id, year)
+        WHERE s.seller_id = b.seller_id AND s.year = b.year AND s.book_count <= 0;
+
+        INSERT INTO book_year_stats AS y (year, shard, book_count, pages_total)
+        SELECT b.year, catalog_stats_shard(), -count(*), -sum(b.pages)
+        FROM unnest(years, pages) AS b (year, pages)
+        GROUP BY b.year
+        ORDER BY b.year
+        ON CONFLICT (year, shard) DO UPDATE
+        SET book_count = y.book_count + excluded.book_count, pages_total = y.pages_total + excluded.pages_total;
+
+        DELETE FROM book_year_stats AS y
+        WHERE y.shard = catalog_stats_shard() AND y.year = ANY (years) AND y.book_count = 0 AND y.pages_total = 0;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION books_stats_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM book_stats_add(array_agg(seller_id), array_agg(year), array_agg(pages)) FROM new_books;
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM book_stats_remove(array_agg(seller_id), array_agg(year), array_agg(pages)) FROM old_books;
+        ELSE
+            PERFORM book_stats_remove(array_agg(o.seller_id), array_agg(o.year), array_agg(o.pages))
+            FROM old_books AS o JOIN new_books AS n ON n.id = o.id
+            WHERE (o.seller_id, o.year, o.pages) IS DISTINCT FROM (n.seller_id, n.year, n.pages);
+            PERFORM book_stats_add(array_agg(n.seller_id), array_agg(n.year), array_agg(n.pages))
+            FROM old_books AS o JOIN new_books AS n ON n.id = o.id
+            WHERE (o.seller_id, o.year, o.pages) IS DISTINCT FROM (n.seller_id, n.year, n.pages);
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sellers_count_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        delta bigint;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT count(*) INTO delta FROM new_sellers;
+        ELSE
+            SELECT -count(*) INTO delta FROM old_sellers;
+        END IF;
+
+        IF delta <> 0 THEN
+            INSERT INTO catalog_counters AS c (name, shard, value) VALUES ('sellers', catalog_stats_shard(), delta)
+            ON CONFLICT (name, shard) DO UPDATE SET value = c.value + excluded.value;
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_stats_insert AFTER INSERT ON books_table
+    REFERENCING NEW TABLE AS new_books
+    FOR EACH STATEMENT EXECUTE FUNCTION books_stats_trigger()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_stats_update AFTER UPDATE ON books_table
+    REFERENCING OLD TABLE AS old_books NEW TABLE AS new_books
+    FOR EACH STATEMENT EXECUTE FUNCTION books_stats_trigger()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER books_stats_delete AFTER DELETE ON books_table
+    REFERENCING OLD TABLE AS old_books
+    FOR EACH STATEMENT EXECUTE FUNCTION books_stats_trigger()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER sellers_count_insert AFTER INSERT ON sellers_table
+    REFERENCING NEW TABLE AS new_sellers
+    FOR EACH STATEMENT EXECUTE FUNCTION sellers_count_trigger()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER sellers_count_delete AFTER DELETE ON sellers_table
+    REFERENCING OLD TABLE AS old_sellers
+    FOR EACH STATEMENT EXECUTE FUNCTION sellers_count_trigger()
+    """,
+]
+
+for statement in STATS_TRIGGERS:
+    event.listen(BaseModel.metadata, "after_create", DDL(statement))
@@ -0,0 +1,7 @@
+from .books import *
+from .changes import *
+from .export import *
+from .sellers import *
+from .stats import *
+
+__all__ = books.__all__ + changes.__all__ + export.__all__ + sellers.__all__ + stats.__all__
@@ -0,0 +1,124 @@
+from typing import AsyncIterator, Dict, List, Optional
+
+import orjson
+from sqlalchemy import ColumnElement, Integer, Select, any_, bindparam, func, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.books import SEARCH_CONFIG, Book
+from src.schemas.books import ReturnedBook
+from src.utils import columns_for
+
+__all__ = [
+    "RETURNED_BOOK_COLUMNS",
+    "books_query",
+    "books_by_ids_query",
+    "fetch_books",
+    "stream_books",
+    "book_search_filters",
+    "search_books_query",
+    "fetch_search_facets",
+]
+
+# Колонки книги в порядке и с именами полей ReturnedBook
+RETURNED_BOOK_COLUMNS = columns_for(Book, ReturnedBook)
+
+
+# Запрос книг после заданного id в порядке возрастания id (для keyset-пагинации).
+# author и title - фильтры по началу строки без учета регистра, их обслуживают
+# индексы по lower(author) и lower(title).
+def books_query(
+    after_id: Optional[int] = None, author: Optional[str] = None, title: Optional[str] = None
+) -> Select:
+    query = select(*RETURNED_BOOK_COLUMNS).order_by(Book.id)
+    if after_id is not None:
+        query = query.where(Book.id > after_id)
+    if author:
+        query = query.where(func.lower(Book.author).like(_prefix_pattern(author), escape="\\"))
+    if title:
+        query = query.where(func.lower(Book.title).like(_prefix_pattern(title), escape="\\"))
+    return query
+
+
+# Книги по списку id одним запросом WHERE id = ANY(:ids): массив - один параметр,
+# так что текст запроса (и подготовленный запрос asyncpg) не зависит от длины списка.
+# version нужна для ETag закэшированных тел.
+def books_by_ids_query(ids: List[int]) -> Select:
+    return select(*RETURNED_BOOK_COLUMNS, Book.version).where(
+        Book.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+    )
+
+
+def _prefix_pattern(value: str) -> str:
+    escaped = value.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+# Список книг в виде словарей, готовых к сериализации orjson
+async def fetch_books(session: AsyncSession, query: Select) -> List[dict]:
+    result = await session.execute(query)
+    return [dict(row) for row in result.mappings()]
+
+
+# Построчная выдача книг в NDJSON через серверный курсор
+async def stream_books(session: AsyncSession, query: Select, batch_size: int) -> AsyncIterator[bytes]:
+    result = await session.stream(query.execution_options(yield_per=batch_size))
+    async for row in result.mappings():
+        yield orjson.dumps(dict(row)) + b"\n"
+
+
+# Условия поиска книг. q - поисковая строка в синтаксисе веб-поиска ("слова в кавычках", -исключить, or),
+# ищется по словам названия и автора через GIN-индекс; остальные фильтры - границы включительно.
+def book_search_filters(
+    q: Optional[str] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    min_pages: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    seller_id: Optional[int] = None,
+) -> List[ColumnElement[bool]]:
+    filters = []
+    if q:
+        tsquery = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), q)
+        filters.append(Book.search_vector.bool_op("@@")(tsquery))
+    if min_year is not None:
+        filters.append(Book.year >= min_year)
+    if max_year is not None:
+        filters.append(Book.year <= max_year)
+    if min_pages is not None:
+        filters.append(Book.pages >= min_pages)
+    if max_pages is not None:
+        filters.append(Book.pages <= max_pages)
+    if seller_id is not None:
+        filters.append(Book.seller_id == seller_id)
+    return filters
+
+
+# Найденные книги после заданного id в порядке возрастания id (для keyset-пагинации)
+def search_books_query(filters: List[ColumnElement[bool]], after_id: Optional[int] = None) -> Select:
+    query = select(*RETURNED_BOOK_COLUMNS).where(*filters).order_by(Book.id)
+    if after_id is not None:
+        query = query.where(Book.id > after_id)
+    return query
+
+
+# Число найденных книг по годам и по продавцам - одним запросом с GROUPING SETS.
+# Возвращает {"years": [{"value": 2024, "count": 10}, ...], "sellers": [...]}, по убыванию count.
+async def fetch_search_facets(session: AsyncSession, filters: List[ColumnElement[bool]]) -> Dict[str, List[dict]]:
+    grouping = func.grouping(Book.year, Book.seller_id).label("grouping")
+    query = (
+        select(Book.year, Book.seller_id, func.count().label("count"), grouping)
+        .where(*filters)
+        .group_by(func.grouping_sets(tuple_(Book.year), tuple_(Book.seller_id)))
+        .order_by(grouping, func.count().desc(), Book.year, Book.seller_id)
+    )
+
+    facets: Dict[str, List[dict]] = {"years": [], "sellers": []}
+    result = await session.execute(query)
+    for row in result.mappings():
+        # grouping = 1: строка сгруппирована по году (seller_id свернут), 2 - по продавцу
+        if row["grouping"] == 1:
+            facets["years"].append({"value": row["year"], "count": row["count"]})
+        else:
+            facets["sellers"].append({"value": row["seller_id"], "count": row["count"]})
+    return facets
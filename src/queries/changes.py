@@ -0,0 +1,66 @@
+from datetime import timedelta
+from typing import List, Tuple
+
+from sqlalchemy import BigInteger, Text, cast, delete, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.models.changes import ChangeEvent
+
+__all__ = ["Position", "START", "fetch_changes", "fetch_change_head", "change_exists", "prune_changes"]
+
+# Позиция в ленте изменений: (txid, id) последнего отданного события
+Position = Tuple[int, int]
+START: Position = (0, 0)
+
+CHANGE_COLUMNS = (
+    ChangeEvent.txid,
+    ChangeEvent.id,
+    ChangeEvent.entity,
+    ChangeEvent.entity_id,
+    ChangeEvent.op,
+    ChangeEvent.created_at,
+)
+
+# Самая старая транзакция, которая еще не завершилась: все транзакции с меньшим номером уже
+# закоммичены или откачены, и новых событий с таким txid не появится. Поэтому события отдаются
+# в порядке (txid, id) и только до нее: id раздаются при вставке, а коммитятся транзакции в другом порядке,
+# и по одному id читатель пропустил бы событие, чья транзакция закоммитилась после того,
+# как он прочитал события с большим id. Цена - событие ждет, пока не закончатся начатые раньше транзакции.
+_VISIBLE_BEFORE = cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+
+_POSITION = tuple_(ChangeEvent.txid, ChangeEvent.id)
+
+
+# События после позиции after, не больше limit, по порядку
+async def fetch_changes(conn: AsyncConnection, after: Position, limit: int) -> List[dict]:
+    result = await conn.execute(
+        select(*CHANGE_COLUMNS)
+        .where(_POSITION > tuple_(*after), ChangeEvent.txid < _VISIBLE_BEFORE)
+        .order_by(ChangeEvent.txid, ChangeEvent.id)
+        .limit(limit)
+    )
+    return [dict(row) for row in result.mappings()]
+
+
+# Позиция последнего события, которое уже можно отдавать (START, если событий нет)
+async def fetch_change_head(conn: AsyncConnection) -> Position:
+    result = await conn.execute(
+        select(ChangeEvent.txid, ChangeEvent.id)
+        .where(ChangeEvent.txid < _VISIBLE_BEFORE)
+        .order_by(ChangeEvent.txid.desc(), ChangeEvent.id.desc())
+        .limit(1)
+    )
+    row = result.first()
+    return (row.txid, row.id) if row else START
+
+
+# Осталось ли в ленте событие позиции: если его уже удалила очистка, события после него могли пропасть тоже
+async def change_exists(conn: AsyncConnection, position: Position) -> bool:
+    result = await conn.execute(select(ChangeEvent.id).where(_POSITION == tuple_(*position)))
+    return result.first() is not None
+
+
+# Удаляет события старше retention; возвращает, сколько удалено
+async def prune_changes(conn: AsyncConnection, retention: timedelta) -> int:
+    result = await conn.execute(delete(ChangeEvent).where(ChangeEvent.created_at < func.now() - retention))
+    return result.rowcount
@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, AsyncIterator, List, Literal, Optional, Tuple
+
+import asyncpg
+from sqlalchemy import Select, func, select
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+
+from src.models.books import Book
+from src.models.sellers import Seller
+
+from .books import book_search_filters
+
+__all__ = ["ExportFormat", "EXPORT_BOOK_COLUMNS", "export_books_query", "copy_query", "copy_to_stream"]
+
+ExportFormat = Literal["csv", "ndjson"]
+
+# Колонки выгрузки: книга и ее продавец (у книги без продавца его колонки пустые)
+EXPORT_BOOK_COLUMNS = (
+    Book.id,
+    Book.title,
+    Book.author,
+    Book.year,
+    Book.pages,
+    Book.seller_id,
+    Seller.first_name.label("seller_first_name"),
+    Seller.last_name.label("seller_last_name"),
+    Seller.email.label("seller_email"),
+)
+
+# Сколько кусков COPY может ждать отправки клиенту. Если клиент читает медленнее, чем отдает база,
+# чтение COPY встает, пока очередь не освободится, - память на выгрузку не зависит от размера таблицы
+COPY_QUEUE_CHUNKS = 16
+
+_DIALECT = asyncpg_dialect()
+
+
+# Книги с продавцами в порядке id; фильтры - как у поиска, границы годов включительно
+def export_books_query(
+    seller_id: Optional[int] = None, min_year: Optional[int] = None, max_year: Optional[int] = None
+) -> Select:
+    return (
+        select(*EXPORT_BOOK_COLUMNS)
+        .outerjoin(Seller, Seller.id == Book.seller_id)
+        .where(*book_search_filters(min_year=min_year, max_year=max_year, seller_id=seller_id))
+        .order_by(Book.id)
+    )
+
+
+# SQL и параметры ($1, $2, ...) для COPY (...) TO STDOUT и опции COPY для формата.
+# csv - с заголовком. ndjson - одна колонка row_to_json на строку; отдается как csv с разделителем
+# и кавычкой, которых в JSON не бывает (управляющие символы JSON экранирует), чтобы COPY выдал строку
+# как есть: текстовый формат COPY удвоил бы обратные слэши внутри JSON.
+def copy_query(query: Select, export_format: ExportFormat) -> Tuple[str, List[Any], dict]:
+    if export_format == "ndjson":
+        rows = query.subquery("row")
+        query = select(func.row_to_json(rows.table_valued())).order_by(rows.c.id)
+        options = {"format": "csv", "delimiter": "\x02", "quote": "\x01"}
+    else:
+        options = {"format": "csv", "header": True}
+
+    compiled = query.compile(dialect=_DIALECT)
+    params = compiled.params
+    return compiled.string, [params[name] for name in compiled.positiontup], options
+
+
+# Выгрузка COPY ... TO STDOUT потоком: asyncpg отдает данные кусками по мере чтения из базы,
+# куски через очередь уходят клиенту, не собираясь в памяти. Если клиент отключился,
+# COPY отменяется.
+async def copy_to_stream(
+    conn: asyncpg.Connection, sql: str, args: List[Any], options: dict
+) -> AsyncIterator[bytes]:
+    chunks: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(COPY_QUEUE_CHUNKS)
+
+    # asyncpg может отдать кусок как bytearray, а ответ-поток принимает только bytes
+    async def put(chunk: bytes) -> None:
+        await chunks.put(bytes(chunk))
+
+    # Конец выгрузки (или ошибка - ее поднимет await task) помечается None. При отмене - нет:
+    # читателя уже нет, а полная очередь не дала бы задаче завершиться
+    async def copy() -> None:
+        try:
+            await conn.copy_from_query(sql, *args, output=put, **options)
+        except Exception:
+            await chunks.put(None)
+            raise
+        await chunks.put(None)
+
+    task = asyncio.create_task(copy())
+    try:
+        while (chunk := await chunks.get()) is not None:
+            yield chunk
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,86 @@
+from typing import List, Optional
+
+from sqlalchemy import Select, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.schemas.books import BookResponse
+from src.schemas.sellers import SellerResponse, SellerSummary
+from src.utils import columns_for
+
+__all__ = [
+    "SELLER_COLUMNS",
+    "SELLER_BOOK_COLUMNS",
+    "seller_summaries_query",
+    "seller_books_query",
+    "fetch_seller_summaries",
+]
+
+SELLER_COLUMNS = columns_for(Seller, SellerResponse, exclude={"books"})
+SELLER_BOOK_COLUMNS = columns_for(Book, BookResponse)
+SELLER_SUMMARY_COLUMNS = columns_for(Seller, SellerSummary, exclude={"book_count", "books"})
+
+
+# Продавцы с числом книг: счетчики считаются одним агрегирующим подзапросом
+# (по индексу seller_id, id), а не загрузкой самих книг.
+def seller_summaries_query() -> Select:
+    counts = (
+        select(Book.seller_id, func.count().label("book_count"))
+        .where(Book.seller_id.is_not(None))
+        .group_by(Book.seller_id)
+        .subquery()
+    )
+    return (
+        select(*SELLER_SUMMARY_COLUMNS, func.coalesce(counts.c.book_count, 0).label("book_count"))
+        .outerjoin(counts, counts.c.seller_id == Seller.id)
+        .order_by(Seller.id)
+    )
+
+
+# Книги продавца после заданного id в порядке возрастания id (для keyset-пагинации)
+def seller_books_query(seller_id: int, after_id: Optional[int] = None) -> Select:
+    query = select(*SELLER_BOOK_COLUMNS).where(Book.seller_id == seller_id).order_by(Book.id)
+    if after_id is not None:
+        query = query.where(Book.id > after_id)
+    return query
+
+
+# Список продавцов в виде словарей, готовых к сериализации orjson.
+# С books_limit к каждому продавцу добавляются его первые books_limit книг - тем же запросом:
+# LEFT JOIN LATERAL выбирает для каждого продавца не больше N книг по индексу (seller_id, id).
+async def fetch_seller_summaries(session: AsyncSession, books_limit: Optional[int] = None) -> List[dict]:
+    query = seller_summaries_query()
+
+    if books_limit is None:
+        result = await session.execute(query)
+        return [dict(row) for row in result.mappings()]
+
+    books = (
+        select(*SELLER_BOOK_COLUMNS)
+        .where(Book.seller_id == Seller.id)
+        .order_by(Book.id)
+        .limit(books_limit)
+        .lateral("seller_books")
+    )
+    book_names = [column.name for column in SELLER_BOOK_COLUMNS]
+    query = (
+        query.add_columns(*(books.c[name].label(f"book_{name}") for name in book_names))
+        .outerjoin(books, true())
+        .order_by(books.c.id)
+    )
+
+    sellers = {}
+    result = await session.execute(query)
+    for row in result.mappings():
+        seller = sellers.get(row["id"])
+        if seller is None:
+            seller = sellers[row["id"]] = {
+                **{column.name: row[column.name] for column in SELLER_SUMMARY_COLUMNS},
+                "book_count": row["book_count"],
+                "books": [],
+            }
+        if row["book_id"] is not None:
+            seller["books"].append({name: row[f"book_{name}"] for name in book_names})
+
+    return list(sellers.values())
@@ -0,0 +1,68 @@
+from typing import List, Optional
+
+from sqlalchemy import BigInteger, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.sellers import Seller
+from src.models.stats import BookYearStats, CatalogCounter, SellerYearStats
+
+__all__ = ["fetch_seller_stats", "fetch_seller_book_count", "fetch_catalog_stats"]
+
+
+def _totals(years: List[dict]) -> dict:
+    return {
+        "book_count": sum(year["book_count"] for year in years),
+        "pages_total": sum(year["pages_total"] for year in years),
+        "years": years,
+    }
+
+
+# Статистика продавца из сводки seller_year_stats - не больше строки на год, сколько бы ни было книг.
+# Продавец присоединяется слева, чтобы тем же запросом отличить продавца без книг от несуществующего.
+async def fetch_seller_stats(session: AsyncSession, seller_id: int) -> Optional[dict]:
+    result = await session.execute(
+        select(SellerYearStats.year, SellerYearStats.book_count, SellerYearStats.pages_total)
+        .select_from(Seller)
+        .outerjoin(SellerYearStats, SellerYearStats.seller_id == Seller.id)
+        .where(Seller.id == seller_id)
+        .order_by(SellerYearStats.year)
+    )
+    rows = result.mappings().all()
+    if not rows:
+        return None
+
+    years = [dict(row) for row in rows if row["year"] is not None]
+    return {"seller_id": seller_id, **_totals(years)}
+
+
+# Число книг продавца по той же сводке (None - продавца нет), не пересчитывая его книги
+async def fetch_seller_book_count(session: AsyncSession, seller_id: int) -> Optional[int]:
+    result = await session.execute(
+        select(func.coalesce(func.sum(SellerYearStats.book_count), 0))
+        .select_from(Seller)
+        .outerjoin(SellerYearStats, SellerYearStats.seller_id == Seller.id)
+        .where(Seller.id == seller_id)
+        .group_by(Seller.id)
+    )
+    return result.scalar()
+
+
+# Статистика каталога: сводка по годам и счетчик продавцов. Обе сводки разбиты на полосы,
+# поэтому строки складываются - не больше STATS_SHARDS строк на год; год, где полосы в сумме дали 0, пропускается
+async def fetch_catalog_stats(session: AsyncSession) -> dict:
+    book_count = func.sum(BookYearStats.book_count)
+    result = await session.execute(
+        select(
+            BookYearStats.year,
+            book_count.cast(BigInteger).label("book_count"),
+            func.sum(BookYearStats.pages_total).cast(BigInteger).label("pages_total"),
+        )
+        .group_by(BookYearStats.year)
+        .having(book_count != 0)
+        .order_by(BookYearStats.year)
+    )
+    years = [dict(row) for row in result.mappings()]
+    seller_count = await session.scalar(
+        select(func.sum(CatalogCounter.value).cast(BigInteger)).where(CatalogCounter.name == "sellers")
+    )
+    return {"seller_count": seller_count or 0, **_totals(years)}
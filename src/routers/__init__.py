@@ -1,9 +1,16 @@
 from fastapi import APIRouter
 
+from .internal import internal_router, metrics_router
 from .v1.books import books_router
+from .v1.changes import changes_router
+from .v1.export import export_router
 from .v1.sellers import seller_router
+from .v1.stats import stats_router
 
 v1_router = APIRouter(tags=["v1"], prefix="/api/v1")
 
 v1_router.include_router(books_router)
-v1_router.include_router(seller_router)
\ No newline at end of file
+v1_router.include_router(seller_router)
+v1_router.include_router(stats_router)
+v1_router.include_router(changes_router)
+v1_router.include_router(export_router)
\ No newline at end of file
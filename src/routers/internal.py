@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Response
+
+from src.configurations import get_pool_stats
+from src.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY
+from src.schemas.internal import DatabasePoolStats
+
+# Служебные ручки для эксплуатации. Снаружи их стоит закрыть на уровне прокси.
+internal_router = APIRouter(tags=["internal"], prefix="/internal")
+# /metrics - без префикса, по этому пути Prometheus опрашивает сервисы по умолчанию
+metrics_router = APIRouter(tags=["internal"])
+
+
+# Статистика пулов соединений с БД в этом воркере (основная база и реплики) - помогает подобрать
+# размер пулов под нагрузку
+@internal_router.get("/pool", response_model=DatabasePoolStats)
+async def pool_stats():
+    return get_pool_stats()
+
+
+# Метрики запросов этого воркера в текстовом формате Prometheus:
+# число запросов, задержки, SQL-запросы и время БД, ожидание пула, валидация и сериализация
+@metrics_router.get("/metrics", response_class=Response)
+async def metrics():
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -3,120 +3,506 @@
 # sys.path.append("..")
 # from main import app
 
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
 from typing_extensions import Annotated
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from src.models.sellers import Seller
 from src.models.books import Book
-from src.schemas import IncomingBook, ReturnedAllbooks, ReturnedBook
-from icecream import ic
+from src.schemas import (
+    BookBatchRequest,
+    BulkBookError,
+    IncomingBook,
+    ReturnedAllbooks,
+    ReturnedBook,
+    ReturnedBookBatch,
+    ReturnedBookSearch,
+    ReturnedBulkBooks,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.configurations import get_async_session
+from src.cache import Cache, book_key, pack_response, seller_key, unpack_response
+from src.configurations import (
+    admit_request,
+    begin_snapshot,
+    get_cache,
+    get_read_cache,
+    get_read_session,
+    get_write_session,
+    is_replica_session,
+)
+from src.configurations.replicas import read_only_request
+from src.metrics import TimedRoute
+from src.queries import (
+    RETURNED_BOOK_COLUMNS,
+    book_search_filters,
+    books_by_ids_query,
+    books_query,
+    fetch_books,
+    fetch_search_facets,
+    search_books_query,
+    stream_books,
+)
+from src.utils import (
+    body_etag,
+    db_error_detail,
+    decode_cursor,
+    encode_cursor,
+    etag_matches,
+    if_match_versions,
+    is_foreign_key_violation,
+    loader_options_for,
+    row_etag,
+    serializer_for,
+)
 
-books_router = APIRouter(tags=["books"], prefix="/books")
+# admit_request - допуск запросов (src/admission): решается раньше сессии БД в ручках
+books_router = APIRouter(
+    tags=["books"], prefix="/books", route_class=TimedRoute, dependencies=[Depends(admit_request)]
+)
 
 # CRUD - Create, Read, Update, Delete
 
-DBSession = Annotated[AsyncSession, Depends(get_async_session)]
+# Чтение идет с реплик (если они есть), запись - в основную базу
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+WriteSession = Annotated[AsyncSession, Depends(get_write_session)]
+# Ручки записи сбрасывают кэш ответов, ручки чтения берут его через get_read_cache
+ResponseCache = Annotated[Cache, Depends(get_cache)]
+ReadCache = Annotated[Cache, Depends(get_read_cache)]
+IfNoneMatch = Annotated[Optional[str], Header()]
+IfMatch = Annotated[Optional[str], Header()]
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+BULK_BATCH_SIZE = 1000
+MAX_BATCH_IDS = 1000
+
+# Ручки чтения отдают ReturnedBook, поэтому и грузим только его колонки (и версию для ETag) - без продавца
+RETURNED_BOOK_OPTIONS = loader_options_for(Book, ReturnedBook, extra=("version",))
+
+# Ручки одной книги отдают готовые bytes: ORM-объект или строка Core сразу в orjson,
+# response_model остается только для документации
+BOOK_JSON = serializer_for(ReturnedBook)
 
 # Ручка для создания записи о книге в БД. Возвращает созданную книгу.
+# Один INSERT ... RETURNING и один COMMIT: существование продавца проверяет внешний ключ,
+# а созданная строка сразу возвращается из INSERT, без повторного SELECT.
 # @books_router.post("/books/", status_code=status.HTTP_201_CREATED)
 @books_router.post(
     "/", response_model=ReturnedBook, status_code=status.HTTP_201_CREATED
 )  # Прописываем модель ответа
 async def create_book(
     book: IncomingBook,
-    session: DBSession,
+    session: WriteSession,
+    cache: ResponseCache,
 ):  # прописываем модель валидирующую входные данные
-    # session = get_async_session() вместо этого мы используем иньекцию зависимостей DBSession
+    # session = get_write_session() вместо этого мы используем иньекцию зависимостей WriteSession
 
     # это - бизнес логика. Обрабатываем данные, сохраняем, преобразуем и т.д.
-    result = await session.execute(select(Seller).where(Seller.id == book.seller_id))
-    seller = result.scalars().first()
-
-    if not seller: 
+    try:
+        result = await session.execute(
+            insert(Book).values(**book.model_dump()).returning(*RETURNED_BOOK_COLUMNS)
+        )
+    except IntegrityError as e:
+        if not is_foreign_key_violation(e):
+            raise
         # просто return status.HTTP не работает,тк сервер крашится
         raise HTTPException(status_code=400, detail=f"Seller with id {book.seller_id} not found")
-    
-    new_book = Book(
-        **{
-            "title": book.title,
-            "author": book.author,
-            "year": book.year,
-            "pages": book.pages,
-            "seller_id": book.seller_id
-        }
-    )
 
-    session.add(new_book)
+    new_book = result.mappings().one()
     await session.commit()
-    await session.refresh(new_book)
-    return new_book
+    # В закэшированном ответе продавца теперь не хватает этой книги
+    await cache.delete(seller_key(book.seller_id))
+    return BOOK_JSON.response(new_book, status_code=status.HTTP_201_CREATED)
+
+
+# Ручка для массовой загрузки книг (например, всего каталога продавца).
+# Принимает JSON-массив IncomingBook или поток NDJSON (Content-Type: application/x-ndjson),
+# который читается построчно, не целиком. Продавцы проверяются одним запросом на пачку,
+# книги вставляются пачками одним INSERT ... RETURNING. Ошибочные строки не валят загрузку,
+# а попадают в errors со своим номером.
+@books_router.post("/bulk", response_model=ReturnedBulkBooks, status_code=status.HTTP_201_CREATED)
+async def create_books_bulk(request: Request, session: WriteSession, cache: ResponseCache):
+    ids: List[int] = []
+    errors: List[BulkBookError] = []
+    known_sellers: Set[int] = set()
+    touched_sellers: Set[int] = set()
+    batch: List[Tuple[int, IncomingBook]] = []
+
+    async for index, item in _read_bulk_items(request):
+        if isinstance(item, Exception):
+            errors.append(BulkBookError(index=index, detail=str(item)))
+            continue
+
+        try:
+            batch.append((index, IncomingBook.model_validate(item)))
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            errors.append(BulkBookError(index=index, detail=detail))
+            continue
+
+        if len(batch) >= BULK_BATCH_SIZE:
+            await _insert_books_batch(session, batch, known_sellers, touched_sellers, ids, errors)
+            batch = []
+
+    if batch:
+        await _insert_books_batch(session, batch, known_sellers, touched_sellers, ids, errors)
+
+    await session.commit()
+    await cache.delete(*map(seller_key, touched_sellers))
+    errors.sort(key=lambda error: error.index)
+    return ReturnedBulkBooks(created=len(ids), ids=ids, errors=errors)
+
+
+# Разбирает тело запроса на элементы. Вместо элемента с ошибкой разбора отдается исключение.
+async def _read_bulk_items(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        index = 0
+        tail = b""
+        async for chunk in request.stream():
+            *lines, tail = (tail + chunk).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, _parse_bulk_line(line)
+                    index += 1
+        if tail.strip():
+            yield index, _parse_bulk_line(tail)
+        return
+
+    try:
+        items = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of books")
+
+    for index, item in enumerate(items):
+        yield index, item
 
 
-# Ручка, возвращающая все книги
+def _parse_bulk_line(line: bytes) -> Any:
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        return ValueError(f"Invalid JSON: {e}")
+
+
+async def _insert_books_batch(
+    session: AsyncSession,
+    batch: List[Tuple[int, IncomingBook]],
+    known_sellers: Set[int],
+    touched_sellers: Set[int],
+    ids: List[int],
+    errors: List[BulkBookError],
+) -> None:
+    # Один запрос на всех еще не встречавшихся продавцов пачки
+    unchecked = {book.seller_id for _, book in batch} - known_sellers
+    if unchecked:
+        result = await session.execute(select(Seller.id).where(Seller.id.in_(unchecked)))
+        known_sellers.update(result.scalars())
+
+    rows: List[Tuple[int, Dict[str, Any]]] = []
+    for index, book in batch:
+        if book.seller_id not in known_sellers:
+            errors.append(BulkBookError(index=index, detail=f"Seller with id {book.seller_id} not found"))
+            continue
+        rows.append((index, book.model_dump()))
+
+    if not rows:
+        return
+
+    # Многострочный INSERT ... VALUES (...), (...) RETURNING id; порядок id совпадает с порядком строк.
+    # Пачка - в точке сохранения: если БД отвергла какую-то строку (продавца удалили после проверки и т.п.),
+    # откатывается только пачка, и ее строки вставляются по одной, каждая в своей точке сохранения,
+    # чтобы найти и записать в errors именно ошибочные
+    try:
+        async with session.begin_nested():
+            result = await session.execute(
+                insert(Book).returning(Book.id, sort_by_parameter_order=True), [row for _, row in rows]
+            )
+            batch_ids = list(result.scalars())
+    except DBAPIError:
+        for index, row in rows:
+            try:
+                async with session.begin_nested():
+                    ids.append(await session.scalar(insert(Book).values(row).returning(Book.id)))
+            except DBAPIError as e:
+                errors.append(BulkBookError(index=index, detail=db_error_detail(e)))
+                continue
+            touched_sellers.add(row["seller_id"])
+        return
+
+    ids.extend(batch_ids)
+    touched_sellers.update(row["seller_id"] for _, row in rows)
+
+
+# Ручка, возвращающая все книги.
+# Отдает страницу книг, отсортированных по id (keyset-пагинация): следующая страница
+# запрашивается по next_cursor из ответа. С ?stream=true отдает все книги после курсора
+# в формате NDJSON, вычитывая их серверным курсором - память не растет с размером таблицы.
+# author и title отбирают книги, у которых автор/название начинаются с заданной строки (без учета регистра).
+# Строки читаются без ORM и сразу сериализуются orjson: форма ответа сверена со схемой
+# ReturnedAllbooks при старте (см. src/queries), поэтому повторная валидация не нужна.
 @books_router.get("/", response_model=ReturnedAllbooks)
-async def get_all_books(session: DBSession):
+async def get_all_books(
+    session: ReadSession,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    author: Optional[str] = None,
+    title: Optional[str] = None,
+    stream: bool = False,
+    if_none_match: IfNoneMatch = None,
+):
     # Хотим видеть формат
-    # books: [{"id": 1, "title": "blabla", ...., "year": 2023},{...}]
-    query = select(Book).options(selectinload(Book.seller))  # SELECT * FROM book
-    result = await session.execute(query)
-    books = result.scalars().all()
-    return {"books": books}
+    # books: [{"id": 1, "title": "blabla", ...., "year": 2023},{...}], next_cursor: "..."
+    try:
+        after_id = decode_cursor(after) if after is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    query = books_query(after_id, author, title)  # SELECT id, title, ... FROM book WHERE id > :after_id
+
+    if stream:
+        return StreamingResponse(_stream_books(session, query), media_type="application/x-ndjson")
+
+    # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+    books = await fetch_books(session, query.limit(limit + 1))
+
+    next_cursor = None
+    if len(books) > limit:
+        books = books[:limit]
+        next_cursor = encode_cursor(books[-1]["id"])
+
+    # ETag страницы считается по телу: если у клиента та же страница, тело не отправляем
+    body = orjson.dumps({"books": books, "next_cursor": next_cursor})
+    etag = body_etag(body)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+async def _stream_books(session: AsyncSession, query):
+    # Сессия из зависимости закрывается до начала отправки ответа,
+    # поэтому для стрима открываем свою на том же движке (или соединении в тестах) - в транзакции со снимком.
+    async with AsyncSession(bind=session.bind) as stream_session:
+        await begin_snapshot(stream_session)
+        async for line in stream_books(stream_session, query, STREAM_BATCH_SIZE):
+            yield line
+
+
+# Поиск книг: q ищет по словам названия и автора (полнотекстовый поиск Postgres по GIN-индексу),
+# остальные параметры - фильтры, границы включительно. Результат постраничный, в порядке id.
+# На первой странице (без after) добавляются фасеты - сколько найденных книг в каждом году
+# и у каждого продавца; на следующих они не меняются и не пересчитываются (facets = null).
+# Объявлена до /{book_id}, иначе путь /search достался бы той ручке.
+@books_router.get("/search", response_model=ReturnedBookSearch)
+async def search_books(
+    session: ReadSession,
+    q: Optional[str] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    min_pages: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    seller_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+):
+    try:
+        after_id = decode_cursor(after) if after is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filters = book_search_filters(q, min_year, max_year, min_pages, max_pages, seller_id)
+    books = await fetch_books(session, search_books_query(filters, after_id).limit(limit + 1))
 
+    next_cursor = None
+    if len(books) > limit:
+        books = books[:limit]
+        next_cursor = encode_cursor(books[-1]["id"])
 
-# Ручка для получения книги по ее ИД
+    facets = await fetch_search_facets(session, filters) if after_id is None else None
+
+    return Response(
+        content=orjson.dumps({"books": books, "next_cursor": next_cursor, "facets": facets}),
+        media_type="application/json",
+    )
+
+
+# Ручка для получения нескольких книг за один запрос: GET /books/batch?ids=1,2,3.
+# Для длинных списков есть POST-форма с телом {"ids": [...]}.
+# Результаты идут в порядке запрошенных id (повторы сохраняются), ненайденные книги
+# отмечаются found = false. Сначала книги ищутся в кэше ответов (одним обращением),
+# остальные читаются одним запросом WHERE id = ANY(:ids) и кладутся в кэш.
+# Объявлены до /{book_id}, иначе путь /batch достался бы той ручке.
+@books_router.get("/batch", response_model=ReturnedBookBatch)
+async def get_books_batch(
+    session: ReadSession,
+    cache: ReadCache,
+    ids: str = Query(..., description="id книг через запятую"),
+):
+    try:
+        book_ids = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+
+    return await _get_books_batch(session, cache, book_ids)
+
+
+@books_router.post("/batch", response_model=ReturnedBookBatch, dependencies=[Depends(read_only_request)])
+async def post_books_batch(request_body: BookBatchRequest, session: ReadSession, cache: ReadCache):
+    return await _get_books_batch(session, cache, request_body.ids)
+
+
+async def _get_books_batch(session: AsyncSession, cache: Cache, book_ids: List[int]) -> Response:
+    if len(book_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+
+    keys = {book_key(book_id): book_id for book_id in dict.fromkeys(book_ids)}
+    values = await cache.load_many(
+        list(keys),
+        lambda missing: _load_books(session, [keys[key] for key in missing]),
+        replica=is_replica_session(session),
+    )
+    bodies: Dict[int, bytes] = {
+        book_id: unpack_response(value)[1] for book_id, value in zip(keys.values(), values) if value is not None
+    }
+
+    # Тела книг (из кэша или только что собранные) вставляются в ответ как есть, без повторного разбора
+    results = [
+        {"id": book_id, "found": True, "book": orjson.Fragment(bodies[book_id])}
+        if book_id in bodies
+        else {"id": book_id, "found": False, "book": None}
+        for book_id in book_ids
+    ]
+    return Response(content=orjson.dumps({"results": results}), media_type="application/json")
+
+
+# Найденные книги - упакованные ETag и тело по ключам кэша
+async def _load_books(session: AsyncSession, book_ids: List[int]) -> Dict[str, bytes]:
+    fresh: Dict[str, bytes] = {}
+    for book in await fetch_books(session, books_by_ids_query(book_ids)):
+        version = book.pop("version")
+        fresh[book_key(book["id"])] = pack_response(row_etag(book["id"], version), orjson.dumps(book))
+    return fresh
+
+
+# Ручка для получения книги по ее ИД.
+# Готовое тело ответа кэшируется, ручки записи сбрасывают его при изменении книги.
+# Одновременные запросы одной и той же книги мимо кэша делят один запрос к БД (Cache.load).
+# ETag строится по версии строки, поэтому на If-None-Match ответ 304 отдается без пересылки тела.
 @books_router.get("/{book_id}", response_model=ReturnedBook)
-async def get_book(book_id: int, session: DBSession):
-    result = await session.execute(
-        select(Book).options(selectinload(Book.seller)).where(Book.id == book_id)
+async def get_book(book_id: int, session: ReadSession, cache: ReadCache, if_none_match: IfNoneMatch = None):
+    cached = await cache.load(
+        book_key(book_id),
+        lambda: _load_book(session, book_id),
+        source=session.bind,
+        replica=is_replica_session(session),
     )
+
+    if cached is None:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    etag, body = unpack_response(cached)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+async def _load_book(session: AsyncSession, book_id: int) -> Optional[bytes]:
+    result = await session.execute(select(Book).options(*RETURNED_BOOK_OPTIONS).where(Book.id == book_id))
     book = result.scalars().first()
 
     if not book:
-        return Response(status_code=status.HTTP_404_NOT_FOUND)
+        return None
 
-    return book
+    return pack_response(row_etag(book.id, book.version), BOOK_JSON.dumps(book))
 
 
-# Ручка для удаления книги
+# Ручка для удаления книги. Один DELETE ... RETURNING: продавец нужен, чтобы сбросить его кэш
 @books_router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_book(book_id: int, session: DBSession):
-    result = await session.execute(select(Book).where(Book.id == book_id))
-    deleted_book = result.scalars().first()
-    ic(deleted_book)  # Красивая и информативная замена для print. Полезна при отладке.
-    if deleted_book:
-        await session.delete(deleted_book)
-        await session.commit()
-    else:
+async def delete_book(book_id: int, session: WriteSession, cache: ResponseCache):
+    result = await session.execute(
+        delete(Book)
+        .where(Book.id == book_id)
+        .returning(Book.seller_id)
+        .execution_options(synchronize_session="fetch")
+    )
+    deleted_book = result.first()
+
+    if not deleted_book:
         return Response(status_code=status.HTTP_404_NOT_FOUND)
 
+    await session.commit()
 
-# Ручка для обновления данных о книге
-@books_router.put("/{book_id}", response_model=ReturnedBook)
-async def update_book(book_id: int, new_book_data: ReturnedBook, session: DBSession):
-    result = await session.execute(select(Book).where(Book.id == book_id))
-    updated_book = result.scalars().first()
+    keys = [book_key(book_id)]
+    if deleted_book.seller_id:
+        keys.append(seller_key(deleted_book.seller_id))
+    await cache.delete(*keys)
 
-    if not updated_book:
-        return status.HTTP_404_NOT_FOUND
 
+# Ручка для обновления данных о книге.
+# С заголовком If-Match обновление пройдет, только если книга не менялась с тех пор, как клиент ее прочитал
+# (иначе 412). Вся работа - один UPDATE ... RETURNING: версия из If-Match проверяется в WHERE,
+# существование продавца - внешним ключом, а прежний продавец (для сброса кэша) читается
+# из того же запроса через подзапрос с блокировкой строки.
+@books_router.put("/{book_id}", response_model=ReturnedBook)
+async def update_book(
+    book_id: int,
+    new_book_data: ReturnedBook,
+    session: WriteSession,
+    cache: ResponseCache,
+    if_match: IfMatch = None,
+):
+    values = {
+        "title": new_book_data.title,
+        "author": new_book_data.author,
+        "year": new_book_data.year,
+        "pages": new_book_data.pages,
+        "version": Book.version + 1,
+    }
     if new_book_data.seller_id:
-        seller_result = await session.execute(select(Seller).where(Seller.id == new_book_data.seller_id))
-        seller = seller_result.scalars().first()
+        values["seller_id"] = new_book_data.seller_id
 
-        if not seller:
-            return Response(status_code=status.HTTP_404_NOT_FOUND)
+    old_book = select(Book.id, Book.seller_id).where(Book.id == book_id).with_for_update().subquery()
+    query = (
+        update(Book)
+        .where(Book.id == old_book.c.id)
+        .values(**values)
+        .returning(*RETURNED_BOOK_COLUMNS, Book.version, old_book.c.seller_id.label("old_seller_id"))
+        .execution_options(synchronize_session="fetch")
+    )
 
-        updated_book.seller_id = new_book_data.seller_id
+    versions = if_match_versions(if_match, book_id)
+    if versions is not None:
+        query = query.where(Book.version.in_(versions))
+
+    try:
+        result = await session.execute(query)
+    except IntegrityError as e:
+        if not is_foreign_key_violation(e):
+            raise
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
 
-    updated_book.author = new_book_data.author
-    updated_book.title = new_book_data.title
-    updated_book.year = new_book_data.year
-    updated_book.pages = new_book_data.pages
+    updated_book = result.mappings().first()
+
+    if not updated_book:
+        # Лишний запрос только на пути ошибки: книги нет или ее версия не совпала с If-Match
+        if versions is not None and await session.scalar(select(Book.id).where(Book.id == book_id)):
+            raise HTTPException(status_code=412, detail="Book was modified by someone else")
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
 
     await session.commit()
-    await session.refresh(updated_book)
 
-    return updated_book
\ No newline at end of file
+    # Книга могла перейти к другому продавцу - сбрасываем обоих
+    seller_ids = {updated_book["old_seller_id"], updated_book["seller_id"]} - {None}
+    await cache.delete(book_key(book_id), *map(seller_key, seller_ids))
+
+    return BOOK_JSON.response(updated_book, headers={"ETag": row_etag(book_id, updated_book["version"])})
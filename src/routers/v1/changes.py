@@ -0,0 +1,125 @@
+import asyncio
+from typing import AsyncIterator, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, WebSocket, status
+from fastapi.responses import StreamingResponse
+
+from src.changes import (
+    ChangeFeed,
+    PositionExpired,
+    Subscription,
+    SubscriptionEnded,
+    change_message,
+    decode_position,
+    encode_position,
+)
+from src.configurations import get_change_feed
+from src.configurations.settings import settings
+from src.metrics import TimedRoute
+
+changes_router = APIRouter(prefix="/changes", tags=["changes"], route_class=TimedRoute)
+
+# Коды закрытия WebSocket: неверная позиция, позиция старше хранимых событий (как 410 Gone у SSE)
+# и конец подписки (медленный клиент или остановка воркера) - переподключиться с последней позицией
+WS_INVALID_POSITION = 1008
+WS_POSITION_EXPIRED = 4410
+WS_RESUME_LATER = 1013
+
+
+def _parse_position(token: Optional[str]):
+    return decode_position(token) if token else None
+
+
+# Лента изменений книг и продавцов (Server-Sent Events) вместо опроса списков.
+# Событие: id - позиция, data - {"position", "entity": book|seller, "id", "op": insert|update|delete, "changed_at"}.
+# Первым приходит событие ready с текущей позицией. Продолжить с позиции - ?after=<position>
+# или заголовок Last-Event-ID (его сам шлет EventSource браузера при переподключении).
+# Позиция старше хранимых событий (change_retention_hours) - 410: клиенту нужно перечитать данные целиком.
+@changes_router.get("", response_class=StreamingResponse)
+async def stream_changes(
+    after: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    feed: ChangeFeed = Depends(get_change_feed),
+):
+    try:
+        position = _parse_position(last_event_id or after)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        subscription = await feed.subscribe(position)
+    except PositionExpired:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Position is older than retained changes")
+
+    return StreamingResponse(
+        _sse(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _sse(subscription: Subscription) -> AsyncIterator[bytes]:
+    try:
+        position = encode_position(subscription.position)
+        yield b"id: %s\nevent: ready\ndata: %s\n\n" % (position.encode(), orjson.dumps({"position": position}))
+        while True:
+            try:
+                change = await subscription.next(timeout=settings.change_keepalive_seconds)
+            except SubscriptionEnded:
+                return
+            if change is None:
+                yield b": keepalive\n\n"
+                continue
+            message = change_message(change)
+            yield b"id: %s\nevent: change\ndata: %s\n\n" % (message["position"].encode(), orjson.dumps(message))
+    finally:
+        subscription.close()
+
+
+# Та же лента через WebSocket: ?after=<position>, сообщения - JSON с полем type (ready, change, ping).
+# Когда подписка кончается, сервер закрывает соединение с кодом 1013 - переподключиться с последней позицией.
+@changes_router.websocket("/ws")
+async def changes_websocket(
+    websocket: WebSocket,
+    after: Optional[str] = None,
+    feed: ChangeFeed = Depends(get_change_feed),
+):
+    try:
+        position = _parse_position(after)
+    except ValueError as e:
+        await websocket.close(code=WS_INVALID_POSITION, reason=str(e))
+        return
+    try:
+        subscription = await feed.subscribe(position)
+    except PositionExpired:
+        await websocket.close(code=WS_POSITION_EXPIRED, reason="Position is older than retained changes")
+        return
+
+    await websocket.accept()
+    sender = asyncio.create_task(_send_changes(websocket, subscription))
+    receiver = asyncio.create_task(_wait_disconnect(websocket))
+    try:
+        await asyncio.wait((sender, receiver), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sender.cancel()
+        receiver.cancel()
+        await asyncio.gather(sender, receiver, return_exceptions=True)
+        subscription.close()
+
+    if sender.done() and not sender.cancelled() and isinstance(sender.exception(), SubscriptionEnded):
+        await websocket.close(code=WS_RESUME_LATER)
+
+
+async def _send_changes(websocket: WebSocket, subscription: Subscription) -> None:
+    ready = {"type": "ready", "position": encode_position(subscription.position)}
+    await websocket.send_text(orjson.dumps(ready).decode())
+    while True:
+        change = await subscription.next(timeout=settings.change_keepalive_seconds)
+        message = {"type": "change", **change_message(change)} if change else {"type": "ping"}
+        await websocket.send_text(orjson.dumps(message).decode())
+
+
+# Сообщения клиента не нужны, читаем их только чтобы заметить, что он отключился
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
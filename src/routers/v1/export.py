@@ -0,0 +1,67 @@
+import zlib
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.configurations import get_read_session
+from src.metrics import TimedRoute
+from src.queries import ExportFormat, copy_query, copy_to_stream, export_books_query
+
+export_router = APIRouter(prefix="/export", tags=["export"], route_class=TimedRoute)
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+# Быстрое сжатие: выгрузка упирается в сеть, а не в размер на диске клиента
+GZIP_LEVEL = 1
+
+
+# Полная выгрузка книг с продавцами для партнеров: csv (с заголовком) или ndjson, в порядке id.
+# Данные идут из Postgres (COPY ... TO STDOUT) клиенту потоком, не собираясь в памяти ни целиком,
+# ни построчно в Python. Фильтры: продавец и годы издания (включительно).
+# Если клиент принимает gzip (Accept-Encoding), поток сжимается на лету.
+@export_router.get("/books", response_class=StreamingResponse)
+async def export_books(
+    session: AsyncSession = Depends(get_read_session),
+    format: ExportFormat = Query("csv"),
+    seller_id: Optional[int] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    accept_encoding: Optional[str] = Header(None),
+):
+    sql, args, options = copy_query(export_books_query(seller_id, min_year, max_year), format)
+    content = _copy(session, sql, args, options)
+    headers = {"Content-Disposition": f'attachment; filename="books.{format}"', "Vary": "Accept-Encoding"}
+    if _accepts_gzip(accept_encoding):
+        content = _gzip(content)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(content, media_type=MEDIA_TYPES[format], headers=headers)
+
+
+async def _copy(session: AsyncSession, sql: str, args: list, options: dict) -> AsyncIterator[bytes]:
+    # Сессия из зависимости закрывается до начала отправки ответа, поэтому для выгрузки открываем свою
+    # на том же движке (или соединении в тестах). COPY - один запрос, снимок данных у него и так один.
+    async with AsyncSession(bind=session.bind) as export_session:
+        conn = await export_session.connection()
+        raw = await conn.get_raw_connection()
+        async for chunk in copy_to_stream(raw.driver_connection, sql, args, options):
+            yield chunk
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 - формат gzip
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
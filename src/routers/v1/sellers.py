@@ -1,97 +1,302 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+import logging
+
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
-from icecream import ic
-from src.configurations import get_async_session
+from typing import Iterable, List, Literal, Optional, Tuple
+from src.cache import Cache, book_key, pack_response, seller_key, unpack_response
+from src.configurations import (
+    admit_request,
+    get_cache,
+    get_read_cache,
+    get_read_session,
+    get_write_session,
+    is_replica_session,
+)
+from src.configurations.settings import settings
+from src.jobs import claim_seller_purge, fetch_seller_purge, start_seller_purge
+from src.metrics import TimedRoute
+from src.models.books import Book
 from src.models.sellers import Seller
-from src.schemas.sellers import SellerCreate, SellerResponse, SellerUpdate
+from src.queries import (
+    SELLER_BOOK_COLUMNS,
+    SELLER_COLUMNS,
+    fetch_books,
+    fetch_seller_book_count,
+    fetch_seller_stats,
+    fetch_seller_summaries,
+    seller_books_query,
+)
+from src.schemas.sellers import (
+    SellerBooks,
+    SellerCreate,
+    SellerPurgeStatus,
+    SellerResponse,
+    SellerSummary,
+    SellerUpdate,
+)
+from src.schemas.stats import SellerStats
+from src.utils import (
+    body_etag,
+    decode_cursor,
+    encode_cursor,
+    etag_matches,
+    if_match_versions,
+    is_unique_violation,
+    row_etag,
+    serializer_for,
+)
+
+seller_router = APIRouter(
+    prefix="/seller", tags=["Sellers"], route_class=TimedRoute, dependencies=[Depends(admit_request)]
+)
 
-seller_router = APIRouter(prefix="/seller", tags=["Sellers"])
+logger = logging.getLogger(__name__)
 
-# Создать нового продавца
+DEFAULT_BOOKS_PAGE_SIZE = 100
+MAX_BOOKS_PAGE_SIZE = 1000
+MAX_INCLUDED_BOOKS = 100  # книг на продавца в списке с ?include=books
+
+# Ручки одного продавца отдают готовые bytes: ORM-объект или строки Core сразу в orjson,
+# response_model остается только для документации
+SELLER_JSON = serializer_for(SellerResponse)
+
+
+# ETag продавца зависит и от версий его книг - они входят в тело ответа
+def _seller_etag(seller_id: int, version: int, book_versions: Iterable[Tuple[int, int]]) -> str:
+    return row_etag(seller_id, version, book_versions)
+
+
+# Создать нового продавца.
+# Один INSERT ... ON CONFLICT (email) DO NOTHING RETURNING и один COMMIT: занятый email
+# определяется по тому, что строка не вставилась, а у нового продавца еще нет книг.
 @seller_router.post("/", response_model=SellerResponse, status_code=status.HTTP_201_CREATED
 )
-async def create_seller(seller: SellerCreate, session: AsyncSession = Depends(get_async_session)):
-    print("Полученные данные:", seller.model_dump())
-    result = await session.execute(select(Seller).where(Seller.email == seller.email))
-    existing_seller = result.scalars().first()
-    
-    if existing_seller: # опять же с return.status работает некорректно
-        raise HTTPException(400, detail="Seller with this email already exists")
-    
-    new_seller = Seller(
-        first_name=seller.first_name,
-        last_name=seller.last_name,
-        email=seller.email
+async def create_seller(seller: SellerCreate, session: AsyncSession = Depends(get_write_session)):
+    logger.debug("Полученные данные: %s", seller)
+    result = await session.execute(
+        insert(Seller)
+        .values(first_name=seller.first_name, last_name=seller.last_name, email=seller.email)
+        .on_conflict_do_nothing(index_elements=[Seller.email])
+        .returning(*SELLER_COLUMNS)
     )
+    new_seller = result.mappings().first()
+
+    if not new_seller: # опять же с return.status работает некорректно
+        raise HTTPException(400, detail="Seller with this email already exists")
 
-    session.add(new_seller)
     await session.commit()
-    await session.refresh(new_seller)
+    return SELLER_JSON.response({**new_seller, "books": []}, status_code=status.HTTP_201_CREATED)
 
-    # чтобы избежать ошибки MissingGreenlet
-    result = await session.execute(
-        select(Seller).options(selectinload(Seller.books)).where(Seller.id == new_seller.id)
-    )
-    new_seller = result.scalars().first()
+# Получить всех продавцов.
+# Вместо всех книг у каждого продавца только их число (book_count), так что ответ не растет с числом книг.
+# С ?include=books к каждому продавцу добавляются его первые books_limit книг - тем же запросом.
+# Все книги продавца постранично отдает GET /seller/{seller_id}/books.
+# Читаем строки без ORM и сразу сериализуем orjson - форма ответа сверена с SellerSummary при старте
+# ETag списка считается по телу: если у клиента тот же список, тело не отправляем
+@seller_router.get("/", response_model=List[SellerSummary])
+async def get_all_sellers(
+    session: AsyncSession = Depends(get_read_session),
+    include: Optional[Literal["books"]] = None,
+    books_limit: int = Query(10, ge=1, le=MAX_INCLUDED_BOOKS),
+    if_none_match: Optional[str] = Header(None),
+):
+    sellers = await fetch_seller_summaries(session, books_limit if include == "books" else None)
+    body = orjson.dumps(sellers)
+    etag = body_etag(body)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
 
-    return new_seller
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
-# Получить всех продавцов
-@seller_router.get("/", response_model=List[SellerResponse])
-async def get_all_sellers(session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(
-        select(Seller).options(selectinload(Seller.books))
+# Книги продавца постранично, в порядке id. Следующая страница запрашивается по next_cursor из ответа.
+# Наличие продавца проверяется отдельным запросом, только если страница пустая.
+@seller_router.get("/{seller_id}/books", response_model=SellerBooks)
+async def get_seller_books(
+    seller_id: int,
+    session: AsyncSession = Depends(get_read_session),
+    limit: int = Query(DEFAULT_BOOKS_PAGE_SIZE, ge=1, le=MAX_BOOKS_PAGE_SIZE),
+    after: Optional[str] = None,
+):
+    try:
+        after_id = decode_cursor(after) if after is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+    books = await fetch_books(session, seller_books_query(seller_id, after_id).limit(limit + 1))
+
+    if not books:
+        seller_exists = await session.scalar(select(Seller.id).where(Seller.id == seller_id))
+        if seller_exists is None:
+            return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    next_cursor = None
+    if len(books) > limit:
+        books = books[:limit]
+        next_cursor = encode_cursor(books[-1]["id"])
+
+    return Response(
+        content=orjson.dumps({"books": books, "next_cursor": next_cursor}), media_type="application/json"
     )
-    sellers = result.scalars().all()
-    return sellers
 
-# Получить одного продавца (с его книгами)
+# Статистика продавца: число книг и страниц всего и по годам издания.
+# Читается из сводки, которую ведут триггеры БД, - цена запроса не зависит от числа книг.
+@seller_router.get("/{seller_id}/stats", response_model=SellerStats)
+async def get_seller_stats(seller_id: int, session: AsyncSession = Depends(get_read_session)):
+    stats = await fetch_seller_stats(session, seller_id)
+    if stats is None:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    return Response(content=orjson.dumps(stats), media_type="application/json")
+
+# Получить одного продавца (с его книгами).
+# Готовое тело ответа кэшируется, ручки записи продавцов и книг сбрасывают его при изменениях.
+# Одновременные запросы одного и того же продавца мимо кэша делят один запрос к БД (Cache.load).
+# ETag строится по версиям строк, поэтому на If-None-Match ответ 304 отдается без пересылки тела.
 @seller_router.get("/{seller_id}", response_model=SellerResponse)
-async def get_seller(seller_id: int, session: AsyncSession = Depends(get_async_session)):
+async def get_seller(
+    seller_id: int,
+    session: AsyncSession = Depends(get_read_session),
+    cache: Cache = Depends(get_read_cache),
+    if_none_match: Optional[str] = Header(None),
+):
+    cached = await cache.load(
+        seller_key(seller_id),
+        lambda: _load_seller(session, seller_id),
+        source=session.bind,
+        replica=is_replica_session(session),
+    )
+
+    if cached is None:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    etag, body = unpack_response(cached)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+async def _load_seller(session: AsyncSession, seller_id: int) -> Optional[bytes]:
     result = await session.execute(
         select(Seller).options(selectinload(Seller.books)).where(Seller.id == seller_id)
     )
     seller = result.scalars().first()
 
     if not seller:
-        return Response(status_code=status.HTTP_404_NOT_FOUND)
+        return None
 
-    return seller
+    etag = _seller_etag(seller.id, seller.version, [(book.id, book.version) for book in seller.books])
+    return pack_response(etag, SELLER_JSON.dumps(seller))
 
-# Обновить данные продавца
+# Обновить данные продавца.
+# С заголовком If-Match обновление пройдет, только если данные продавца не менялись с тех пор,
+# как клиент его прочитал (книги на это не влияют - их эта ручка не меняет).
+# Два запроса и один COMMIT: UPDATE ... RETURNING с проверкой версии в WHERE и SELECT книг для ответа.
 @seller_router.put("/{seller_id}", response_model=SellerResponse)
-async def update_seller(seller_id: int, seller_update: SellerUpdate, session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(
-        select(Seller).options(selectinload(Seller.books)).where(Seller.id == seller_id)
+async def update_seller(
+    seller_id: int,
+    seller_update: SellerUpdate,
+    session: AsyncSession = Depends(get_write_session),
+    cache: Cache = Depends(get_cache),
+    if_match: Optional[str] = Header(None),
+):
+    values = {
+        field: value for field, value in seller_update.model_dump().items() if value
+    }
+    query = (
+        update(Seller)
+        .where(Seller.id == seller_id)
+        .values(**values, version=Seller.version + 1)
+        .returning(*SELLER_COLUMNS, Seller.version)
+        .execution_options(synchronize_session="fetch")
     )
-    existing_seller = result.scalars().first()
 
-    if not existing_seller:
-        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    versions = if_match_versions(if_match, seller_id)
+    if versions is not None:
+        query = query.where(Seller.version.in_(versions))
 
-    existing_seller.first_name = seller_update.first_name or existing_seller.first_name
-    existing_seller.last_name = seller_update.last_name or existing_seller.last_name
-    existing_seller.email = seller_update.email or existing_seller.email
+    try:
+        result = await session.execute(query)
+    except IntegrityError as e:
+        if not is_unique_violation(e):
+            raise
+        raise HTTPException(400, detail="Seller with this email already exists")
 
-    await session.commit()
-    await session.refresh(existing_seller)
-    return existing_seller
+    updated_seller = result.mappings().first()
 
+    if not updated_seller:
+        # Лишний запрос только на пути ошибки: продавца нет или его версия не совпала с If-Match
+        if versions is not None and await session.scalar(select(Seller.id).where(Seller.id == seller_id)):
+            raise HTTPException(status_code=412, detail="Seller was modified by someone else")
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
 
-# Удалить продавца (вместе с книгами)
-@seller_router.delete("/{seller_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_seller(seller_id: int, session: AsyncSession = Depends(get_async_session)):
     result = await session.execute(
-        select(Seller).where(Seller.id == seller_id)
+        select(*SELLER_BOOK_COLUMNS, Book.version).where(Book.seller_id == seller_id).order_by(Book.id)
     )
-    seller = result.scalars().first()
+    books = result.mappings().all()
+    await session.commit()
 
-    if not seller:
+    etag = _seller_etag(seller_id, updated_seller["version"], [(book["id"], book["version"]) for book in books])
+    await cache.delete(seller_key(seller_id))
+    return SELLER_JSON.response({**updated_seller, "books": books}, headers={"ETag": etag})
+
+
+# Удалить продавца (вместе с книгами).
+# Книги удаляет каскад внешнего ключа в том же DELETE, ORM их не загружает. Продавец, у которого книг
+# больше SELLER_PURGE_THRESHOLD, удаляется фоновой задачей пачками (src/jobs/purges.py): ответ 202,
+# ход удаления - в GET /seller/{seller_id}/purge (на него же указывает заголовок Location).
+# Число книг берется из сводки статистики, поэтому проверка не зависит от их количества.
+@seller_router.delete(
+    "/{seller_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={202: {"model": SellerPurgeStatus, "description": "Seller is being deleted in background"}},
+)
+async def delete_seller(
+    seller_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_write_session),
+    cache: Cache = Depends(get_cache),
+):
+    book_count = await fetch_seller_book_count(session, seller_id)
+
+    if book_count is None:
         return Response(status_code=status.HTTP_404_NOT_FOUND)
 
-    await session.delete(seller)
+    if book_count > settings.seller_purge_threshold:
+        purge = await claim_seller_purge(session, seller_id, book_count)
+        await session.commit()
+        if purge is not None:
+            start_seller_purge(session.bind, cache, seller_id, settings.seller_purge_batch_size)
+        else:
+            purge = await fetch_seller_purge(session, seller_id)
+        return Response(
+            content=orjson.dumps(purge),
+            status_code=status.HTTP_202_ACCEPTED,
+            media_type="application/json",
+            headers={"Location": str(request.url_for("get_seller_purge", seller_id=seller_id))},
+        )
+
+    # Книги продавца удалятся вместе с ним - их ключи в кэше тоже нужно сбросить
+    result = await session.execute(select(Book.id).where(Book.seller_id == seller_id))
+    keys = [seller_key(seller_id), *map(book_key, result.scalars())]
+
+    await session.execute(delete(Seller).where(Seller.id == seller_id))
     await session.commit()
-    return {"message": "Seller deleted"}
\ No newline at end of file
+    await cache.delete(*keys)
+
+
+# Ход фонового удаления продавца (см. delete_seller). Запись остается и после того, как продавец удален
+@seller_router.get("/{seller_id}/purge", response_model=SellerPurgeStatus)
+async def get_seller_purge(seller_id: int, session: AsyncSession = Depends(get_read_session)):
+    purge = await fetch_seller_purge(session, seller_id)
+    if purge is None:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    return Response(content=orjson.dumps(purge), media_type="application/json")
@@ -0,0 +1,18 @@
+import orjson
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.configurations import get_read_session
+from src.metrics import TimedRoute
+from src.queries import fetch_catalog_stats
+from src.schemas.stats import CatalogStats
+
+stats_router = APIRouter(prefix="/stats", tags=["stats"], route_class=TimedRoute)
+
+
+# Статистика каталога: число продавцов, книг и страниц, распределение книг по годам издания.
+# Читается из сводок, которые ведут триггеры БД, - цена запроса не зависит от размера каталога.
+@stats_router.get("", response_model=CatalogStats)
+async def get_catalog_stats(session: AsyncSession = Depends(get_read_session)):
+    stats = await fetch_catalog_stats(session)
+    return Response(content=orjson.dumps(stats), media_type="application/json")
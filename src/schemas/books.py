@@ -1,8 +1,21 @@
 from typing import List, Optional
-from pydantic import BaseModel, Field, field_validator
+from pydantic import AliasChoices, BaseModel, Field, field_validator
 from pydantic_core import PydanticCustomError
 
-__all__ = ["IncomingBook", "ReturnedBook", "ReturnedAllbooks", "BookResponse"]
+__all__ = [
+    "IncomingBook",
+    "ReturnedBook",
+    "ReturnedAllbooks",
+    "BookResponse",
+    "BulkBookError",
+    "ReturnedBulkBooks",
+    "FacetCount",
+    "BookFacets",
+    "ReturnedBookSearch",
+    "BookBatchRequest",
+    "BatchBookResult",
+    "ReturnedBookBatch",
+]
 
 
 # Базовый класс "Книги", содержащий поля, которые есть во всех классах-наследниках.
@@ -13,7 +26,10 @@ class BaseBook(BaseModel):
 
 
 # Класс для валидации входящих данных. Не содержит id так как его присваивает БД.
+# Длины строк - как у колонок books_table: слишком длинное значение отклоняется здесь, а не ошибкой БД.
 class IncomingBook(BaseBook):
+    title: str = Field(max_length=50)
+    author: str = Field(max_length=100)
     pages: int = Field(default=150, alias="count_pages")
     seller_id: int
 
@@ -36,11 +52,65 @@ class ReturnedBook(BaseBook):
 # Класс для возврата массива объектов "Книга"
 class ReturnedAllbooks(BaseModel):
     books: List[ReturnedBook]
+    next_cursor: Optional[str] = None  # курсор следующей страницы, None - страниц больше нет
+
+
+# Ошибка в одной строке массовой загрузки. index - номер строки во входных данных (с нуля)
+class BulkBookError(BaseModel):
+    index: int
+    detail: str
+
+
+# Итог массовой загрузки книг: id созданных книг по порядку и ошибки по строкам
+class ReturnedBulkBooks(BaseModel):
+    created: int
+    ids: List[int]
+    errors: List[BulkBookError]
+
+
+# Значение фасета и число найденных книг с ним (value = None - книги без продавца)
+class FacetCount(BaseModel):
+    value: Optional[int]
+    count: int
+
+
+class BookFacets(BaseModel):
+    years: List[FacetCount]
+    sellers: List[FacetCount]
+
+
+# Результат поиска книг. facets считаются по всем найденным книгам и только для первой страницы
+class ReturnedBookSearch(BaseModel):
+    books: List[ReturnedBook]
+    next_cursor: Optional[str] = None
+    facets: Optional[BookFacets] = None
+
+
+# Запрос нескольких книг сразу (POST-форма GET /books/batch для длинных списков)
+class BookBatchRequest(BaseModel):
+    ids: List[int]
+
+
+# Книга из пакетного запроса: found = False и book = None, если книги с таким id нет
+class BatchBookResult(BaseModel):
+    id: int
+    found: bool
+    book: Optional[ReturnedBook] = None
+
+
+# Результаты пакетного запроса - в том же порядке, что и запрошенные id (с повторами)
+class ReturnedBookBatch(BaseModel):
+    results: List[BatchBookResult]
 
 
 class BookResponse(BaseBook):
     id: int
-    pages: int = Field(default=150, alias="count_pages")
+    # из ORM-объекта читается pages, в ответ уходит count_pages
+    pages: int = Field(
+        default=150,
+        validation_alias=AliasChoices("pages", "count_pages"),
+        serialization_alias="count_pages",
+    )
     seller_id: Optional[int] = None
     
     class Config:
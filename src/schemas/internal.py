@@ -0,0 +1,30 @@
+from typing import List
+
+from pydantic import BaseModel
+
+__all__ = ["PoolStats", "ReplicaPoolStats", "DatabasePoolStats"]
+
+
+# Состояние пула соединений текущего воркера. Время - в секундах.
+# wait_time_recent - ожидание соединения за последние секунды (по нему допуск отклоняет запросы)
+class PoolStats(BaseModel):
+    size: int
+    checked_out: int
+    idle: int
+    overflow: int
+    max_overflow: int
+    waiting: int
+    checkouts: int
+    timeouts: int
+    wait_time_avg: float
+    wait_time_max: float
+    wait_time_recent: float
+
+
+class ReplicaPoolStats(PoolStats):
+    host: str
+
+
+# Пул основной базы (поля верхнего уровня) и пулы реплик для чтения
+class DatabasePoolStats(PoolStats):
+    replicas: List[ReplicaPoolStats] = []
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
 from .books import BookResponse
@@ -17,6 +19,28 @@ class SellerResponse(SellerBase):
     class Config:
         from_attributes = True  # Используется для конвертации SQLAlchemy-моделей в Pydantic
 
+# Продавец в списке: вместо всех книг - их число.
+# books есть только при ?include=books и содержит не больше books_limit первых книг.
+class SellerSummary(SellerBase):
+    id: int
+    book_count: int
+    books: Optional[List[BookResponse]] = None
+
+# Страница книг одного продавца; next_cursor - курсор следующей страницы, None - страниц больше нет
+class SellerBooks(BaseModel):
+    books: List[BookResponse]
+    next_cursor: Optional[str] = None
+
+# Состояние фонового удаления продавца: status - running, done или failed (тогда в error - причина)
+class SellerPurgeStatus(BaseModel):
+    seller_id: int
+    status: str
+    total_books: int
+    deleted_books: int
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
 class SellerUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
@@ -0,0 +1,28 @@
+from typing import List
+
+from pydantic import BaseModel
+
+__all__ = ["YearStats", "SellerStats", "CatalogStats"]
+
+
+# Книги одного года издания: сколько их и сколько в них страниц
+class YearStats(BaseModel):
+    year: int
+    book_count: int
+    pages_total: int
+
+
+# Статистика продавца; years - по возрастанию года, только годы, в которых у него есть книги
+class SellerStats(BaseModel):
+    seller_id: int
+    book_count: int
+    pages_total: int
+    years: List[YearStats]
+
+
+# Статистика всего каталога
+class CatalogStats(BaseModel):
+    seller_count: int
+    book_count: int
+    pages_total: int
+    years: List[YearStats]
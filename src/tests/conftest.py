@@ -8,10 +8,14 @@ import random
 import httpx
 import pytest
 import pytest_asyncio
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
+from src.admission import AdmissionController, AdmissionLimits
+from src.cache import MemoryCache
 from src.configurations.settings import settings
-from src.models import books  # noqa
+from src.metrics import instrument_engine
+from src.models import books, changes, purges, stats  # noqa
 from src.models.base import BaseModel
 from src.models.books import Book  # noqa F401
 from src.models.sellers import Seller
@@ -24,6 +28,8 @@ async_test_engine = create_async_engine(
     settings.database_test_url,
     echo=True,
 )
+# Как и движок приложения, считает SQL-запросы для метрик и Server-Timing
+instrument_engine(async_test_engine)
 
 # Создаем фабрику сессий для тестового движка.
 async_test_session = async_sessionmaker(
@@ -50,11 +56,14 @@ async def create_tables() -> None:
         await connection.run_sync(BaseModel.metadata.create_all)
 
 
+# TRUNCATE, а не DELETE: триггеры сводок статистики на него не срабатывают,
+# и сводки очищаются вместе с данными, а не пересчитываются построчно.
+# RESTART IDENTITY - id в каждом тесте начинаются с 1 независимо от порядка тестов
 @pytest_asyncio.fixture(scope="function", autouse=True)
 async def clear_db(db_session):
+    tables = ", ".join(table.name for table in BaseModel.metadata.sorted_tables)
     async with db_session.begin():
-        for table in reversed(BaseModel.metadata.sorted_tables):
-            await db_session.execute(table.delete()) 
+        await db_session.execute(text(f"TRUNCATE {tables} RESTART IDENTITY"))
 
 
 # Создаем сессию для БД используемую для тестов
@@ -76,14 +85,32 @@ def override_get_async_session(db_session):
     return _override_get_async_session
 
 
+# Свой пустой кэш ответов на каждый тест, чтобы тесты не видели данные друг друга
+@pytest.fixture(scope="function")
+def response_cache():
+    return MemoryCache()
+
+
+# Допуск запросов без пределов; тесты test_admission.py подставляют свой контроллер
+@pytest.fixture(scope="function")
+def admission():
+    return AdmissionController(AdmissionLimits(), AdmissionLimits())
+
+
 # Мы не можем создать 2 приложения (app) - это приведет к ошибкам.
-# Поэтому, на время запуска тестов мы подменяем там зависимость с сессией
+# Поэтому, на время запуска тестов мы подменяем там зависимости с сессией, кэшем и допуском запросов
 @pytest.fixture(scope="function")
-def test_app(override_get_async_session):
-    from src.configurations.database import get_async_session
+def test_app(override_get_async_session, response_cache, admission):
+    from src.configurations.admission import get_admission
+    from src.configurations.cache import get_cache
+    from src.configurations.database import get_read_session, get_write_session
     from src.main import app
 
-    app.dependency_overrides[get_async_session] = override_get_async_session
+    # чтение и запись идут в одну тестовую сессию; маршрутизацию по репликам проверяет test_replicas.py
+    app.dependency_overrides[get_write_session] = override_get_async_session
+    app.dependency_overrides[get_read_session] = override_get_async_session
+    app.dependency_overrides[get_cache] = lambda: response_cache
+    app.dependency_overrides[get_admission] = lambda: admission
 
     return app
 
@@ -98,6 +125,33 @@ async def async_client(test_app):
         yield test_client
 
 
+# Список SQL-запросов, отправленных в тестовую БД во время теста (включая COMMIT и ROLLBACK).
+# Позволяет проверять, сколько обращений к базе делает ручка.
+@pytest.fixture(scope="function")
+def sql_statements():
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def _commit(conn):
+        statements.append("COMMIT")
+
+    def _rollback(conn):
+        statements.append("ROLLBACK")
+
+    listeners = [
+        ("before_cursor_execute", _before_cursor_execute),
+        ("commit", _commit),
+        ("rollback", _rollback),
+    ]
+    for name, listener in listeners:
+        event.listen(async_test_engine.sync_engine, name, listener)
+    yield statements
+    for name, listener in listeners:
+        event.remove(async_test_engine.sync_engine, name, listener)
+
+
 @pytest_asyncio.fixture(scope="function")
 async def create_seller(db_session):
     email = f"test{random.randint(1, 100000)}@example.com" # чтобы не выдавал ошибок с одинаковым имейлом пользователей
@@ -0,0 +1,149 @@
+import pytest
+from fastapi import status
+
+from src.admission import READ, WRITE, AdmissionLimits, MemoryRateLimitStore
+
+
+# Часы, которые двигает сам тест
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+BOOK = {"title": "Clean Architecture", "author": "Robert Martin", "count_pages": 300, "year": 2025}
+
+
+@pytest.mark.asyncio
+async def test_token_bucket(clock):
+    store = MemoryRateLimitStore(clock=clock)
+
+    # полная корзина на 2 токена, затем пополнение по 1 токену за 0.5 с
+    assert await store.take("a", 2, 2) == 0
+    assert await store.take("a", 2, 2) == 0
+    assert await store.take("a", 2, 2) == pytest.approx(0.5)
+    clock.now = 0.25
+    assert await store.take("a", 2, 2) == pytest.approx(0.25)
+    clock.now = 0.5
+    assert await store.take("a", 2, 2) == 0
+
+    # долгий простой не копит токены сверх корзины
+    clock.now = 100
+    assert [await store.take("a", 2, 2) for _ in range(3)] == [0, 0, pytest.approx(0.5)]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_evicts_oldest_clients(clock):
+    store = MemoryRateLimitStore(max_keys=2, clock=clock)
+    for key in ("a", "b", "c"):
+        await store.take(key, 1, 1)
+
+    # "a" вытеснен - у него снова полная корзина, "c" еще ждет пополнения
+    assert await store.take("a", 1, 1) == 0
+    assert await store.take("c", 1, 1) == pytest.approx(1)
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_returns_429(async_client, admission, clock):
+    admission.store = MemoryRateLimitStore(clock=clock)
+    admission.limits[READ] = AdmissionLimits(rate=1, burst=2)
+
+    for _ in range(2):
+        response = await async_client.get("/api/v1/books/")
+        assert response.status_code == status.HTTP_200_OK
+
+    response = await async_client.get("/api/v1/books/")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.headers["retry-after"] == "1"
+
+    # заголовок клиента не настроен - клиент определяется по IP, и свой заголовок лимит не обходит
+    response = await async_client.get("/api/v1/books/", headers={"X-Forwarded-For": "x"})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    clock.now = 1
+    response = await async_client.get("/api/v1/books/")
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_per_client_header(async_client, admission, clock, monkeypatch):
+    from src.configurations.settings import settings
+
+    monkeypatch.setattr(settings, "rate_limit_client_header", "X-Api-Key")
+    admission.store = MemoryRateLimitStore(clock=clock)
+    admission.limits[READ] = AdmissionLimits(rate=0.5, burst=1)
+
+    assert (await async_client.get("/api/v1/books/", headers={"X-Api-Key": "a"})).status_code == 200
+    response = await async_client.get("/api/v1/books/", headers={"X-Api-Key": "a"})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.headers["retry-after"] == "2"
+
+    assert (await async_client.get("/api/v1/books/", headers={"X-Api-Key": "b"})).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_reads_and_writes_have_separate_buckets(async_client, admission, clock, create_seller):
+    admission.store = MemoryRateLimitStore(clock=clock)
+    admission.limits[READ] = AdmissionLimits(rate=1, burst=1)
+    admission.limits[WRITE] = AdmissionLimits(rate=1, burst=1)
+
+    assert (await async_client.get("/api/v1/books/")).status_code == status.HTTP_200_OK
+    assert (await async_client.get("/api/v1/books/")).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    # чтения исчерпали свою корзину, запись проходит
+    response = await async_client.post("/api/v1/books/", json={**BOOK, "seller_id": create_seller.id})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = await async_client.post("/api/v1/books/", json={**BOOK, "seller_id": create_seller.id})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+@pytest.mark.asyncio
+async def test_pool_wait_sheds_reads_first(async_client, admission, create_seller):
+    admission.limits[READ] = AdmissionLimits(max_pool_wait=0.25)
+    admission.limits[WRITE] = AdmissionLimits(max_pool_wait=1.0)
+    admission.pool_wait = lambda kind: 0.5
+
+    response = await async_client.get(f"/api/v1/seller/{create_seller.id}")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == "1"
+
+    response = await async_client.post("/api/v1/books/", json={**BOOK, "seller_id": create_seller.id})
+    assert response.status_code == status.HTTP_201_CREATED
+
+    admission.pool_wait = lambda kind: 2.5
+    response = await async_client.post("/api/v1/books/", json={**BOOK, "seller_id": create_seller.id})
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == "3"
+
+
+@pytest.mark.asyncio
+async def test_in_flight_limit(async_client, admission):
+    admission.limits[READ] = AdmissionLimits(max_in_flight=1)
+
+    # место занято другим запросом
+    await admission.acquire(READ, "other")
+    response = await async_client.get("/api/v1/books/")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == "1"
+
+    admission.release(READ)
+    assert (await async_client.get("/api/v1/books/")).status_code == status.HTTP_200_OK
+    # место освобождается и после ответа
+    assert admission.in_flight == {READ: 0, WRITE: 0}
+
+
+@pytest.mark.asyncio
+async def test_rejected_request_does_not_touch_database(async_client, admission, sql_statements):
+    admission.limits[READ] = AdmissionLimits(max_pool_wait=0.1)
+    admission.pool_wait = lambda kind: 1.0
+
+    response = await async_client.get("/api/v1/books/")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert sql_statements == []
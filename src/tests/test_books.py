@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from sqlalchemy import select
 from src.models.books import Book
@@ -98,10 +100,122 @@ async def test_get_books(db_session, async_client, create_seller):
                 "pages": 104,
                 "seller_id": create_seller.id,
             },
-        ]
+        ],
+        "next_cursor": None,
     }
 
 
+# Тест на постраничную выдачу списка книг
+@pytest.mark.asyncio
+async def test_get_books_paginated(db_session, async_client, create_seller):
+    books = [
+        Book(author="Author", title=f"Book {i}", year=2021, pages=100, seller_id=create_seller.id)
+        for i in range(5)
+    ]
+    db_session.add_all(books)
+    await db_session.flush()
+
+    response = await async_client.get("/api/v1/books/", params={"limit": 2})
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    assert [b["id"] for b in first_page["books"]] == [books[0].id, books[1].id]
+    assert first_page["next_cursor"] is not None
+
+    response = await async_client.get(
+        "/api/v1/books/", params={"limit": 2, "after": first_page["next_cursor"]}
+    )
+    second_page = response.json()
+    assert [b["id"] for b in second_page["books"]] == [books[2].id, books[3].id]
+
+    response = await async_client.get(
+        "/api/v1/books/", params={"limit": 2, "after": second_page["next_cursor"]}
+    )
+    last_page = response.json()
+    assert [b["id"] for b in last_page["books"]] == [books[4].id]
+    assert last_page["next_cursor"] is None
+
+
+# Тест на поиск книг по началу имени автора и названия без учета регистра
+@pytest.mark.asyncio
+async def test_get_books_filtered(db_session, async_client, create_seller):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    book_2 = Book(author="Lermontov", title="Mziri", year=1997, pages=104, seller_id=create_seller.id)
+    book_3 = Book(author="Push_kin", title="100% Poems", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add_all([book, book_2, book_3])
+    await db_session.flush()
+
+    response = await async_client.get("/api/v1/books/", params={"author": "PUSH"})
+    assert [b["id"] for b in response.json()["books"]] == [book.id, book_3.id]
+
+    response = await async_client.get("/api/v1/books/", params={"author": "push_"})
+    assert [b["id"] for b in response.json()["books"]] == [book_3.id]
+
+    response = await async_client.get("/api/v1/books/", params={"title": "100%"})
+    assert [b["id"] for b in response.json()["books"]] == [book_3.id]
+
+    response = await async_client.get("/api/v1/books/", params={"author": "push", "title": "eug"})
+    assert [b["id"] for b in response.json()["books"]] == [book.id]
+
+
+@pytest.mark.asyncio
+async def test_get_books_invalid_cursor(async_client):
+    response = await async_client.get("/api/v1/books/", params={"after": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# Тест на потоковую выдачу книг в формате NDJSON
+@pytest.mark.asyncio
+async def test_get_books_stream(db_session, async_client, create_seller):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    book_2 = Book(author="Lermontov", title="Mziri", year=1997, pages=104, seller_id=create_seller.id)
+
+    db_session.add_all([book, book_2])
+    await db_session.flush()
+
+    response = await async_client.get("/api/v1/books/", params={"stream": True})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [
+        {
+            "title": "Eugeny Onegin",
+            "author": "Pushkin",
+            "year": 2001,
+            "id": book.id,
+            "pages": 104,
+            "seller_id": create_seller.id,
+        },
+        {
+            "title": "Mziri",
+            "author": "Lermontov",
+            "year": 1997,
+            "id": book_2.id,
+            "pages": 104,
+            "seller_id": create_seller.id,
+        },
+    ]
+
+
+# Ручки чтения не должны ходить в таблицу продавцов - в ответе есть только seller_id
+@pytest.mark.asyncio
+async def test_get_books_does_not_load_seller(db_session, async_client, create_seller, sql_statements):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.flush()
+    sql_statements.clear()
+
+    response = await async_client.get("/api/v1/books/")
+    assert response.status_code == status.HTTP_200_OK
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+    assert response.status_code == status.HTTP_200_OK
+
+    selects = [s for s in sql_statements if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 2
+    assert not any("sellers_table" in s for s in selects)
+
+
 # Тест на ручку получения одной книги
 @pytest.mark.asyncio
 async def test_get_single_book(db_session, async_client, create_seller): 
@@ -190,3 +304,199 @@ async def test_delete_book_with_invalid_book_id(db_session, async_client, create
     response = await async_client.delete(f"/api/v1/books/{book.id + 1}")
 
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# Тест на массовую загрузку книг JSON-массивом: плохие строки не мешают остальным
+@pytest.mark.asyncio
+async def test_create_books_bulk(db_session, async_client, create_seller):
+    data = [
+        {"title": "Book 1", "author": "Author", "count_pages": 100, "year": 2021, "seller_id": create_seller.id},
+        {"title": "Book 2", "author": "Author", "count_pages": 200, "year": 1990, "seller_id": create_seller.id},
+        {"title": "Book 3", "author": "Author", "count_pages": 300, "year": 2022, "seller_id": 999},
+        {"title": "Book 4", "author": "Author", "count_pages": 400, "year": 2023, "seller_id": create_seller.id},
+    ]
+    response = await async_client.post("/api/v1/books/bulk", json=data)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    result_data = response.json()
+    assert result_data["created"] == 2
+    assert [error["index"] for error in result_data["errors"]] == [1, 2]
+    assert result_data["errors"][1]["detail"] == "Seller with id 999 not found"
+
+    result = await db_session.execute(select(Book).order_by(Book.id))
+    books = result.scalars().all()
+    assert [book.id for book in books] == result_data["ids"]
+    assert [(book.title, book.pages) for book in books] == [("Book 1", 100), ("Book 4", 400)]
+
+
+# Строки, которые отвергла БД, попадают в errors, а остальные строки пачки вставляются
+@pytest.mark.asyncio
+async def test_create_books_bulk_database_errors(db_session, async_client, create_seller):
+    data = [
+        {"title": "Book 1", "author": "Author", "count_pages": 100, "year": 2021, "seller_id": create_seller.id},
+        # pages не влезает в integer колонки - это видит только БД
+        {"title": "Book 2", "author": "Author", "count_pages": 2**31, "year": 2022, "seller_id": create_seller.id},
+        {"title": "x" * 51, "author": "Author", "count_pages": 100, "year": 2022, "seller_id": create_seller.id},
+        {"title": "Book 4", "author": "Author", "count_pages": 400, "year": 2023, "seller_id": create_seller.id},
+    ]
+    response = await async_client.post("/api/v1/books/bulk", json=data)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    result_data = response.json()
+    assert result_data["created"] == 2
+    assert [error["index"] for error in result_data["errors"]] == [1, 2]
+    assert "int32" in result_data["errors"][0]["detail"]
+    assert result_data["errors"][1]["detail"].startswith("title: String should have at most 50 characters")
+
+    result = await db_session.execute(select(Book.id, Book.title).order_by(Book.id))
+    books = result.all()
+    assert [book.id for book in books] == result_data["ids"]
+    assert [book.title for book in books] == ["Book 1", "Book 4"]
+
+
+# Тест на массовую загрузку книг потоком NDJSON
+@pytest.mark.asyncio
+async def test_create_books_bulk_ndjson(db_session, async_client, create_seller):
+    lines = [
+        json.dumps({"title": "Book 1", "author": "Author", "year": 2021, "seller_id": create_seller.id}),
+        "{not json",
+        json.dumps({"title": "Book 2", "author": "Author", "year": 2022, "seller_id": create_seller.id}),
+    ]
+    response = await async_client.post(
+        "/api/v1/books/bulk",
+        content="\n".join(lines),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    result_data = response.json()
+    assert result_data["created"] == 2
+    assert [error["index"] for error in result_data["errors"]] == [1]
+
+
+# Поиск по словам названия и автора с фильтрами и фасетами
+@pytest.mark.asyncio
+async def test_search_books(db_session, async_client, create_seller):
+    other_seller = Seller(first_name="Other", last_name="Seller", email="other_search@example.com")
+    db_session.add(other_seller)
+    await db_session.flush()
+    books = [
+        Book(author="Leo Tolstoy", title="War and Peace", year=2021, pages=1200, seller_id=create_seller.id),
+        Book(author="Leo Tolstoy", title="Anna Karenina", year=2022, pages=860, seller_id=other_seller.id),
+        Book(author="Fyodor Dostoevsky", title="The Idiot", year=2022, pages=650, seller_id=create_seller.id),
+        Book(author="Anton Chekhov", title="Peace of Mind", year=2023, pages=120, seller_id=create_seller.id),
+    ]
+    db_session.add_all(books)
+    await db_session.flush()
+
+    response = await async_client.get("/api/v1/books/search", params={"q": "tolstoy"})
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert [book["id"] for book in result["books"]] == [books[0].id, books[1].id]
+    assert result["books"][0] == {
+        "id": books[0].id,
+        "title": "War and Peace",
+        "author": "Leo Tolstoy",
+        "year": 2021,
+        "pages": 1200,
+        "seller_id": create_seller.id,
+    }
+    assert result["next_cursor"] is None
+    assert result["facets"] == {
+        "years": [{"value": 2021, "count": 1}, {"value": 2022, "count": 1}],
+        "sellers": [{"value": create_seller.id, "count": 1}, {"value": other_seller.id, "count": 1}],
+    }
+
+    # слово из названия, фильтр по числу страниц и продавцу
+    response = await async_client.get(
+        "/api/v1/books/search", params={"q": "peace", "max_pages": 500, "seller_id": create_seller.id}
+    )
+    assert [book["id"] for book in response.json()["books"]] == [books[3].id]
+
+    # без q работают только фильтры
+    response = await async_client.get("/api/v1/books/search", params={"min_year": 2022, "max_year": 2022})
+    result = response.json()
+    assert [book["id"] for book in result["books"]] == [books[1].id, books[2].id]
+    assert result["facets"]["years"] == [{"value": 2022, "count": 2}]
+
+
+# Постраничный поиск: фасеты только на первой странице
+@pytest.mark.asyncio
+async def test_search_books_pagination(db_session, async_client, create_seller):
+    books = [
+        Book(author="Pushkin", title=f"Poems {i}", year=2020 + i % 2, pages=100, seller_id=create_seller.id)
+        for i in range(5)
+    ]
+    db_session.add_all(books)
+    await db_session.flush()
+
+    response = await async_client.get("/api/v1/books/search", params={"q": "pushkin", "limit": 3})
+    first_page = response.json()
+    assert [book["id"] for book in first_page["books"]] == [book.id for book in books[:3]]
+    assert first_page["facets"]["years"] == [{"value": 2020, "count": 3}, {"value": 2021, "count": 2}]
+
+    response = await async_client.get(
+        "/api/v1/books/search", params={"q": "pushkin", "limit": 3, "after": first_page["next_cursor"]}
+    )
+    second_page = response.json()
+    assert [book["id"] for book in second_page["books"]] == [book.id for book in books[3:]]
+    assert second_page["next_cursor"] is None
+    assert second_page["facets"] is None
+
+    response = await async_client.get("/api/v1/books/search", params={"q": "nothing here"})
+    assert response.json() == {"books": [], "next_cursor": None, "facets": {"years": [], "sellers": []}}
+
+
+# Пакетное чтение: порядок запроса, повторы и ненайденные id, один SELECT на все книги
+@pytest.mark.asyncio
+async def test_get_books_batch(db_session, async_client, create_seller, sql_statements):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    book_2 = Book(author="Lermontov", title="Mziri", year=1997, pages=104, seller_id=create_seller.id)
+    db_session.add_all([book, book_2])
+    await db_session.flush()
+    sql_statements.clear()
+
+    missing_id = book_2.id + 100
+    response = await async_client.get(f"/api/v1/books/batch?ids={book_2.id},{missing_id},{book.id},{book_2.id}")
+    assert response.status_code == status.HTTP_200_OK
+
+    expected_book_2 = {
+        "id": book_2.id, "title": "Mziri", "author": "Lermontov", "year": 1997, "pages": 104, "seller_id": create_seller.id
+    }
+    assert response.json() == {
+        "results": [
+            {"id": book_2.id, "found": True, "book": expected_book_2},
+            {"id": missing_id, "found": False, "book": None},
+            {
+                "id": book.id,
+                "found": True,
+                "book": {
+                    "id": book.id, "title": "Eugeny Onegin", "author": "Pushkin", "year": 2001, "pages": 104,
+                    "seller_id": create_seller.id,
+                },
+            },
+            {"id": book_2.id, "found": True, "book": expected_book_2},
+        ]
+    }
+    assert len(sql_statements) == 1
+
+    # Книги попали в кэш: второй запрос (теперь POST-формой) в БД ходит только за ненайденной
+    sql_statements.clear()
+    response = await async_client.post("/api/v1/books/batch", json={"ids": [book.id, missing_id]})
+    assert response.status_code == status.HTTP_200_OK
+    assert [(r["id"], r["found"]) for r in response.json()["results"]] == [(book.id, True), (missing_id, False)]
+    assert len(sql_statements) == 1
+
+    # Одиночная ручка берет тело из того же кэша
+    response = await async_client.get(f"/api/v1/books/{book_2.id}")
+    assert response.json() == expected_book_2
+    assert len(sql_statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_books_batch_invalid_ids(async_client):
+    response = await async_client.get("/api/v1/books/batch?ids=1,abc")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = await async_client.post("/api/v1/books/batch", json={"ids": list(range(1, 1002))})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
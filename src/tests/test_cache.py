@@ -0,0 +1,284 @@
+import asyncio
+
+import pytest
+from fastapi import status
+
+from src.cache import MemoryCache, RedisCache, SingleFlight
+from src.models.books import Book
+
+
+# Заменитель клиента Redis: хранит значения в словаре, TTL не соблюдает
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, px=None):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def set(self, key, value, px=None):
+        self.commands.append((key, value))
+
+    async def execute(self):
+        for key, value in self.commands:
+            await self.client.set(key, value)
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_size=2, ttl=60)
+    await cache.set("a", b"1")
+    await cache.set("b", b"2")
+    await cache.get("a")
+    await cache.set("c", b"3")
+
+    assert await cache.get("a") == b"1"
+    assert await cache.get("b") is None
+    assert await cache.get("c") == b"3"
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_expires_entries():
+    cache = MemoryCache(ttl=0.05)
+    await cache.set("a", b"1")
+    assert await cache.get("a") == b"1"
+
+    await asyncio.sleep(0.1)
+    assert await cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_with_fake_client():
+    client = FakeRedis()
+    cache = RedisCache(client, prefix="test:")
+    await cache.set("book:1", b"{}")
+
+    assert client.data == {"test:book:1": b"{}"}
+    assert await cache.get("book:1") == b"{}"
+
+    await cache.delete("book:1", "seller:1")
+    assert await cache.get("book:1") is None
+
+    await cache.set_many({"book:1": b"1", "book:2": b"2"})
+    assert await cache.get_many("book:2", "book:3", "book:1") == [b"2", None, b"1"]
+
+
+# Повторное чтение книги не ходит в БД, а обновление сбрасывает кэш
+@pytest.mark.asyncio
+async def test_get_book_is_cached_until_update(db_session, async_client, create_seller, sql_statements):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.flush()
+    sql_statements.clear()
+
+    first = await async_client.get(f"/api/v1/books/{book.id}")
+    second = await async_client.get(f"/api/v1/books/{book.id}")
+    assert first.json() == second.json()
+    assert len(sql_statements) == 1
+
+    response = await async_client.put(
+        f"/api/v1/books/{book.id}",
+        json={"title": "Mziri", "author": "Lermontov", "pages": 100, "year": 2007, "id": book.id},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+    assert response.json()["title"] == "Mziri"
+
+
+# Закэшированный продавец сбрасывается, когда меняются его книги
+@pytest.mark.asyncio
+async def test_seller_cache_invalidated_by_book_writes(db_session, async_client, create_seller):
+    seller_id = create_seller.id
+    response = await async_client.get(f"/api/v1/seller/{seller_id}")
+    assert response.json()["books"] == []
+
+    data = {"title": "Clean Architecture", "author": "Robert Martin", "count_pages": 300, "year": 2025, "seller_id": seller_id}
+    response = await async_client.post("/api/v1/books/", json=data)
+    book_id = response.json()["id"]
+    # В тестах все запросы идут через одну сессию: сбрасываем ее identity map, как будто это новый запрос
+    db_session.expire_all()
+
+    response = await async_client.get(f"/api/v1/seller/{seller_id}")
+    assert [(b["id"], b["count_pages"]) for b in response.json()["books"]] == [(book_id, 300)]
+
+    response = await async_client.delete(f"/api/v1/books/{book_id}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    db_session.expire_all()
+
+    response = await async_client.get(f"/api/v1/seller/{seller_id}")
+    assert response.json()["books"] == []
+
+
+# Одновременные загрузки одного ключа выполняются один раз, разных ключей и источников - отдельно
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_load():
+    flights = SingleFlight()
+    gate = asyncio.Event()
+    calls = []
+
+    async def loader(value):
+        calls.append(value)
+        await gate.wait()
+        return value
+
+    tasks = [asyncio.create_task(flights.do("book:1", lambda: loader(b"1"))) for _ in range(10)]
+    tasks.append(asyncio.create_task(flights.do("book:2", lambda: loader(b"2"))))
+    tasks.append(asyncio.create_task(flights.do("book:1", lambda: loader(b"replica"), source="replica")))
+    await asyncio.sleep(0)
+    assert flights.in_flight() == 3
+
+    gate.set()
+    results = await asyncio.gather(*tasks)
+    assert results == [b"1"] * 10 + [b"2", b"replica"]
+    assert sorted(calls) == [b"1", b"2", b"replica"]
+    assert flights.in_flight() == 0
+
+
+# Отмена первого вызова не отменяет ожидающих: один из них загружает сам
+@pytest.mark.asyncio
+async def test_single_flight_survives_leader_cancel():
+    flights = SingleFlight()
+    gate = asyncio.Event()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await gate.wait()
+        return b"1"
+
+    leader = asyncio.create_task(flights.do("book:1", loader))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(flights.do("book:1", loader)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    await asyncio.sleep(0.01)
+    assert flights.in_flight() == 1
+    gate.set()
+    assert await asyncio.gather(*followers) == [b"1"] * 3
+    assert len(calls) == 2
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+# Загрузка, начатая до сброса ключа, не кладет прочитанное в кэш
+@pytest.mark.asyncio
+@pytest.mark.parametrize("make_cache", [MemoryCache, lambda: RedisCache(FakeRedis())])
+async def test_load_started_before_delete_does_not_refill(make_cache):
+    cache = make_cache()
+    gate = asyncio.Event()
+
+    async def slow_loader():
+        await gate.wait()
+        return b"old"
+
+    async def slow_many_loader(keys):
+        await gate.wait()
+        return {key: b"old" for key in keys}
+
+    load = asyncio.create_task(cache.load("book:1", slow_loader))
+    load_many = asyncio.create_task(cache.load_many(["book:2", "book:3"], slow_many_loader))
+    await asyncio.sleep(0)
+    await cache.delete("book:1", "book:2")
+    gate.set()
+
+    # сами загрузки возвращают прочитанное, но в кэш попадает только несброшенный ключ
+    assert await load == b"old"
+    assert await load_many == [b"old", b"old"]
+    assert await cache.get_many("book:1", "book:2", "book:3") == [None, None, b"old"]
+    assert cache._generations == {} and cache._loading == {}
+
+    # следующая загрузка кэширует как обычно
+    assert await cache.load("book:1", lambda: asyncio.sleep(0, b"new")) == b"new"
+    assert await cache.get("book:1") == b"new"
+
+
+# Чтение, начатое до обновления книги, не оставляет в кэше старое тело: следующее чтение видит новое
+@pytest.mark.asyncio
+async def test_slow_read_before_update_does_not_cache_old_body(db_session, async_client, create_seller, monkeypatch):
+    from src.routers.v1 import books as books_module
+
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.flush()
+
+    load_book = books_module._load_book
+    loaded, gate = asyncio.Event(), asyncio.Event()
+
+    # первое чтение прочитало книгу из БД и зависло до отдачи результата
+    async def slow_load_book(session, book_id):
+        body = await load_book(session, book_id)
+        if not loaded.is_set():
+            loaded.set()
+            await gate.wait()
+        return body
+
+    monkeypatch.setattr(books_module, "_load_book", slow_load_book)
+    slow_read = asyncio.create_task(async_client.get(f"/api/v1/books/{book.id}"))
+    await loaded.wait()
+
+    response = await async_client.put(
+        f"/api/v1/books/{book.id}",
+        json={"title": "Mziri", "author": "Lermontov", "pages": 100, "year": 2007, "id": book.id},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+    assert response.json()["title"] == "Mziri"
+
+    gate.set()
+    assert (await slow_read).json()["title"] == "Eugeny Onegin"
+
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+    assert response.json()["title"] == "Mziri"
+
+
+# Толпа одновременных запросов одной книги и одного продавца мимо кэша - по одному запросу к БД
+@pytest.mark.asyncio
+async def test_concurrent_reads_share_one_query(db_session, async_client, create_seller, sql_statements):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.flush()
+    sql_statements.clear()
+
+    responses = await asyncio.gather(*(async_client.get(f"/api/v1/books/{book.id}") for _ in range(20)))
+    assert {response.status_code for response in responses} == {status.HTTP_200_OK}
+    assert len({response.content for response in responses}) == 1
+    assert len(sql_statements) == 1
+
+    sql_statements.clear()
+    responses = await asyncio.gather(*(async_client.get(f"/api/v1/seller/{create_seller.id}") for _ in range(20)))
+    assert {response.status_code for response in responses} == {status.HTTP_200_OK}
+    assert len({response.content for response in responses}) == 1
+    # продавец и его книги (selectinload) - два запроса на всю толпу
+    assert len(sql_statements) == 2
+
+    # Ненайденная книга не кэшируется, но толпа все равно делит один запрос
+    sql_statements.clear()
+    responses = await asyncio.gather(*(async_client.get("/api/v1/books/999999") for _ in range(20)))
+    assert {response.status_code for response in responses} == {status.HTTP_404_NOT_FOUND}
+    assert len(sql_statements) == 1
@@ -0,0 +1,374 @@
+import asyncio
+from datetime import timedelta
+from typing import List, Optional
+
+import orjson
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, text
+
+from src.changes import ChangeFeed, PositionExpired, SubscriptionEnded, decode_position, encode_position
+from src.configurations import get_change_feed
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.queries import START, fetch_changes
+
+from .conftest import async_test_engine
+
+TIMEOUT = 5.0
+
+
+@pytest_asyncio.fixture(scope="function")
+async def change_feed():
+    feed = ChangeFeed(async_test_engine, poll_interval=0.5)
+    await feed.start()
+    yield feed
+    await feed.stop()
+
+
+@pytest.fixture(scope="function")
+def feed_app(test_app, change_feed):
+    test_app.dependency_overrides[get_change_feed] = lambda: change_feed
+    yield test_app
+    del test_app.dependency_overrides[get_change_feed]
+
+
+async def _add_seller(db_session, books: int = 0) -> Seller:
+    seller = Seller(first_name="Ivan", last_name="Petrov", email="ivan@example.com")
+    db_session.add(seller)
+    await db_session.flush()
+    for i in range(books):
+        db_session.add(Book(title=f"Book {i}", author="Pushkin", year=2001, pages=100, seller_id=seller.id))
+    await db_session.commit()
+    return seller
+
+
+async def _events(subscription, count: int) -> List[tuple]:
+    events = []
+    for _ in range(count):
+        change = await subscription.next(timeout=TIMEOUT)
+        assert change is not None, f"got only {events}"
+        events.append((change["entity"], change["entity_id"], change["op"]))
+    return events
+
+
+# Ответ-поток SSE: httpx.ASGITransport ждет конца ответа, поэтому приложение вызывается по ASGI напрямую
+class SSEStream:
+    def __init__(self, app, query: str = "", headers: Optional[dict] = None):
+        self.app = app
+        self.scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/api/v1/changes",
+            "raw_path": b"/api/v1/changes",
+            "root_path": "",
+            "query_string": query.encode(),
+            "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+            "server": ("127.0.0.1", 8000),
+            "client": ("127.0.0.1", 50000),
+        }
+        self.sent: "asyncio.Queue[dict]" = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        self.buffer = b""
+        self.requested = False
+
+    async def _receive(self) -> dict:
+        if not self.requested:
+            self.requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def __aenter__(self):
+        self.task = asyncio.create_task(self.app(self.scope, self._receive, self.sent.put))
+        start = await asyncio.wait_for(self.sent.get(), TIMEOUT)
+        self.status = start["status"]
+        self.headers = {k.decode(): v.decode() for k, v in start["headers"]}
+        return self
+
+    async def __aexit__(self, *exc):
+        self.disconnected.set()
+        await asyncio.wait_for(self.task, TIMEOUT)
+
+    async def body(self) -> bytes:
+        while True:
+            message = await asyncio.wait_for(self.sent.get(), TIMEOUT)
+            self.buffer += message.get("body", b"")
+            if not message.get("more_body"):
+                return self.buffer
+
+    # Следующее событие (без комментариев keepalive): словарь полей id, event, data
+    async def event(self) -> dict:
+        while b"\n\n" not in self.buffer:
+            message = await asyncio.wait_for(self.sent.get(), TIMEOUT)
+            self.buffer += message.get("body", b"")
+        raw, self.buffer = self.buffer.split(b"\n\n", 1)
+        if raw.startswith(b":"):
+            return await self.event()
+        fields = dict(line.split(": ", 1) for line in raw.decode().split("\n"))
+        fields["data"] = orjson.loads(fields["data"])
+        return fields
+
+
+class WebSocketSession:
+    def __init__(self, app, query: str = ""):
+        self.app = app
+        self.scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "scheme": "ws",
+            "path": "/api/v1/changes/ws",
+            "raw_path": b"/api/v1/changes/ws",
+            "root_path": "",
+            "query_string": query.encode(),
+            "headers": [],
+            "server": ("127.0.0.1", 8000),
+            "client": ("127.0.0.1", 50000),
+            "subprotocols": [],
+        }
+        self.inbound: "asyncio.Queue[dict]" = asyncio.Queue()
+        self.sent: "asyncio.Queue[dict]" = asyncio.Queue()
+
+    async def __aenter__(self):
+        await self.inbound.put({"type": "websocket.connect"})
+        self.task = asyncio.create_task(self.app(self.scope, self.inbound.get, self.sent.put))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.inbound.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(self.task, TIMEOUT)
+
+    async def receive(self) -> dict:
+        return await asyncio.wait_for(self.sent.get(), TIMEOUT)
+
+    async def message(self) -> dict:
+        message = await self.receive()
+        assert message["type"] == "websocket.send", message
+        return orjson.loads(message["text"])
+
+
+# Триггеры пишут событие на каждую строку любой записи - и в порядке (txid, id), как их отдает лента
+@pytest.mark.asyncio
+async def test_triggers_record_changes(db_session):
+    seller = await _add_seller(db_session, books=2)
+    await db_session.execute(text("UPDATE books_table SET pages = pages + 1"))
+    await db_session.execute(text("DELETE FROM sellers_table"))
+    await db_session.commit()
+
+    async with async_test_engine.connect() as conn:
+        changes = await fetch_changes(conn, START, 100)
+
+    book_ids = sorted(c["entity_id"] for c in changes if c["entity"] == "book" and c["op"] == "insert")
+    assert [(c["entity"], c["op"]) for c in changes] == [
+        ("seller", "insert"),
+        ("book", "insert"),
+        ("book", "insert"),
+        ("book", "update"),
+        ("book", "update"),
+        # книги удаляет каскад внешнего ключа в той же транзакции, уже после триггера на удаление продавца
+        ("seller", "delete"),
+        ("book", "delete"),
+        ("book", "delete"),
+    ]
+    assert changes[0]["entity_id"] == seller.id
+    assert len(book_ids) == 2
+    assert [(c["txid"], c["id"]) for c in changes] == sorted((c["txid"], c["id"]) for c in changes)
+
+
+# Событие незакоммиченной транзакции задерживает и события транзакций, закоммиченных после нее:
+# иначе читатель, уже ушедший дальше по id, пропустил бы его
+@pytest.mark.asyncio
+async def test_changes_wait_for_older_transactions(db_session):
+    seller = await _add_seller(db_session)
+    async with async_test_engine.connect() as conn:
+        head = (await fetch_changes(conn, START, 100))[-1]
+    head = (head["txid"], head["id"])
+
+    async with async_test_engine.connect() as slow, async_test_engine.connect() as reader:
+        await slow.execute(text("UPDATE sellers_table SET first_name = 'Slow' WHERE id = :id"), {"id": seller.id})
+        db_session.add(Seller(first_name="Petr", last_name="Ivanov", email="petr@example.com"))
+        await db_session.commit()
+
+        assert await fetch_changes(reader, head, 100) == []
+        await reader.commit()
+
+        await slow.commit()
+        changes = await fetch_changes(reader, head, 100)
+
+    assert [(c["entity_id"], c["op"]) for c in changes] == [(seller.id, "update"), (seller.id + 1, "insert")]
+    assert (changes[0]["txid"], changes[0]["id"]) < (changes[1]["txid"], changes[1]["id"])
+
+
+@pytest.mark.asyncio
+async def test_feed_fans_out_to_subscribers(db_session, change_feed):
+    first = await change_feed.subscribe()
+    second = await change_feed.subscribe()
+    assert change_feed.subscribers() == 2
+
+    seller = await _add_seller(db_session, books=1)
+    book_id = (await db_session.execute(select(Book.id).where(Book.seller_id == seller.id))).scalar_one()
+    expected = [("seller", seller.id, "insert"), ("book", book_id, "insert")]
+    assert await _events(first, 2) == expected
+    assert await _events(second, 2) == expected
+    assert first.position == second.position == change_feed.position
+
+    first.close()
+    assert change_feed.subscribers() == 1
+
+
+# С позиции подписка дочитывает пропущенное из таблицы, а потом переходит на рассылку
+@pytest.mark.asyncio
+async def test_subscription_resumes_from_position(db_session, change_feed):
+    first = await _add_seller(db_session)
+    subscription = await change_feed.subscribe()
+    await _events(subscription, 1)
+    position = subscription.position
+    subscription.close()
+
+    db_session.add(Book(title="Missed", author="Pushkin", year=2001, pages=100, seller_id=first.id))
+    await db_session.commit()
+
+    resumed = await change_feed.subscribe(position)
+    assert (await _events(resumed, 1))[0][::2] == ("book", "insert")
+
+    await db_session.execute(text("DELETE FROM books_table"))
+    await db_session.commit()
+    assert (await _events(resumed, 1))[0][::2] == ("book", "delete")
+
+
+@pytest.mark.asyncio
+async def test_expired_position(db_session, change_feed):
+    await _add_seller(db_session)
+    subscription = await change_feed.subscribe(START)
+    await _events(subscription, 1)
+
+    await db_session.execute(text("DELETE FROM change_events"))
+    await db_session.commit()
+    with pytest.raises(PositionExpired):
+        await change_feed.subscribe(subscription.position)
+
+
+# Медленный подписчик отключается от рассылки: дочитывает свою очередь, и подписка кончается
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_dropped(db_session):
+    feed = ChangeFeed(async_test_engine, queue_size=1, poll_interval=0.5)
+    await feed.start()
+    try:
+        slow = await feed.subscribe()
+        await _add_seller(db_session, books=2)
+        for _ in range(50):
+            if feed.subscribers() == 0:
+                break
+            await asyncio.sleep(0.05)
+        assert feed.subscribers() == 0
+
+        await _events(slow, 1)
+        with pytest.raises(SubscriptionEnded):
+            await slow.next(timeout=TIMEOUT)
+    finally:
+        await feed.stop()
+
+
+@pytest.mark.asyncio
+async def test_prune_keeps_fresh_changes(db_session):
+    await _add_seller(db_session)
+    feed = ChangeFeed(async_test_engine, retention=timedelta(hours=1))
+    await feed.start()
+    await feed.stop()
+
+    async with async_test_engine.connect() as conn:
+        assert len(await fetch_changes(conn, START, 100)) == 1
+
+
+@pytest.mark.asyncio
+async def test_sse_stream(db_session, feed_app):
+    async with SSEStream(feed_app) as stream:
+        assert stream.status == 200
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        ready = await stream.event()
+        assert ready["event"] == "ready"
+        assert ready["id"] == ready["data"]["position"]
+
+        seller = await _add_seller(db_session)
+        event = await stream.event()
+        assert event["event"] == "change"
+        assert event["data"]["entity"] == "seller"
+        assert event["data"]["id"] == seller.id
+        assert event["data"]["op"] == "insert"
+        assert event["id"] == event["data"]["position"]
+        position = event["id"]
+
+    await db_session.execute(text("UPDATE sellers_table SET first_name = 'Petr'"))
+    await db_session.commit()
+
+    # EventSource переподключается с Last-Event-ID и получает пропущенное
+    async with SSEStream(feed_app, headers={"Last-Event-ID": position}) as stream:
+        assert (await stream.event())["id"] == position
+        event = await stream.event()
+        assert (event["data"]["id"], event["data"]["op"]) == (seller.id, "update")
+        assert decode_position(event["id"]) > decode_position(position)
+
+
+@pytest.mark.asyncio
+async def test_sse_rejects_bad_positions(db_session, feed_app):
+    async with SSEStream(feed_app, query="after=bad") as stream:
+        assert stream.status == 400
+        await stream.body()
+
+    async with SSEStream(feed_app, query=f"after={encode_position((1, 10**9))}") as stream:
+        assert stream.status == 410
+        await stream.body()
+
+
+@pytest.mark.asyncio
+async def test_write_handlers_publish_changes(db_session, async_client, feed_app, change_feed):
+    subscription = await change_feed.subscribe()
+
+    response = await async_client.post(
+        "/api/v1/seller/", json={"first_name": "Ivan", "last_name": "Petrov", "email": "ivan@example.com"}
+    )
+    seller_id = response.json()["id"]
+    response = await async_client.post(
+        "/api/v1/books/", json={"title": "Wrong Code", "author": "Robert Martin", "count_pages": 104, "year": 2021,
+                                "seller_id": seller_id}
+    )
+    book_id = response.json()["id"]
+    await async_client.delete(f"/api/v1/books/{book_id}")
+    await db_session.commit()
+
+    assert await _events(subscription, 3) == [
+        ("seller", seller_id, "insert"),
+        ("book", book_id, "insert"),
+        ("book", book_id, "delete"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_websocket_stream(db_session, feed_app):
+    async with WebSocketSession(feed_app) as ws:
+        assert (await ws.receive())["type"] == "websocket.accept"
+        ready = await ws.message()
+        assert ready["type"] == "ready"
+
+        seller = await _add_seller(db_session)
+        message = await ws.message()
+        assert (message["type"], message["entity"], message["id"], message["op"]) == (
+            "change", "seller", seller.id, "insert"
+        )
+
+    async with WebSocketSession(feed_app, query=f"after={ready['position']}") as ws:
+        assert (await ws.receive())["type"] == "websocket.accept"
+        assert (await ws.message())["position"] == ready["position"]
+        assert (await ws.message())["position"] == message["position"]
+
+
+@pytest.mark.asyncio
+async def test_websocket_rejects_bad_position(feed_app):
+    async with WebSocketSession(feed_app, query="after=bad") as ws:
+        closed = await ws.receive()
+        assert closed["type"] == "websocket.close"
+        assert closed["code"] == 1008
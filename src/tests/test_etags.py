@@ -0,0 +1,83 @@
+import pytest
+from fastapi import status
+
+from src.models.books import Book
+from src.utils import etag_matches
+
+
+def test_etag_matches():
+    assert etag_matches('"1.2"', '"1.2"')
+    assert etag_matches('"0.1", W/"1.2"', '"1.2"')
+    assert etag_matches("*", '"1.2"')
+    assert not etag_matches('"1.1"', '"1.2"')
+    assert not etag_matches(None, '"1.2"')
+
+
+# Повторный запрос с If-None-Match получает 304 без тела, после изменения книги - снова 200
+@pytest.mark.asyncio
+async def test_get_book_not_modified(db_session, async_client, create_seller):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.flush()
+
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+    etag = response.headers["ETag"]
+
+    response = await async_client.get(f"/api/v1/books/{book.id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+    response = await async_client.put(
+        f"/api/v1/books/{book.id}",
+        json={"title": "Mziri", "author": "Lermontov", "pages": 100, "year": 2007, "id": book.id},
+    )
+    assert response.headers["ETag"] != etag
+
+    response = await async_client.get(f"/api/v1/books/{book.id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["title"] == "Mziri"
+
+
+@pytest.mark.asyncio
+async def test_list_endpoints_not_modified(db_session, async_client, create_seller):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.flush()
+
+    for url in ("/api/v1/books/", "/api/v1/seller/"):
+        response = await async_client.get(url)
+        response = await async_client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+# Обновление по устаревшему ETag отклоняется с 412
+@pytest.mark.asyncio
+async def test_update_book_if_match(db_session, async_client, create_seller):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.flush()
+
+    etag = (await async_client.get(f"/api/v1/books/{book.id}")).headers["ETag"]
+    data = {"title": "Mziri", "author": "Lermontov", "pages": 100, "year": 2007, "id": book.id}
+
+    response = await async_client.put(f"/api/v1/books/{book.id}", json=data, headers={"If-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await async_client.put(f"/api/v1/books/{book.id}", json=data, headers={"If-Match": etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+
+@pytest.mark.asyncio
+async def test_update_seller_if_match(async_client, create_seller):
+    etag = (await async_client.get(f"/api/v1/seller/{create_seller.id}")).headers["ETag"]
+
+    response = await async_client.put(
+        f"/api/v1/seller/{create_seller.id}", json={"first_name": "New"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+    response = await async_client.put(
+        f"/api/v1/seller/{create_seller.id}", json={"first_name": "Newer"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
@@ -0,0 +1,118 @@
+import csv
+import gzip
+import io
+
+import orjson
+import pytest
+from fastapi import status
+
+from src.models.books import Book
+from src.models.sellers import Seller
+
+
+@pytest.fixture
+def export_rows(db_session):
+    async def _export_rows():
+        first = Seller(first_name="Ivan", last_name="Petrov", email="ivan@example.com")
+        second = Seller(first_name="Petr", last_name="Ivanov", email="petr@example.com")
+        db_session.add_all([first, second])
+        await db_session.flush()
+        books = [
+            # кавычки, обратный слэш, запятая и перевод строки не должны ломать ни csv, ни JSON
+            Book(title='Say "hi", \\ bye\nnow', author="Pushkin", year=2020, pages=100, seller_id=first.id),
+            Book(title="Ruslan", author="Pushkin", year=2022, pages=200, seller_id=first.id),
+            Book(title="Dead Souls", author="Gogol", year=2024, pages=300, seller_id=second.id),
+        ]
+        db_session.add_all(books)
+        await db_session.flush()
+        return first, second, books
+
+    return _export_rows
+
+
+@pytest.mark.asyncio
+async def test_export_csv(async_client, export_rows):
+    first, second, books = await export_rows()
+
+    response = await async_client.get("/api/v1/export/books")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="books.csv"'
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["id"] for row in rows] == [str(book.id) for book in books]
+    assert rows[0] == {
+        "id": str(books[0].id),
+        "title": 'Say "hi", \\ bye\nnow',
+        "author": "Pushkin",
+        "year": "2020",
+        "pages": "100",
+        "seller_id": str(first.id),
+        "seller_first_name": "Ivan",
+        "seller_last_name": "Petrov",
+        "seller_email": "ivan@example.com",
+    }
+    assert rows[2]["seller_email"] == second.email
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson(async_client, export_rows):
+    first, _, books = await export_rows()
+
+    response = await async_client.get("/api/v1/export/books", params={"format": "ndjson"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    rows = [orjson.loads(line) for line in response.content.splitlines()]
+    assert [row["id"] for row in rows] == [book.id for book in books]
+    assert rows[0] == {
+        "id": books[0].id,
+        "title": 'Say "hi", \\ bye\nnow',
+        "author": "Pushkin",
+        "year": 2020,
+        "pages": 100,
+        "seller_id": first.id,
+        "seller_first_name": "Ivan",
+        "seller_last_name": "Petrov",
+        "seller_email": "ivan@example.com",
+    }
+
+
+@pytest.mark.asyncio
+async def test_export_filters(async_client, export_rows):
+    first, _, books = await export_rows()
+
+    response = await async_client.get(
+        "/api/v1/export/books", params={"format": "ndjson", "seller_id": first.id, "min_year": 2021}
+    )
+    assert [orjson.loads(line)["id"] for line in response.content.splitlines()] == [books[1].id]
+
+    response = await async_client.get("/api/v1/export/books", params={"format": "ndjson", "max_year": 2022})
+    assert [orjson.loads(line)["id"] for line in response.content.splitlines()] == [books[0].id, books[1].id]
+
+    # пустая выгрузка csv - только заголовок
+    response = await async_client.get("/api/v1/export/books", params={"min_year": 2030})
+    assert response.text.splitlines() == [
+        "id,title,author,year,pages,seller_id,seller_first_name,seller_last_name,seller_email"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_gzip(async_client, export_rows):
+    await export_rows()
+    plain = await async_client.get("/api/v1/export/books", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    # httpx сам распаковывает gzip - сырые байты читаем из потока
+    async with async_client.stream(
+        "GET", "/api/v1/export/books", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        compressed = b"".join([chunk async for chunk in response.aiter_raw()])
+    assert gzip.decompress(compressed) == plain.content
+
+
+@pytest.mark.asyncio
+async def test_export_rejects_unknown_format(async_client):
+    response = await async_client.get("/api/v1/export/books", params={"format": "xml"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,26 @@
+import logging
+from logging.handlers import QueueHandler
+
+from icecream import ic
+from icecream.icecream import DEFAULT_OUTPUT_FUNCTION
+
+from src.configurations.log_config import setup_logging
+from src.configurations.settings import settings
+
+
+# В prod логи идут через очередь, а icecream выключен
+def test_setup_logging_prod(monkeypatch):
+    monkeypatch.setattr(settings, "app_env", "prod")
+    root = logging.getLogger()
+    old_handlers, old_level = root.handlers[:], root.level
+
+    listener = setup_logging()
+    try:
+        assert listener is not None
+        assert [type(handler) for handler in root.handlers] == [QueueHandler]
+        assert not ic.enabled
+    finally:
+        listener.stop()
+        root.handlers, root.level = old_handlers, old_level
+        ic.configureOutput(outputFunction=DEFAULT_OUTPUT_FUNCTION)
+        ic.enable()
@@ -0,0 +1,116 @@
+import logging
+import re
+
+import pytest
+from fastapi import status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.configurations.settings import settings
+from src.metrics import Counter, Histogram, MetricsRegistry, instrument_engine
+from src.metrics.context import RequestMetrics, _request_metrics
+from src.metrics.middleware import HTTP_REQUEST_DB_STATEMENTS, HTTP_REQUESTS
+from src.models.books import Book
+
+
+def _server_timing(response) -> dict:
+    timings = {}
+    for part in response.headers["server-timing"].split(", "):
+        name, *params = part.split(";")
+        timings[name] = dict(param.split("=", 1) for param in params)
+    return timings
+
+
+# Заголовок Server-Timing: один SELECT на чтение книги и все этапы обработки
+@pytest.mark.asyncio
+async def test_server_timing_header(db_session, async_client, create_seller):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.flush()
+
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+
+    assert response.status_code == status.HTTP_200_OK
+    timings = _server_timing(response)
+    assert timings["db"]["desc"] == '"1 statements"'
+    assert float(timings["db"]["dur"]) > 0
+    assert {"pool", "validation", "serialization", "total"} <= set(timings)
+    assert float(timings["total"]["dur"]) >= float(timings["db"]["dur"])
+
+
+# Метрики копятся по шаблону пути ручки, а не по конкретному URL
+@pytest.mark.asyncio
+async def test_metrics_endpoint(db_session, async_client, create_seller):
+    labels = {"method": "GET", "route": "/api/v1/books/{book_id}"}
+    requests_before = HTTP_REQUESTS.value(status="404", **labels)
+    observed_before = HTTP_REQUEST_DB_STATEMENTS.count(**labels)
+
+    await async_client.get("/api/v1/books/1")
+    await async_client.get("/api/v1/books/2")
+    response = await async_client.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert HTTP_REQUESTS.value(status="404", **labels) == requests_before + 2
+    assert HTTP_REQUEST_DB_STATEMENTS.count(**labels) == observed_before + 2
+    assert 'http_requests_total{method="GET",route="/api/v1/books/{book_id}",status="404"}' in response.text
+    assert re.search(r'http_request_db_seconds_total\{method="GET",route="/api/v1/books/\{book_id\}"\} \S+', response.text)
+
+
+# Ошибка валидации тела - время уходит в этап validation, до БД дело не доходит
+@pytest.mark.asyncio
+async def test_server_timing_on_validation_error(async_client):
+    response = await async_client.post("/api/v1/books/", json={"title": "No author"})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    timings = _server_timing(response)
+    assert timings["db"]["desc"] == '"0 statements"'
+    assert "validation" in timings
+    assert "serialization" not in timings
+
+
+# Лог медленных запросов включается порогом; нулевой порог ловит любой запрос
+@pytest.mark.asyncio
+async def test_slow_query_log(caplog):
+    engine = create_async_engine(settings.database_test_url)
+    instrument_engine(engine, slow_query_ms=0)
+    metrics = RequestMetrics(route="/test")
+    token = _request_metrics.set(metrics)
+
+    try:
+        with caplog.at_level(logging.WARNING, logger="src.metrics.db"):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT pg_sleep(0.01)"))
+    finally:
+        _request_metrics.reset(token)
+        await engine.dispose()
+
+    assert metrics.db_statements >= 1
+    assert metrics.db_time >= 0.01
+    assert any("pg_sleep" in record.getMessage() and "/test" in record.getMessage() for record in caplog.records)
+
+
+def test_registry_render():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("demo_total", "Demo counter", ("route",)))
+    histogram = registry.register(Histogram("demo_seconds", "Demo histogram", buckets=(0.1, 1)))
+
+    counter.inc(route='/a"b')
+    counter.inc(2, route='/a"b')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP demo_total Demo counter",
+        "# TYPE demo_total counter",
+        'demo_total{route="/a\\"b"} 3.0',
+        "# HELP demo_seconds Demo histogram",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{le="0.1"} 1',
+        'demo_seconds_bucket{le="1.0"} 2',
+        'demo_seconds_bucket{le="+Inf"} 2',
+        "demo_seconds_sum 0.55",
+        "demo_seconds_count 2",
+    ]
+    with pytest.raises(ValueError):
+        counter.inc(status="200")
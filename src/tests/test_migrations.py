@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.configurations.settings import settings
+from src.migrations import HEAD, SchemaVersionError, check_schema, current_version, upgrade
+from src.models.base import BaseModel
+
+MIGRATIONS_SCHEMA = "migrations_test"
+
+
+# Движок, смотрящий в отдельную пустую схему тестовой БД - миграции применяются с нуля
+@pytest_asyncio.fixture(scope="function")
+async def empty_schema_engine():
+    admin_engine = create_async_engine(settings.database_test_url)
+    async with admin_engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {MIGRATIONS_SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {MIGRATIONS_SCHEMA}"))
+
+    engine = create_async_engine(
+        settings.database_test_url,
+        connect_args={"server_settings": {"search_path": MIGRATIONS_SCHEMA}},
+    )
+    yield engine
+    await engine.dispose()
+
+    async with admin_engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA {MIGRATIONS_SCHEMA} CASCADE"))
+    await admin_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_check_schema_fails_on_empty_database(empty_schema_engine):
+    with pytest.raises(SchemaVersionError):
+        await check_schema(empty_schema_engine)
+
+
+@pytest.mark.asyncio
+async def test_upgrade_brings_schema_to_head(empty_schema_engine):
+    assert await upgrade(empty_schema_engine) == HEAD
+    await check_schema(empty_schema_engine)
+
+    # Повторный запуск ничего не делает
+    assert await upgrade(empty_schema_engine) == HEAD
+    async with empty_schema_engine.connect() as conn:
+        assert await current_version(conn) == HEAD
+
+
+# Воркеры стартуют одновременно: миграции применяются ровно один раз
+@pytest.mark.asyncio
+async def test_concurrent_upgrades(empty_schema_engine):
+    results = await asyncio.gather(*(upgrade(empty_schema_engine) for _ in range(3)))
+    assert results == [HEAD] * 3
+
+    async with empty_schema_engine.connect() as conn:
+        versions = (await conn.execute(text("SELECT version FROM schema_version ORDER BY version"))).scalars().all()
+    assert versions == list(range(1, HEAD + 1))
+
+
+# Схема после миграций совпадает с ORM-моделями
+@pytest.mark.asyncio
+async def test_migrations_match_models(empty_schema_engine):
+    await upgrade(empty_schema_engine)
+
+    def _schema(sync_conn):
+        inspector = inspect(sync_conn)
+        return {
+            table: (
+                {column["name"] for column in inspector.get_columns(table)},
+                # индексы уникальных ограничений в модели описаны не как Index
+                {index["name"] for index in inspector.get_indexes(table) if "duplicates_constraint" not in index},
+            )
+            for table in inspector.get_table_names()
+            if table != "schema_version"
+        }
+
+    async with empty_schema_engine.connect() as conn:
+        migrated = await conn.run_sync(_schema)
+
+    expected = {
+        table.name: (set(table.columns.keys()), {index.name for index in table.indexes})
+        for table in BaseModel.metadata.sorted_tables
+    }
+    assert migrated == expected
+
+    # триггеры сводок статистики и ленты изменений: в модели они создаются DDL-событием, в миграции - явно
+    async with empty_schema_engine.connect() as conn:
+        triggers = await conn.execute(
+            text(
+                "SELECT tgrelid::regclass::text, tgname FROM pg_trigger "
+                "WHERE NOT tgisinternal AND tgrelid::regclass::text NOT LIKE '%.%' ORDER BY 1, 2"
+            )
+        )
+        assert triggers.all() == [
+            ("books_table", "books_changes_delete"),
+            ("books_table", "books_changes_insert"),
+            ("books_table", "books_changes_update"),
+            ("books_table", "books_stats_delete"),
+            ("books_table", "books_stats_insert"),
+            ("books_table", "books_stats_update"),
+            ("sellers_table", "sellers_changes_delete"),
+            ("sellers_table", "sellers_changes_insert"),
+            ("sellers_table", "sellers_changes_update"),
+            ("sellers_table", "sellers_count_delete"),
+            ("sellers_table", "sellers_count_insert"),
+        ]
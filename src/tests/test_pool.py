@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.configurations.pool import InstrumentedAsyncPool
+from src.configurations.settings import settings
+
+
+# Пул из одного соединения: второй запрос ждет, пока первый его не вернет
+@pytest.mark.asyncio
+async def test_pool_stats_track_waiting():
+    engine = create_async_engine(
+        settings.database_test_url,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=5,
+    )
+    pool = engine.pool
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        assert pool.stats()["checked_out"] == 1
+
+        async def second_query():
+            async with engine.connect() as other:
+                await other.execute(text("SELECT 1"))
+
+        task = asyncio.create_task(second_query())
+        await asyncio.sleep(0.2)
+        assert pool.stats()["waiting"] == 1
+        # ожидающий прямо сейчас уже считается нагрузкой на пул
+        assert pool.recent_wait() >= 0.2
+
+    await task
+    stats = pool.stats()
+    await engine.dispose()
+
+    assert stats["checked_out"] == 0
+    assert stats["idle"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["waiting"] == 0
+    assert stats["wait_time_max"] >= 0.2
+    assert 0 < stats["wait_time_recent"] <= stats["wait_time_max"]
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_count_timeouts():
+    engine = create_async_engine(
+        settings.database_test_url,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+
+    async with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            async with engine.connect():
+                pass
+
+    stats = engine.pool.stats()
+    await engine.dispose()
+    assert stats["timeouts"] == 1
+
+
+# /internal/pool отдает пул основной базы и пулы реплик
+@pytest.mark.asyncio
+async def test_internal_pool_includes_replicas(async_client, monkeypatch):
+    from src.configurations import database
+
+    def engine(host):
+        return create_async_engine(f"postgresql+asyncpg://user:secret@{host}/db", poolclass=InstrumentedAsyncPool)
+
+    primary, replicas = engine("primary"), [engine("replica1:6432"), engine("replica2")]
+    monkeypatch.setattr(database, "__async_engine", primary)
+    monkeypatch.setattr(database, "__replica_engines", replicas)
+
+    response = await async_client.get("/internal/pool")
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["checkouts"] == 0 and stats["wait_time_recent"] == 0
+    assert [replica["host"] for replica in stats["replicas"]] == ["replica1:6432", "replica2:5432"]
+    assert stats["replicas"][0]["size"] == primary.pool.size()
@@ -0,0 +1,176 @@
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from fastapi import Request, status
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.cache import book_key
+from src.configurations.database import read_sessionmaker
+from src.configurations.replicas import READ_YOUR_WRITES_COOKIE, ReadRouter
+from src.configurations.settings import settings
+from src.models.base import BaseModel
+from src.models.books import Book
+from src.models.sellers import Seller
+
+# Две отдельные базы того же сервера изображают реплики основной (тестовой) базы
+REPLICA_NAMES = ["fastapi_project_test_replica_1", "fastapi_project_test_replica_2"]
+
+
+def _replica_url(name: str) -> str:
+    return settings.database_test_url.rsplit("/", 1)[0] + "/" + name
+
+
+# Базы-реплики с той же схемой и одной книгой, по названию которой видно, откуда пришел ответ
+@pytest_asyncio.fixture(scope="function")
+async def replica_engines():
+    admin_engine = create_async_engine(settings.database_test_url, isolation_level="AUTOCOMMIT")
+    async with admin_engine.connect() as conn:
+        for name in REPLICA_NAMES:
+            exists = await conn.scalar(text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": name})
+            if not exists:
+                await conn.execute(text(f"CREATE DATABASE {name}"))
+    await admin_engine.dispose()
+
+    engines = [create_async_engine(_replica_url(name)) for name in REPLICA_NAMES]
+    for engine, name in zip(engines, REPLICA_NAMES):
+        async with engine.begin() as conn:
+            await conn.run_sync(BaseModel.metadata.drop_all)
+            await conn.run_sync(BaseModel.metadata.create_all)
+            seller_id = await conn.scalar(
+                insert(Seller).values(first_name="R", last_name="R", email="replica@example.com").returning(Seller.id)
+            )
+            await conn.execute(
+                insert(Book).values(title=name, author="Replica", year=2024, pages=1, seller_id=seller_id)
+            )
+
+    yield engines
+
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def replica_app(test_app, db_session, replica_engines):
+    from src.configurations.database import get_read_session
+
+    router = ReadRouter(lambda: db_session, [read_sessionmaker(engine, replica=True) for engine in replica_engines])
+
+    async def _get_read_session(request: Request):
+        session = router.session_factory(request)()
+        try:
+            yield session
+        finally:
+            if session is not db_session:
+                await session.close()
+
+    test_app.dependency_overrides[get_read_session] = _get_read_session
+    return test_app
+
+
+async def _titles(async_client):
+    response = await async_client.get("/api/v1/books/")
+    assert response.status_code == status.HTTP_200_OK
+    return [book["title"] for book in response.json()["books"]]
+
+
+# Чтения идут на реплики по очереди, запись - в основную базу, после нее клиент читает из основной
+@pytest.mark.asyncio
+async def test_reads_go_to_replicas_and_writes_to_primary(replica_app, async_client, create_seller):
+    assert await _titles(async_client) == [REPLICA_NAMES[0]]
+    assert await _titles(async_client) == [REPLICA_NAMES[1]]
+    assert await _titles(async_client) == [REPLICA_NAMES[0]]
+
+    response = await async_client.post(
+        "/api/v1/books/",
+        json={"title": "primary", "author": "Primary", "year": 2024, "count_pages": 1, "seller_id": create_seller.id},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert READ_YOUR_WRITES_COOKIE in response.cookies
+
+    # read-your-writes: только что созданная книга видна сразу
+    assert await _titles(async_client) == ["primary"]
+
+    # окно read-your-writes закончилось - снова реплики
+    async_client.cookies.set(READ_YOUR_WRITES_COOKIE, str(time.time() - 1))
+    assert await _titles(async_client) in ([REPLICA_NAMES[0]], [REPLICA_NAMES[1]])
+
+
+# Неудачная запись куку не ставит
+@pytest.mark.asyncio
+async def test_failed_write_keeps_reading_from_replicas(replica_app, async_client):
+    response = await async_client.post(
+        "/api/v1/books/", json={"title": "x", "author": "x", "year": 2024, "count_pages": 1, "seller_id": 9999}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert READ_YOUR_WRITES_COOKIE not in response.cookies
+    assert await _titles(async_client) == [REPLICA_NAMES[0]]
+
+
+# Клиент в окне read-your-writes читает мимо кэша: не получает закэшированный ответ реплики и не кладет свой
+@pytest.mark.asyncio
+async def test_read_your_writes_bypasses_cache(replica_app, async_client, response_cache, create_seller):
+    response = await async_client.post(
+        "/api/v1/books/",
+        json={"title": "primary", "author": "Primary", "year": 2024, "count_pages": 1, "seller_id": create_seller.id},
+    )
+    book_id = response.json()["id"]
+    assert await response_cache.get(book_key(book_id)) is None
+
+    for _ in range(2):
+        response = await async_client.get(f"/api/v1/books/{book_id}")
+        assert response.json()["title"] == "primary"
+        assert await response_cache.get(book_key(book_id)) is None
+
+    # без куки - снова реплика и кэш
+    async_client.cookies.clear()
+    response = await async_client.get(f"/api/v1/books/{book_id}")
+    assert response.json()["title"] == REPLICA_NAMES[0]
+    assert await response_cache.get(book_key(book_id)) is not None
+    response = await async_client.get("/api/v1/books/batch", params={"ids": book_id})
+    assert response.json()["results"][0]["book"]["title"] == REPLICA_NAMES[0]
+
+    # в кэше ответ реплики, но клиент после записи его не видит
+    async_client.cookies.set(READ_YOUR_WRITES_COOKIE, str(time.time() + 5))
+    response = await async_client.get(f"/api/v1/books/{book_id}")
+    assert response.json()["title"] == "primary"
+    response = await async_client.get("/api/v1/books/batch", params={"ids": book_id})
+    assert response.json()["results"][0]["book"]["title"] == "primary"
+
+
+# Сразу после сброса ключа прочитанное с (возможно, отстающей) реплики не кэшируется - только по истечении окна
+@pytest.mark.asyncio
+async def test_replica_reads_do_not_refill_cache_during_lag_window(
+    replica_app, async_client, response_cache, create_seller
+):
+    response_cache.replica_lag = 0.2
+    response = await async_client.post(
+        "/api/v1/books/",
+        json={"title": "primary", "author": "Primary", "year": 2024, "count_pages": 1, "seller_id": create_seller.id},
+    )
+    book_id = response.json()["id"]
+    response = await async_client.put(
+        f"/api/v1/books/{book_id}",
+        json={"title": "updated", "author": "Primary", "pages": 1, "year": 2024, "id": book_id},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    async_client.cookies.clear()
+
+    response = await async_client.get(f"/api/v1/books/{book_id}")
+    assert response.json()["title"] == REPLICA_NAMES[0]
+    response = await async_client.get("/api/v1/books/batch", params={"ids": book_id})
+    assert response.json()["results"][0]["book"]["title"] == REPLICA_NAMES[1]
+    assert await response_cache.get(book_key(book_id)) is None
+
+    await asyncio.sleep(0.25)
+    await async_client.get(f"/api/v1/books/{book_id}")
+    assert await response_cache.get(book_key(book_id)) is not None
+
+
+def test_read_router_without_replicas():
+    primary = object()
+    router = ReadRouter(lambda: primary)
+    request = Request({"type": "http", "headers": []})
+    assert router.session_factory(request)() is primary
@@ -0,0 +1,166 @@
+""" Регрессионные тесты на число обращений к БД в ручках записи и чтения.
+Если тест упал, значит в ручку добавился лишний запрос - стоит проверить, нужен ли он.
+"""
+
+import random
+
+import pytest
+from asyncpg.transaction import Transaction
+from fastapi import status
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.tests.conftest import async_test_engine
+
+
+def _kinds(statements):
+    return [statement.split(None, 1)[0].upper() for statement in statements]
+
+
+@pytest.mark.asyncio
+async def test_create_book_round_trips(async_client, create_seller, sql_statements):
+    sql_statements.clear()
+    data = {"title": "Clean Architecture", "author": "Robert Martin", "count_pages": 300, "year": 2025, "seller_id": create_seller.id}
+    response = await async_client.post("/api/v1/books/", json=data)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert _kinds(sql_statements) == ["INSERT", "COMMIT"]
+
+
+@pytest.mark.asyncio
+async def test_update_book_round_trips(db_session, async_client, create_seller, sql_statements):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.flush()
+    sql_statements.clear()
+
+    response = await async_client.put(
+        f"/api/v1/books/{book.id}",
+        json={"title": "Mziri", "author": "Lermontov", "pages": 100, "year": 2007, "id": book.id, "seller_id": create_seller.id},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert _kinds(sql_statements) == ["UPDATE", "COMMIT"]
+
+
+@pytest.mark.asyncio
+async def test_delete_book_round_trips(db_session, async_client, create_seller, sql_statements):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.flush()
+    sql_statements.clear()
+
+    response = await async_client.delete(f"/api/v1/books/{book.id}")
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert _kinds(sql_statements) == ["DELETE", "COMMIT"]
+
+
+@pytest.mark.asyncio
+async def test_create_seller_round_trips(async_client, sql_statements):
+    data = {"first_name": "Uliana", "last_name": "Gagarina", "email": f"test{random.randint(1, 100000)}@example.com"}
+    response = await async_client.post("/api/v1/seller/", json=data)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["books"] == []
+    assert _kinds(sql_statements) == ["INSERT", "COMMIT"]
+
+
+@pytest.mark.asyncio
+async def test_update_seller_round_trips(async_client, create_seller, sql_statements):
+    sql_statements.clear()
+    response = await async_client.put(f"/api/v1/seller/{create_seller.id}", json={"first_name": "New"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["first_name"] == "New"
+    assert _kinds(sql_statements) == ["UPDATE", "SELECT", "COMMIT"]
+
+
+# Настоящие зависимости сессий приложения на тестовом движке (а не общая тестовая сессия)
+@pytest.fixture(scope="function")
+def app_sessions(test_app, monkeypatch):
+    from src.configurations import database
+    from src.configurations.replicas import ReadRouter
+
+    monkeypatch.setattr(database, "__session_factory", async_sessionmaker(async_test_engine))
+    monkeypatch.setattr(database, "__read_router", ReadRouter(database.read_sessionmaker(async_test_engine)))
+    del test_app.dependency_overrides[database.get_read_session]
+    del test_app.dependency_overrides[database.get_write_session]
+    return test_app
+
+
+# Все, что уходит в Postgres: запросы SQLAlchemy и BEGIN/COMMIT/ROLLBACK, которые asyncpg
+# отправляет сам (через свой Transaction), мимо событий выполнения запросов SQLAlchemy
+@pytest.fixture(scope="function")
+def wire_queries(monkeypatch):
+    queries = []
+
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    def _record(query, method):
+        async def wrapper(transaction):
+            queries.append(query(transaction))
+            return await method(transaction)
+
+        return wrapper
+
+    monkeypatch.setattr(
+        Transaction, "start", _record(lambda t: "BEGIN READ ONLY" if t._readonly else "BEGIN", Transaction.start)
+    )
+    monkeypatch.setattr(Transaction, "commit", _record(lambda t: "COMMIT", Transaction.commit))
+    monkeypatch.setattr(Transaction, "rollback", _record(lambda t: "ROLLBACK", Transaction.rollback))
+    event.listen(async_test_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    yield queries
+    event.remove(async_test_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# Ручки чтения отправляют только свои SELECT: сессия чтения в автокоммите, без BEGIN/COMMIT/ROLLBACK
+@pytest.mark.asyncio
+async def test_get_round_trips(db_session, app_sessions, async_client, wire_queries):
+    seller = Seller(first_name="Ivan", last_name="Petrov", email="ivan@example.com")
+    db_session.add(seller)
+    await db_session.flush()
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2021, pages=104, seller_id=seller.id)
+    db_session.add(book)
+    await db_session.commit()
+
+    expected = {
+        "/api/v1/books/": ["SELECT"],
+        "/api/v1/books/search?q=pushkin": ["SELECT", "SELECT"],  # страница и фасеты
+        f"/api/v1/books/batch?ids={book.id}": ["SELECT"],
+        f"/api/v1/books/{book.id + 1}": ["SELECT"],
+        "/api/v1/seller/": ["SELECT"],
+        f"/api/v1/seller/{seller.id}": ["SELECT", "SELECT"],  # продавец и его книги
+        f"/api/v1/seller/{seller.id}/books": ["SELECT"],
+        f"/api/v1/seller/{seller.id}/stats": ["SELECT"],
+        "/api/v1/stats": ["SELECT", "SELECT"],
+    }
+    for url, kinds in expected.items():
+        wire_queries.clear()
+        response = await async_client.get(url)
+        assert response.status_code in (status.HTTP_200_OK, status.HTTP_404_NOT_FOUND), url
+        assert _kinds(wire_queries) == kinds, url
+
+    # выгрузке потоком нужна транзакция для серверного курсора - только для чтения, со снимком
+    wire_queries.clear()
+    response = await async_client.get("/api/v1/books/?stream=true")
+    assert response.status_code == status.HTTP_200_OK
+    assert wire_queries[0] == "BEGIN READ ONLY"
+
+
+# Ручка записи, закоммитившая сама, не получает от зависимости второй COMMIT и лишний ROLLBACK
+@pytest.mark.asyncio
+async def test_write_session_commits_once(db_session, app_sessions, async_client, wire_queries):
+    seller = Seller(first_name="Ivan", last_name="Petrov", email="ivan@example.com")
+    db_session.add(seller)
+    await db_session.commit()
+
+    data = {"title": "Clean Architecture", "author": "Robert Martin", "count_pages": 300, "year": 2025, "seller_id": seller.id}
+    wire_queries.clear()
+    response = await async_client.post("/api/v1/books/", json=data)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert _kinds(wire_queries) == ["BEGIN", "INSERT", "COMMIT"]
@@ -1,7 +1,9 @@
 import pytest
 import random
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import func, select
+from src.configurations.settings import settings
+from src.jobs import wait_for_purges
+from src.models.books import Book
 from src.models.sellers import Seller
 from fastapi import status
 
@@ -64,6 +66,112 @@ async def test_get_sellers(async_client, db_session):
     assert len(sellers_data) == 2
 
 
+# список продавцов: вместо книг - их число
+@pytest.mark.asyncio
+async def test_get_sellers_with_book_count(async_client, db_session):
+    seller = Seller(first_name="Alice", last_name="Smith", email=f"alice{random.randint(1, 100000)}@example.com")
+    empty_seller = Seller(first_name="Bob", last_name="Johnson", email=f"bob{random.randint(1, 100000)}@example.com")
+    db_session.add_all([seller, empty_seller])
+    await db_session.flush()
+    db_session.add_all(
+        [Book(author="Pushkin", title=f"Book {i}", year=2001, pages=104, seller_id=seller.id) for i in range(3)]
+    )
+    await db_session.flush()
+
+    response = await async_client.get("/api/v1/seller/")
+    assert response.status_code == status.HTTP_200_OK
+
+    assert response.json() == [
+        {"id": seller.id, "first_name": "Alice", "last_name": "Smith", "email": seller.email, "book_count": 3},
+        {
+            "id": empty_seller.id,
+            "first_name": "Bob",
+            "last_name": "Johnson",
+            "email": empty_seller.email,
+            "book_count": 0,
+        },
+    ]
+
+
+# ?include=books - к каждому продавцу не больше books_limit первых книг
+@pytest.mark.asyncio
+async def test_get_sellers_include_books(async_client, db_session):
+    seller = Seller(first_name="Alice", last_name="Smith", email=f"alice{random.randint(1, 100000)}@example.com")
+    empty_seller = Seller(first_name="Bob", last_name="Johnson", email=f"bob{random.randint(1, 100000)}@example.com")
+    db_session.add_all([seller, empty_seller])
+    await db_session.flush()
+    books = [Book(author="Pushkin", title=f"Book {i}", year=2001, pages=104, seller_id=seller.id) for i in range(3)]
+    db_session.add_all(books)
+    await db_session.flush()
+
+    response = await async_client.get("/api/v1/seller/", params={"include": "books", "books_limit": 2})
+    assert response.status_code == status.HTTP_200_OK
+
+    assert response.json() == [
+        {
+            "id": seller.id,
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": seller.email,
+            "book_count": 3,
+            "books": [
+                {
+                    "id": book.id,
+                    "title": book.title,
+                    "author": "Pushkin",
+                    "year": 2001,
+                    "count_pages": 104,
+                    "seller_id": seller.id,
+                }
+                for book in books[:2]
+            ],
+        },
+        {
+            "id": empty_seller.id,
+            "first_name": "Bob",
+            "last_name": "Johnson",
+            "email": empty_seller.email,
+            "book_count": 0,
+            "books": [],
+        },
+    ]
+
+
+# книги продавца постранично
+@pytest.mark.asyncio
+async def test_get_seller_books_pagination(async_client, db_session, create_seller):
+    books = [
+        Book(author="Pushkin", title=f"Book {i}", year=2001, pages=104, seller_id=create_seller.id) for i in range(5)
+    ]
+    db_session.add_all(books)
+    await db_session.flush()
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = await async_client.get(f"/api/v1/seller/{create_seller.id}/books", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert len(page["books"]) <= 2
+        seen.extend(book["id"] for book in page["books"])
+        if page["next_cursor"] is None:
+            break
+        params["after"] = page["next_cursor"]
+
+    assert seen == [book.id for book in books]
+
+
+# книги продавца: пустой список у продавца без книг и 404 у несуществующего
+@pytest.mark.asyncio
+async def test_get_seller_books_empty_and_missing(async_client, create_seller):
+    response = await async_client.get(f"/api/v1/seller/{create_seller.id}/books")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"books": [], "next_cursor": None}
+
+    response = await async_client.get("/api/v1/seller/9999/books")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 # получение продавца по `id`
 @pytest.mark.asyncio
 async def test_get_seller_by_id(async_client, db_session):
@@ -113,4 +221,62 @@ async def test_delete_seller(async_client, db_session):
 
     result = await db_session.execute(select(Seller).where(Seller.id == seller.id))
     deleted_seller = result.scalars().first()
-    assert deleted_seller is None
\ No newline at end of file
+    assert deleted_seller is None
+
+
+# книги продавца удаляет каскад внешнего ключа: ORM их не загружает и не удаляет по одной
+@pytest.mark.asyncio
+async def test_delete_seller_with_books(async_client, db_session, sql_statements):
+    seller = Seller(first_name="Eve", last_name="Taylor", email="eve@example.com")
+    db_session.add(seller)
+    await db_session.flush()
+    db_session.add_all(
+        [Book(author="Pushkin", title=f"Book {i}", year=2001, pages=104, seller_id=seller.id) for i in range(3)]
+    )
+    await db_session.flush()
+    sql_statements.clear()
+
+    response = await async_client.delete(f"/api/v1/seller/{seller.id}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert [statement.split(None, 1)[0].upper() for statement in sql_statements] == [
+        "SELECT", "SELECT", "DELETE", "COMMIT"
+    ]
+
+    assert await db_session.scalar(select(func.count()).select_from(Book)) == 0
+
+
+# продавец с книгами сверх порога удаляется в фоне пачками, ход виден в GET /seller/{id}/purge
+@pytest.mark.asyncio
+async def test_delete_large_seller_in_background(async_client, db_session, monkeypatch):
+    monkeypatch.setattr(settings, "seller_purge_threshold", 2)
+    monkeypatch.setattr(settings, "seller_purge_batch_size", 2)
+    seller = Seller(first_name="Eve", last_name="Taylor", email="eve@example.com")
+    db_session.add(seller)
+    await db_session.flush()
+    db_session.add_all(
+        [Book(author="Pushkin", title=f"Book {i}", year=2001, pages=104, seller_id=seller.id) for i in range(5)]
+    )
+    await db_session.flush()
+
+    response = await async_client.delete(f"/api/v1/seller/{seller.id}")
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.json()["status"] == "running"
+    assert response.json()["total_books"] == 5
+    assert response.headers["location"].endswith(f"/api/v1/seller/{seller.id}/purge")
+
+    await wait_for_purges()
+
+    response = await async_client.get(f"/api/v1/seller/{seller.id}/purge")
+    assert response.status_code == status.HTTP_200_OK
+    purge = response.json()
+    assert (purge["status"], purge["total_books"], purge["deleted_books"]) == ("done", 5, 5)
+    assert purge["finished_at"] is not None
+
+    response = await async_client.get(f"/api/v1/seller/{seller.id}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert await db_session.scalar(select(func.count()).select_from(Book)) == 0
+    response = await async_client.get("/api/v1/stats")
+    assert (response.json()["seller_count"], response.json()["book_count"]) == (0, 0)
+
+    response = await async_client.get("/api/v1/seller/9999/purge")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
\ No newline at end of file
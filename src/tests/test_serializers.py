@@ -0,0 +1,38 @@
+import pytest
+from pydantic import BaseModel
+
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.schemas import ReturnedBook
+from src.schemas.sellers import SellerResponse
+from src.utils import serializer_for
+
+
+# Готовые bytes совпадают с тем, что отдал бы pydantic - и для ORM-объектов, и для строк Core
+def test_serializer_matches_pydantic():
+    book = Book(id=1, title="Mziri", author="Lermontov", year=1997, pages=104, seller_id=2)
+    seller = Seller(id=2, first_name="Ivan", last_name="Petrov", email="ivan@example.com", books=[book])
+
+    assert serializer_for(ReturnedBook).dumps(book) == ReturnedBook.model_validate(
+        book, from_attributes=True
+    ).model_dump_json().encode()
+    assert serializer_for(SellerResponse).dumps(seller) == SellerResponse.model_validate(
+        seller
+    ).model_dump_json(by_alias=True).encode()
+
+    # строки Core подписаны ключами JSON (count_pages), лишние колонки (version) не попадают в ответ
+    row = {"id": 2, "first_name": "Ivan", "last_name": "Petrov", "email": "ivan@example.com", "version": 1,
+           "books": [{"id": 1, "title": "Mziri", "author": "Lermontov", "year": 1997, "count_pages": 104,
+                      "seller_id": 2, "version": 3}]}
+    assert serializer_for(SellerResponse).dumps(row) == serializer_for(SellerResponse).dumps(seller)
+
+    with pytest.raises(KeyError):
+        serializer_for(ReturnedBook).dumps({"id": 1})
+
+
+def test_serializer_rejects_unsupported_types():
+    class WithDict(BaseModel):
+        data: dict
+
+    with pytest.raises(RuntimeError):
+        serializer_for(WithDict)
@@ -0,0 +1,164 @@
+import pytest
+from fastapi import status
+from sqlalchemy import func, select, text
+
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.models.stats import BookYearStats
+
+from .conftest import async_test_session
+
+
+# Сводка должна совпадать со статистикой, посчитанной напрямую по книгам
+async def _expected_seller_stats(db_session, seller_id):
+    result = await db_session.execute(
+        select(Book.year, func.count().label("book_count"), func.sum(Book.pages).label("pages_total"))
+        .where(Book.seller_id == seller_id)
+        .group_by(Book.year)
+        .order_by(Book.year)
+    )
+    years = [dict(row) for row in result.mappings()]
+    return {
+        "seller_id": seller_id,
+        "book_count": sum(year["book_count"] for year in years),
+        "pages_total": sum(year["pages_total"] for year in years),
+        "years": years,
+    }
+
+
+@pytest.mark.asyncio
+async def test_seller_stats_follow_writes(db_session, async_client, create_seller):
+    seller_id = create_seller.id
+    other = Seller(first_name="Other", last_name="Seller", email="other_stats@example.com")
+    db_session.add(other)
+    await db_session.flush()
+    other_id = other.id
+
+    response = await async_client.get(f"/api/v1/seller/{seller_id}/stats")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"seller_id": seller_id, "book_count": 0, "pages_total": 0, "years": []}
+
+    # одна книга, пачка книг и книги, добавленные через ORM
+    response = await async_client.post(
+        "/api/v1/books/", json={"title": "A", "author": "X", "year": 2021, "count_pages": 100, "seller_id": seller_id}
+    )
+    book_id = response.json()["id"]
+    await async_client.post(
+        "/api/v1/books/bulk",
+        json=[
+            {"title": f"B{i}", "author": "X", "year": 2022 + i % 2, "count_pages": 10 * i, "seller_id": seller_id}
+            for i in range(1, 6)
+        ],
+    )
+    db_session.add(Book(title="C", author="Y", year=2021, pages=300, seller_id=other_id))
+    await db_session.flush()
+
+    response = await async_client.get(f"/api/v1/seller/{seller_id}/stats")
+    assert response.json() == await _expected_seller_stats(db_session, seller_id)
+    assert response.json()["book_count"] == 6
+
+    # смена года и числа страниц, переезд к другому продавцу, удаление
+    await async_client.put(
+        f"/api/v1/books/{book_id}", json={"id": book_id, "title": "A", "author": "X", "year": 2025, "pages": 50}
+    )
+    response = await async_client.get(f"/api/v1/seller/{seller_id}/stats")
+    assert response.json() == await _expected_seller_stats(db_session, seller_id)
+    assert {"year": 2025, "book_count": 1, "pages_total": 50} in response.json()["years"]
+
+    await async_client.put(
+        f"/api/v1/books/{book_id}",
+        json={"id": book_id, "title": "A", "author": "X", "year": 2025, "pages": 50, "seller_id": other_id},
+    )
+    await async_client.delete(f"/api/v1/books/{book_id}")
+    for checked_id in (seller_id, other_id):
+        response = await async_client.get(f"/api/v1/seller/{checked_id}/stats")
+        assert response.json() == await _expected_seller_stats(db_session, checked_id)
+    assert all(year["year"] != 2025 for year in response.json()["years"])
+
+
+@pytest.mark.asyncio
+async def test_seller_stats_not_found(async_client):
+    response = await async_client.get("/api/v1/seller/9999/stats")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_catalog_stats(db_session, async_client):
+    response = await async_client.get("/api/v1/stats")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"seller_count": 0, "book_count": 0, "pages_total": 0, "years": []}
+
+    sellers = [Seller(first_name="S", last_name=str(i), email=f"catalog{i}@example.com") for i in range(3)]
+    db_session.add_all(sellers)
+    await db_session.flush()
+    db_session.add_all(
+        [
+            Book(title="A", author="X", year=2020, pages=100, seller_id=sellers[0].id),
+            Book(title="B", author="X", year=2020, pages=200, seller_id=sellers[1].id),
+            Book(title="C", author="X", year=2024, pages=300, seller_id=sellers[1].id),
+        ]
+    )
+    await db_session.flush()
+
+    response = await async_client.get("/api/v1/stats")
+    assert response.json() == {
+        "seller_count": 3,
+        "book_count": 3,
+        "pages_total": 600,
+        "years": [
+            {"year": 2020, "book_count": 2, "pages_total": 300},
+            {"year": 2024, "book_count": 1, "pages_total": 300},
+        ],
+    }
+
+    # удаление продавца каскадом удаляет его книги - сводки следуют за ним
+    response = await async_client.delete(f"/api/v1/seller/{sellers[1].id}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    response = await async_client.get("/api/v1/stats")
+    assert response.json() == {
+        "seller_count": 2,
+        "book_count": 1,
+        "pages_total": 100,
+        "years": [{"year": 2020, "book_count": 1, "pages_total": 100}],
+    }
+
+
+# Сводки каталога разбиты на полосы: две транзакции, добавляющие книги одного года и продавцов,
+# пишут в разные строки и не ждут друг друга до коммита
+@pytest.mark.asyncio
+async def test_catalog_stats_writes_do_not_block_each_other(db_session, async_client):
+    async with async_test_session() as setup:
+        sellers = [Seller(first_name="S", last_name=str(i), email=f"shard{i}@example.com") for i in range(2)]
+        setup.add_all(sellers)
+        await setup.commit()
+
+    async with async_test_session() as first, async_test_session() as second:
+        for session, seller in ((first, sellers[0]), (second, sellers[1])):
+            await session.execute(text("SET LOCAL lock_timeout = '1s'"))
+            session.add(Book(title="A", author="X", year=2020, pages=100, seller_id=seller.id))
+            session.add(Seller(first_name="N", last_name="N", email=f"shard_new{seller.id}@example.com"))
+            await session.flush()
+        await first.commit()
+        await second.commit()
+
+    # удаление в другой транзакции вычитается в свою полосу, сумма остается верной
+    async with async_test_session() as session:
+        await session.execute(Book.__table__.delete().where(Book.seller_id == sellers[0].id))
+        await session.commit()
+
+    shards = await db_session.scalar(select(func.count()).select_from(BookYearStats))
+    assert shards >= 2
+    response = await async_client.get("/api/v1/stats")
+    assert response.json() == {
+        "seller_count": 4,
+        "book_count": 1,
+        "pages_total": 100,
+        "years": [{"year": 2020, "book_count": 1, "pages_total": 100}],
+    }
+
+    async with async_test_session() as session:
+        await session.execute(Book.__table__.delete())
+        await session.commit()
+    response = await async_client.get("/api/v1/stats")
+    assert response.json()["years"] == []
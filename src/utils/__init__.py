@@ -0,0 +1,7 @@
+from .db_errors import *
+from .etags import *
+from .loaders import *
+from .pagination import *
+from .serializers import *
+
+__all__ = db_errors.__all__ + etags.__all__ + loaders.__all__ + pagination.__all__ + serializers.__all__
@@ -0,0 +1,22 @@
+from sqlalchemy.exc import DBAPIError
+
+__all__ = ["is_foreign_key_violation", "is_unique_violation", "db_error_detail"]
+
+# Коды ошибок Postgres (SQLSTATE)
+FOREIGN_KEY_VIOLATION = "23503"
+UNIQUE_VIOLATION = "23505"
+
+
+# Вместо предварительного SELECT "а есть ли продавец / свободен ли email" пишем сразу
+# и разбираем ошибку БД - на один запрос меньше и без гонки между проверкой и записью.
+def is_foreign_key_violation(error: DBAPIError) -> bool:
+    return getattr(error.orig, "pgcode", None) == FOREIGN_KEY_VIOLATION
+
+
+def is_unique_violation(error: DBAPIError) -> bool:
+    return getattr(error.orig, "pgcode", None) == UNIQUE_VIOLATION
+
+
+# Текст ошибки Postgres без обертки драйвера - для ответа клиенту по одной строке
+def db_error_detail(error: DBAPIError) -> str:
+    return getattr(error.orig.__cause__, "message", None) or str(error.orig)
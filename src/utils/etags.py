@@ -0,0 +1,48 @@
+import hashlib
+from typing import Iterable, List, Optional, Tuple
+
+__all__ = ["row_etag", "body_etag", "etag_matches", "if_match_versions"]
+
+
+# ETag одного ресурса по версиям строк: ресурс (id, version) и вложенные в его ответ строки.
+# Меняется при любом UPDATE этих строк, а также при добавлении и удалении вложенных.
+def row_etag(resource_id: int, version: int, nested: Iterable[Tuple[int, int]] = ()) -> str:
+    tag = f"{resource_id}.{version}"
+    nested = sorted(nested)
+    if nested:
+        digest = hashlib.blake2b(repr(nested).encode(), digest_size=8).hexdigest()
+        tag = f"{tag}.{digest}"
+    return f'"{tag}"'
+
+
+# ETag по содержимому тела ответа - для списков, у которых нет своей версии
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+# Совпадает ли ETag с заголовком If-None-Match / If-Match (список через запятую, "*" или W/"...")
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+
+# Версии ресурса, перечисленные в If-Match (ETag вида "id.version[...]", см. row_etag).
+# None - проверять не нужно (заголовка нет или он "*"). Пустой список - ни один ETag не подходит.
+# Так условие If-Match можно проверить прямо в UPDATE ... WHERE version IN (...), без лишнего SELECT.
+def if_match_versions(header: Optional[str], resource_id: int) -> Optional[List[int]]:
+    if not header:
+        return None
+
+    versions = []
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return None
+
+        parts = candidate.removeprefix("W/").strip('"').split(".")
+        if len(parts) >= 2 and parts[0] == str(resource_id) and parts[1].isdigit():
+            versions.append(int(parts[1]))
+    return versions
@@ -0,0 +1,43 @@
+from typing import Collection, List, Type
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, raiseload
+from sqlalchemy.orm.interfaces import LoaderOption
+from sqlalchemy.sql.elements import Label
+
+from src.models.base import BaseModel as OrmBaseModel
+
+__all__ = ["loader_options_for", "columns_for"]
+
+
+# Подбирает опции загрузки ORM-модели под схему ответа:
+# из БД читаются только те колонки, которые есть в схеме, а связи не грузятся вовсе.
+# Если схема начнет требовать связь, обращение к ней упадет сразу, а не молча добавит запрос.
+# extra - колонки, нужные ручке помимо схемы (например, version для ETag).
+def loader_options_for(
+    model: Type[OrmBaseModel], schema: Type[BaseModel], extra: Collection[str] = ()
+) -> List[LoaderOption]:
+    columns = inspect(model).columns
+    names = [name for name in schema.model_fields if name in columns] + list(extra)
+    return [load_only(*(getattr(model, name) for name in names)), raiseload("*")]
+
+
+# Колонки модели для Core-запроса, подписанные так, как поле называется в JSON-ответе схемы.
+# Строки такого запроса можно сразу отдавать в orjson, минуя ORM и pydantic.
+# Вызывается один раз при импорте: если схема и модель разошлись, приложение не стартует.
+def columns_for(
+    model: Type[OrmBaseModel], schema: Type[BaseModel], exclude: Collection[str] = ()
+) -> List[Label]:
+    columns = inspect(model).columns
+    missing = [name for name in schema.model_fields if name not in columns and name not in exclude]
+    if missing:
+        raise RuntimeError(
+            f"{schema.__name__} fields {missing} have no columns in {model.__name__}"
+        )
+
+    return [
+        getattr(model, name).label(field.serialization_alias or name)
+        for name, field in schema.model_fields.items()
+        if name not in exclude
+    ]
@@ -0,0 +1,17 @@
+import base64
+import binascii
+
+__all__ = ["encode_cursor", "decode_cursor"]
+
+
+# Курсор для keyset-пагинации. Снаружи он непрозрачен (base64),
+# внутри - id последней отданной записи. Клиент не должен на него полагаться.
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
@@ -0,0 +1,80 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Type, Union, get_args, get_origin
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, EmailStr
+
+__all__ = ["JsonSerializer", "serializer_for"]
+
+# Типы полей, которые orjson пишет сам так же, как pydantic
+_PLAIN_TYPES = (int, str, float, bool, EmailStr, type(None))
+
+# Значение по умолчанию обязательного поля: его отсутствие - ошибка, а не None в ответе
+_REQUIRED = object()
+
+# Поле схемы: имя атрибута ORM-объекта, ключ в JSON (и в строке Core-запроса, см. columns_for),
+# сериализатор вложенной схемы (если есть), список ли это и значение по умолчанию
+_Field = Tuple[str, str, Optional["JsonSerializer"], bool, Any]
+
+
+# Сериализатор схемы ответа прямо в bytes: ORM-объекты и строки Core-запросов
+# превращаются в словари по полям схемы и уходят в orjson - без валидации pydantic
+# и jsonable_encoder, которые FastAPI делает для response_model.
+# Обход полей собирается один раз на схему (serializer_for). Данные при этом не проверяются,
+# поэтому поддерживаются только поля простых типов и вложенные схемы: на любом другом типе
+# сборка падает при импорте - так же, как columns_for на расхождении схемы и модели.
+class JsonSerializer:
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+        self.fields: List[_Field] = []
+        for name, field in schema.model_fields.items():
+            nested, many = _nested_schema(schema, name, field.annotation)
+            default = _REQUIRED if field.is_required() else field.get_default(call_default_factory=True)
+            self.fields.append((name, field.serialization_alias or name, nested, many, default))
+
+    def to_dict(self, obj: Any) -> Dict[str, Any]:
+        # Строки Core-запросов и словари подписаны ключами JSON, у ORM-объектов - атрибуты с именами полей
+        is_mapping = isinstance(obj, Mapping)
+        data = {}
+        for name, key, nested, many, default in self.fields:
+            if is_mapping:
+                value = obj[key] if default is _REQUIRED else obj.get(key, default)
+            else:
+                value = getattr(obj, name) if default is _REQUIRED else getattr(obj, name, default)
+            if nested is not None and value is not None:
+                value = [nested.to_dict(item) for item in value] if many else nested.to_dict(value)
+            data[key] = value
+        return data
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(self.to_dict(obj))
+
+    def dumps_many(self, objs: Any) -> bytes:
+        return orjson.dumps([self.to_dict(obj) for obj in objs])
+
+    def response(self, obj: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+        return Response(content=self.dumps(obj), status_code=status_code, media_type="application/json",
+                        headers=headers)
+
+
+@lru_cache(maxsize=None)
+def serializer_for(schema: Type[BaseModel]) -> JsonSerializer:
+    return JsonSerializer(schema)
+
+
+# Разбирает аннотацию поля: (сериализатор вложенной схемы или None, список ли это)
+def _nested_schema(schema: Type[BaseModel], name: str, annotation: Any) -> Tuple[Optional[JsonSerializer], bool]:
+    many = False
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        annotation = args[0] if len(args) == 1 else annotation
+    if get_origin(annotation) in (list, List):
+        many = True
+        (annotation,) = get_args(annotation)
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return serializer_for(annotation), many
+    if annotation in _PLAIN_TYPES:
+        return None, many
+    raise RuntimeError(f"{schema.__name__}.{name}: field type {annotation!r} is not supported by JsonSerializer")